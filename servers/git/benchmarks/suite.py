@@ -0,0 +1,261 @@
+"""
+End-to-end benchmark suite for the git server.
+
+    cd servers/git
+    python -m benchmarks.suite --commits 10000 --files 5000 --clients 8
+    python -m benchmarks.suite --commits 100000 --branches 200 --label pool-off --output runs.jsonl
+
+Generates a synthetic repository with git fast-import (cached under the
+temp directory by its parameters, or --repo-dir), starts the server with
+uvicorn, and drives each read endpoint from concurrent clients, reporting
+p50/p99 latency, throughput and git processes spawned per request. Spawns
+are counted by pointing the server at a wrapper around git that records
+each start; --no-count-spawns runs git directly instead. --output appends
+one JSON line per endpoint, tagged with --label and the repository shape,
+plus the server's /metrics, so pooling and caching changes can be compared
+run against run.
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks import synthetic
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+SPAWN_WRAPPER = """#!/bin/sh
+printf . >> "{counter}"
+exec "{git}" "$@"
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Server:
+    def __init__(self, workdir: Path, count_spawns: bool, env: Dict[str, str]):
+        self.port = free_port()
+        self.counter: Optional[Path] = None
+        env = {**os.environ, **env}
+        if count_spawns:
+            self.counter = workdir / "spawns"
+            self.counter.touch()
+            wrapper = workdir / "git"
+            wrapper.write_text(
+                SPAWN_WRAPPER.format(counter=self.counter, git=shutil.which("git"))
+            )
+            wrapper.chmod(wrapper.stat().st_mode | stat.S_IEXEC)
+            env["GIT_PYTHON_GIT_EXECUTABLE"] = str(wrapper)
+        self.process = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "main:app",
+                "--port", str(self.port), "--log-level", "warning",
+            ],
+            cwd=SERVER_DIR,
+            env=env,
+        )
+        self.url = f"http://127.0.0.1:{self.port}"
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                httpx.get(self.url + "/metrics", timeout=5).raise_for_status()
+                return
+            except httpx.HTTPError:
+                if time.monotonic() > deadline or self.process.poll() is not None:
+                    self.stop()
+                    raise RuntimeError("git server did not start")
+                time.sleep(0.2)
+
+    def spawns(self) -> Optional[int]:
+        return None if self.counter is None else self.counter.stat().st_size
+
+    def stop(self) -> None:
+        self.process.terminate()
+        self.process.wait(timeout=60)
+
+
+def operations(repo: Path, info: synthetic.RepoInfo) -> Dict[str, Callable]:
+    root = str(repo)
+    recent = info.commits[:200]
+    others = [b for b in info.branches if b != "main"] or ["main"]
+
+    def word(rng):
+        return rng.choice(synthetic.WORDS)
+
+    return {
+        "status": lambda c, rng: c.post("/status", json={"repo_path": root}),
+        "log": lambda c, rng: c.post(
+            "/log", json={"repo_path": root, "max_count": 50}
+        ),
+        "log_path": lambda c, rng: c.post(
+            "/log",
+            json={"repo_path": root, "max_count": 20, "paths": [rng.choice(info.paths)]},
+        ),
+        "diff": lambda c, rng: c.post(
+            "/diff", json={"repo_path": root, "target": rng.choice(recent)}
+        ),
+        "diff_unstaged": lambda c, rng: c.post(
+            "/diff_unstaged", json={"repo_path": root}
+        ),
+        "show": lambda c, rng: c.post(
+            "/show", json={"repo_path": root, "revision": rng.choice(recent)}
+        ),
+        "grep": lambda c, rng: c.post(
+            "/grep", json={"repo_path": root, "pattern": word(rng), "limit": 100}
+        ),
+        "read_blob": lambda c, rng: c.get(
+            "/read_blob", params={"repo_path": root, "path": rng.choice(info.paths)}
+        ),
+        "ls_tree": lambda c, rng: c.post(
+            "/ls_tree", json={"repo_path": root, "depth": 2}
+        ),
+        "blame": lambda c, rng: c.post(
+            "/blame", json={"repo_path": root, "path": rng.choice(info.paths)}
+        ),
+        "search_commits": lambda c, rng: c.post(
+            "/search_commits",
+            json={"repo_path": root, "message": f"ISSUE-{rng.randrange(100)}\\b"},
+        ),
+        "merge_base": lambda c, rng: c.post(
+            "/merge_base",
+            json={"repo_path": root, "revisions": ["main", rng.choice(others)]},
+        ),
+        "ahead_behind": lambda c, rng: c.post(
+            "/ahead_behind",
+            json={"repo_path": root, "base": "main", "revisions": others[:20]},
+        ),
+        "branches": lambda c, rng: c.post(
+            "/branches", json={"repo_path": root, "base": "main"}
+        ),
+    }
+
+
+def drive(url: str, request: Callable, total: int, clients: int, seed: int):
+    def worker(index: int) -> List[float]:
+        rng = random.Random(seed * 1000 + index)
+        samples = []
+        with httpx.Client(base_url=url, timeout=300) as client:
+            for _ in range(total // clients):
+                t0 = time.perf_counter()
+                request(client, rng).raise_for_status()
+                samples.append((time.perf_counter() - t0) * 1000)
+        return samples
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        samples = [s for chunk in pool.map(worker, range(clients)) for s in chunk]
+    return samples, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--commits", type=int, default=10_000)
+    parser.add_argument("--files", type=int, default=2_000)
+    parser.add_argument("--blob-bytes", type=int, default=4096, help="mean file size")
+    parser.add_argument("--branches", type=int, default=50)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=400, help="per operation")
+    parser.add_argument("--operations", help="comma-separated subset to run")
+    parser.add_argument("--repo-dir", type=Path, help="where to generate/reuse the repo")
+    parser.add_argument(
+        "--count-spawns", action=argparse.BooleanOptionalAction, default=True
+    )
+    parser.add_argument(
+        "--env",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="server setting, e.g. GIT_STATUS_CACHE_SECONDS=0; repeatable",
+    )
+    parser.add_argument("--label", default="", help="tag for --output lines")
+    parser.add_argument("--output", type=Path, help="append JSON lines here")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    spec = synthetic.RepoSpec(
+        args.commits, args.files, args.blob_bytes, args.branches, args.seed
+    )
+    repo = args.repo_dir or Path(tempfile.gettempdir()) / f"git-bench-{spec.name}"
+    if not (repo / ".git").exists():
+        t0 = time.perf_counter()
+        synthetic.generate(repo, spec)
+        print(f"generated {repo} in {time.perf_counter() - t0:.1f}s")
+    info = synthetic.describe(repo)
+    print(
+        f"\n{spec.commits:,} commits, {len(info.paths):,} files of ~{spec.blob_bytes} "
+        f"bytes, {len(info.branches)} branches; {args.clients} clients"
+        + (f" [{args.label}]" if args.label else "")
+    )
+
+    workdir = Path(tempfile.mkdtemp(prefix="git-bench-server-"))
+    server = Server(
+        workdir, args.count_spawns, dict(e.split("=", 1) for e in args.env)
+    )
+    results = []
+    try:
+        selected = operations(repo, info)
+        if args.operations:
+            selected = {n: selected[n] for n in args.operations.split(",")}
+        for name, request in selected.items():
+            spawned = server.spawns()
+            samples, elapsed = drive(
+                server.url, request, args.requests, args.clients, args.seed
+            )
+            p50, p99 = synthetic.percentiles(samples)
+            result = {
+                "label": args.label,
+                **spec._asdict(),
+                "operation": name,
+                "clients": args.clients,
+                "p50Ms": round(p50, 3),
+                "p99Ms": round(p99, 3),
+                "requestsPerSecond": round(len(samples) / elapsed, 1),
+                "spawnsPerRequest": None,
+            }
+            if spawned is not None:
+                result["spawnsPerRequest"] = round(
+                    (server.spawns() - spawned) / len(samples), 2
+                )
+            results.append(result)
+            print(
+                f"  {name:<15} p50 {p50:8.2f} ms  p99 {p99:8.2f} ms  "
+                f"{result['requestsPerSecond']:8.1f} req/s"
+                + (
+                    f"  {result['spawnsPerRequest']:6.2f} spawns/req"
+                    if spawned is not None
+                    else ""
+                )
+            )
+        metrics = httpx.get(server.url + "/metrics", timeout=30).json()
+    finally:
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+    for cache in ("repo_pool", "blob_cache", "blame_cache", "status_cache"):
+        print(f"  {cache:<15} {json.dumps(metrics.get(cache))}")
+    if args.output:
+        with open(args.output, "a") as f:
+            f.writelines(json.dumps(r) + "\n" for r in results)
+            f.write(
+                json.dumps({"label": args.label, **spec._asdict(), "metrics": metrics})
+                + "\n"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import random
+import subprocess
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+WORDS = (
+    "fix add remove update refactor parser cache index request response handler "
+    "config test docs build release client server session token retry timeout "
+    "error log metric queue worker branch commit merge path file buffer stream"
+).split()
+AUTHORS = [f"Dev {i} <dev{i}@example.com>" for i in range(20)]
+# One commit every ten minutes from September 2020.
+EPOCH = 1_600_000_000
+STEP_SECONDS = 600
+
+
+class RepoSpec(NamedTuple):
+    commits: int = 1000
+    files: int = 1000
+    blob_bytes: int = 4096
+    branches: int = 20
+    seed: int = 0
+
+    @property
+    def name(self) -> str:
+        return (
+            f"c{self.commits}-f{self.files}-b{self.blob_bytes}"
+            f"-br{self.branches}-s{self.seed}"
+        )
+
+
+def file_path(i: int) -> str:
+    # About 20 entries per directory, two levels deep.
+    return f"pkg{i // 400}/mod{i // 20 % 20}/file{i}.txt"
+
+
+def line(rng: random.Random) -> bytes:
+    return (" ".join(rng.choices(WORDS, k=rng.randint(3, 12))) + "\n").encode()
+
+
+def content(rng: random.Random, mean_bytes: int) -> bytes:
+    # File sizes are roughly log-normal around mean_bytes: mostly small
+    # files, a long tail of big ones.
+    target = max(16, int(rng.lognormvariate(0, 0.8) * mean_bytes / 1.377))
+    lines = []
+    size = 0
+    while size < target:
+        lines.append(line(rng))
+        size += len(lines[-1])
+    return b"".join(lines)
+
+
+def edit(rng: random.Random, data: bytes) -> bytes:
+    """Replace, insert or delete a few adjacent lines."""
+    lines = data.splitlines(keepends=True) or [b"\n"]
+    start = rng.randrange(len(lines))
+    end = min(len(lines), start + rng.randint(0, 4))
+    lines[start:end] = [line(rng) for _ in range(rng.randint(0, 5))]
+    return b"".join(lines)
+
+
+def message(rng: random.Random, n: int) -> bytes:
+    subject = " ".join(rng.choices(WORDS, k=rng.randint(3, 8))).capitalize()
+    if rng.random() < 0.2:
+        subject += f" (ISSUE-{rng.randrange(max(1, n // 10) + 1)})"
+    body = " ".join(rng.choices(WORDS, k=rng.randint(0, 40)))
+    return f"{subject}\n\n{body}\n".encode() if body else f"{subject}\n".encode()
+
+
+class FastImport:
+    """Writes a `git fast-import` stream."""
+
+    def __init__(self, stdin):
+        self.stdin = stdin
+        self.marks = 0
+
+    def data(self, payload: bytes) -> None:
+        self.stdin.write(b"data %d\n" % len(payload))
+        self.stdin.write(payload)
+        self.stdin.write(b"\n")
+
+    def commit(
+        self,
+        ref: str,
+        when: int,
+        author: str,
+        text: bytes,
+        parent: int,
+        changes: Dict[str, bytes],
+    ) -> int:
+        self.marks += 1
+        self.stdin.write(f"commit {ref}\nmark :{self.marks}\n".encode())
+        for role in ("author", "committer"):
+            self.stdin.write(f"{role} {author} {when} +0000\n".encode())
+        self.data(text)
+        if parent:
+            self.stdin.write(f"from :{parent}\n".encode())
+        for path, payload in changes.items():
+            self.stdin.write(f"M 100644 inline {path}\n".encode())
+            self.data(payload)
+        return self.marks
+
+
+def generate(path: Path, spec: RepoSpec) -> None:
+    """
+    Build a repository at `path`: one commit adding `files` files, then
+    `commits - 1` commits on main each editing one to three of them, then
+    `branches` branches forked from recent history with a few commits each.
+    The work tree is checked out and left with some unstaged and some staged
+    edits, so /status and the diffs have something to report.
+    """
+    rng = random.Random(spec.seed)
+    subprocess.run(["git", "init", "-q", "-b", "main", str(path)], check=True)
+    importer = subprocess.Popen(
+        ["git", "fast-import", "--quiet", "--done"],
+        cwd=path,
+        stdin=subprocess.PIPE,
+    )
+    stream = FastImport(importer.stdin)
+    files = {file_path(i): content(rng, spec.blob_bytes) for i in range(spec.files)}
+    paths = list(files)
+    head = stream.commit(
+        "refs/heads/main", EPOCH, AUTHORS[0], b"Initial import\n", 0, files
+    )
+    main_marks = [head]
+    for n in range(1, spec.commits):
+        changes = {}
+        for changed in rng.sample(paths, min(len(paths), rng.randint(1, 3))):
+            files[changed] = changes[changed] = edit(rng, files[changed])
+        head = stream.commit(
+            "refs/heads/main",
+            EPOCH + n * STEP_SECONDS,
+            rng.choice(AUTHORS),
+            message(rng, n),
+            head,
+            changes,
+        )
+        main_marks.append(head)
+    recent = main_marks[-max(1, len(main_marks) // 4) :]
+    for b in range(spec.branches):
+        tip = rng.choice(recent)
+        for n in range(rng.randint(1, 5)):
+            changed = rng.choice(paths)
+            tip = stream.commit(
+                f"refs/heads/branch-{b}",
+                EPOCH + (spec.commits + b * 5 + n) * STEP_SECONDS,
+                rng.choice(AUTHORS),
+                message(rng, spec.commits + n),
+                tip,
+                {changed: edit(rng, files[changed])},
+            )
+    importer.stdin.write(b"done\n")
+    importer.stdin.close()
+    if importer.wait():
+        raise RuntimeError("git fast-import failed")
+
+    subprocess.run(["git", "reset", "-q", "--hard", "main"], cwd=path, check=True)
+    dirty = rng.sample(paths, min(len(paths), max(3, spec.files // 100)))
+    for i, changed in enumerate(dirty):
+        (path / changed).write_bytes(edit(rng, files[changed]))
+        if i % 2:
+            subprocess.run(["git", "add", "--", changed], cwd=path, check=True)
+
+
+class RepoInfo(NamedTuple):
+    paths: List[str]
+    commits: List[str]
+    branches: List[str]
+
+
+def describe(path: Path) -> RepoInfo:
+    def git(*args: str) -> List[str]:
+        return subprocess.run(
+            ["git", *args], cwd=path, check=True, capture_output=True, text=True
+        ).stdout.split()
+
+    return RepoInfo(
+        paths=git("ls-files"),
+        commits=git("rev-list", "--max-count=1000", "main"),
+        branches=git("for-each-ref", "--format=%(refname:short)", "refs/heads"),
+    )
+
+
+def percentiles(samples: List[float]) -> Tuple[float, float]:
+    ordered = sorted(samples)
+    return (
+        ordered[len(ordered) // 2],
+        ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+    )
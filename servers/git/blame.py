@@ -0,0 +1,116 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+COMMIT_FIELDS = ("author", "author-mail", "author-time", "summary")
+
+
+class Blame:
+    """Parsed `git blame --porcelain` output for one file."""
+
+    __slots__ = ("commits", "lines")
+
+    def __init__(self):
+        # sha -> the COMMIT_FIELDS git reported for it
+        self.commits: Dict[str, Dict[str, str]] = {}
+        # One (sha, line in that commit, text) per line of the file.
+        self.lines: List[Tuple[str, int, str]] = []
+
+
+def parse_porcelain(output: bytes) -> Blame:
+    """
+    Each line of the file is reported as a `<sha> <orig> <final> [<count>]`
+    header, followed by the commit's details the first time that commit
+    appears, then the line's text prefixed with a tab.
+    """
+    blame = Blame()
+    sha, original = "", 0
+    for row in output.split(b"\n"):
+        if row.startswith(b"\t"):
+            text = row[1:].decode("utf-8", "replace")
+            blame.lines.append((sha, original, text))
+            continue
+        key, _, value = row.decode("utf-8", "replace").partition(" ")
+        if len(key) in (40, 64):
+            sha = key
+            original = int(value.split(" ", 1)[0])
+            blame.commits.setdefault(sha, {})
+        elif key in COMMIT_FIELDS:
+            blame.commits[sha][key] = value
+    return blame
+
+
+class BlameCache:
+    """
+    Blame results keyed by (commit, path).
+
+    The blame of a file at a commit equals its blame at the last commit that
+    changed the file, so results are stored under that commit (the "origin")
+    and every later commit that left the file alone maps to the same entry.
+    Keying on the blob sha instead would be wrong when a change is reverted.
+    Entries are evicted least recently used first once they hold more than
+    `max_lines` lines in total.
+    """
+
+    def __init__(self, max_lines: int = 1_000_000, max_aliases: int = 100_000):
+        self.max_lines = max_lines
+        self.max_aliases = max_aliases
+        self._lock = threading.Lock()
+        self._blames: "OrderedDict[Tuple[str, str], Blame]" = OrderedDict()
+        self._origins: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self.lines = 0
+        self.hits = 0
+        self.reused = 0
+        self.misses = 0
+
+    def get(self, commit: str, path: str) -> Optional[Blame]:
+        with self._lock:
+            origin = self._origins.get((commit, path))
+            blame = None if origin is None else self._blames.get((origin, path))
+            if blame is None:
+                return None
+            self._origins.move_to_end((commit, path))
+            self._blames.move_to_end((origin, path))
+            self.hits += 1
+            return blame
+
+    def get_origin(self, commit: str, origin: str, path: str) -> Optional[Blame]:
+        """Look up by the file's last change, recording `commit` as an alias."""
+        with self._lock:
+            blame = self._blames.get((origin, path))
+            if blame is None:
+                self.misses += 1
+                return None
+            self._blames.move_to_end((origin, path))
+            self._alias(commit, origin, path)
+            self.reused += 1
+            return blame
+
+    def put(self, commit: str, origin: str, path: str, blame: Blame) -> None:
+        with self._lock:
+            if (origin, path) not in self._blames:
+                self._blames[(origin, path)] = blame
+                self.lines += len(blame.lines)
+            self._alias(commit, origin, path)
+            while self.lines > self.max_lines and len(self._blames) > 1:
+                _, evicted = self._blames.popitem(last=False)
+                self.lines -= len(evicted.lines)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.reused + self.misses
+            return {
+                "entries": len(self._blames),
+                "lines": self.lines,
+                "hits": self.hits,
+                "reused": self.reused,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.reused) / lookups if lookups else None,
+            }
+
+    def _alias(self, commit: str, origin: str, path: str) -> None:
+        # Caller holds the lock.
+        self._origins[(commit, path)] = origin
+        self._origins.move_to_end((commit, path))
+        while len(self._origins) > self.max_aliases:
+            self._origins.popitem(last=False)
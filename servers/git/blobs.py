@@ -0,0 +1,57 @@
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+class BlobCache:
+    """
+    Blob contents keyed by sha, evicted least recently used first once they
+    add up to more than `max_bytes`. A sha names its content forever, so
+    entries never go stale and are shared by every repository and revision
+    that contains the same file. Blobs larger than `max_item_bytes` are not
+    cached, so one huge file cannot flush everything else.
+    """
+
+    def __init__(
+        self, max_bytes: int = 64 * 1024 * 1024, max_item_bytes: Optional[int] = None
+    ):
+        self.max_bytes = max_bytes
+        if max_item_bytes is None:
+            max_item_bytes = max_bytes // 8
+        self.max_item_bytes = max_item_bytes
+        self._lock = threading.Lock()
+        self._blobs: "OrderedDict[str, bytes]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, sha: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._blobs.get(sha)
+            if data is None:
+                self.misses += 1
+                return None
+            self._blobs.move_to_end(sha)
+            self.hits += 1
+            return data
+
+    def put(self, sha: str, data: bytes) -> None:
+        if len(data) > self.max_item_bytes:
+            return
+        with self._lock:
+            if sha in self._blobs:
+                return
+            self._blobs[sha] = data
+            self.bytes += len(data)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._blobs.popitem(last=False)
+                self.bytes -= len(evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._blobs),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,261 @@
+import asyncio
+import os
+import signal
+import subprocess
+import tempfile
+import time
+from collections import defaultdict, deque
+from contextlib import aclosing, asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional, Tuple
+
+import git
+
+from locks import RepoLocks
+
+READ_CHUNK = 64 * 1024
+
+
+class GitFailed(Exception):
+    """A git subprocess exited with an error."""
+
+    def __init__(self, command, status: int, stderr: str):
+        super().__init__(stderr or f"git exited with status {status}")
+        self.command = command
+        self.status = status
+        self.stderr = stderr
+
+
+class GitTimeout(GitFailed):
+    """A git subprocess was killed because it ran past its timeout."""
+
+
+class StreamStalled(Exception):
+    """A client fell too far behind a streamed response and was cut off."""
+
+
+def percentile_ms(samples: Deque[float], q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 3)
+
+
+class CommandStats:
+    """Counters and recent timings for one kind of git operation."""
+
+    def __init__(self, window: int = 1024):
+        self.queued = 0
+        self.running = 0
+        self.count = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.waits: Deque[float] = deque(maxlen=window)
+        self.latencies: Deque[float] = deque(maxlen=window)
+
+    def snapshot(self) -> dict:
+        return {
+            "queued": self.queued,
+            "running": self.running,
+            "count": self.count,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "wait_p50_ms": percentile_ms(self.waits, 0.5),
+            "wait_p99_ms": percentile_ms(self.waits, 0.99),
+            "p50_ms": percentile_ms(self.latencies, 0.5),
+            "p99_ms": percentile_ms(self.latencies, 0.99),
+        }
+
+
+class GitRunner:
+    """
+    Runs git as asyncio subprocesses, so requests waiting on git hold no
+    threads.
+
+    Each operation runs inside `command()`, which takes the repository's read
+    or write lock and one of `max_processes` slots, and records per operation
+    name how many are queued and running, how long they waited and how long
+    they took. Processes are killed after `timeout` seconds, or as soon as
+    the task reading them is cancelled, e.g. because the client went away.
+    """
+
+    def __init__(self, max_processes: int = 32, timeout: Optional[float] = 120.0):
+        self.max_processes = max_processes
+        self.timeout = timeout
+        self.locks = RepoLocks()
+        self.executable = git.Git.GIT_PYTHON_GIT_EXECUTABLE or "git"
+        self.stats: Dict[str, CommandStats] = defaultdict(CommandStats)
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @asynccontextmanager
+    async def command(self, name: str, repo_dir: str, write: bool = False):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_processes)
+        stats = self.stats[name]
+        stats.queued += 1
+        queued_at = time.monotonic()
+        waiting = True
+        try:
+            async with self.locks.hold(repo_dir, write), self._slots:
+                stats.queued -= 1
+                waiting = False
+                started = time.monotonic()
+                stats.waits.append(started - queued_at)
+                stats.running += 1
+                try:
+                    yield
+                except GitTimeout:
+                    stats.timeouts += 1
+                    raise
+                except Exception:
+                    stats.errors += 1
+                    raise
+                finally:
+                    stats.running -= 1
+                    stats.count += 1
+                    stats.latencies.append(time.monotonic() - started)
+        finally:
+            if waiting:
+                stats.queued -= 1
+
+    async def stream(
+        self, repo_dir: str, *args: str, ok: Tuple[int, ...] = (0,)
+    ) -> AsyncIterator[bytes]:
+        """
+        Yield the stdout of `git <args>` as it arrives. Closing the generator
+        early kills git; once the output ends, an exit status outside `ok`
+        raises GitFailed with git's stderr.
+        """
+        # stderr goes to a file so a chatty git can never block on a full
+        # pipe while we are still reading stdout.
+        with tempfile.TemporaryFile() as stderr:
+            process = await asyncio.create_subprocess_exec(
+                self.executable,
+                *args,
+                cwd=repo_dir,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=stderr,
+            )
+            expired = False
+
+            def expire():
+                nonlocal expired
+                expired = True
+                kill(process)
+
+            timer = None
+            if self.timeout:
+                timer = asyncio.get_running_loop().call_later(self.timeout, expire)
+            finished = False
+            try:
+                while True:
+                    chunk = await process.stdout.read(READ_CHUNK)
+                    if not chunk:
+                        break
+                    yield chunk
+                finished = True
+            finally:
+                if timer is not None:
+                    timer.cancel()
+                if not finished:
+                    kill(process)
+                    # wait() only returns once stdout reaches EOF, which a
+                    # paused pipe never sees: read what is left in it.
+                    while await process.stdout.read(READ_CHUNK):
+                        pass
+                status = await process.wait()
+            if expired:
+                raise GitTimeout(args, status, "timed out")
+            if status not in ok:
+                stderr.seek(0)
+                raise GitFailed(
+                    args, status, stderr.read().decode("utf-8", "replace").strip()
+                )
+
+    async def output(
+        self, repo_dir: str, *args: str, ok: Tuple[int, ...] = (0,)
+    ) -> bytes:
+        return b"".join([chunk async for chunk in self.stream(repo_dir, *args, ok=ok)])
+
+    def metrics(self) -> Dict[str, dict]:
+        return {name: self.stats[name].snapshot() for name in sorted(self.stats)}
+
+
+def kill(process: asyncio.subprocess.Process) -> None:
+    # Not process.kill(): Popen polls first and may reap a git that has just
+    # exited, leaving asyncio's child watcher to report a bogus status.
+    if process.returncode is not None:
+        return
+    try:
+        os.kill(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+async def read_ahead(
+    chunks: AsyncIterator[bytes], max_bytes: int, stall_seconds: float
+) -> AsyncIterator[bytes]:
+    """
+    Iterate `chunks` in a task of its own, buffering up to `max_bytes` ahead
+    of the consumer, so a stream that holds a repository lock and a process
+    slot gives them up once git is done rather than once a slow client has
+    read everything. Time spent waiting for the consumer with the buffer full
+    adds up; past `stall_seconds` in total (0 for no limit) the stream is
+    closed, killing git and releasing the lock, and the consumer gets
+    StreamStalled after the chunks already buffered.
+    """
+    buffered: Deque[bytes] = deque()
+    size = 0
+    finished = False
+    error: Optional[BaseException] = None
+    ready = asyncio.Event()
+    drained = asyncio.Event()
+    stalled = 0.0
+
+    async def pump():
+        nonlocal size, finished, error, stalled
+        try:
+            async with aclosing(chunks):
+                async for chunk in chunks:
+                    buffered.append(chunk)
+                    size += len(chunk)
+                    ready.set()
+                    while size > max_bytes:
+                        drained.clear()
+                        timeout = None
+                        if stall_seconds:
+                            timeout = max(0.0, stall_seconds - stalled)
+                        started = time.monotonic()
+                        try:
+                            await asyncio.wait_for(drained.wait(), timeout)
+                        except asyncio.TimeoutError:
+                            raise StreamStalled(
+                                f"client kept the response waiting for more "
+                                f"than {stall_seconds}s"
+                            )
+                        finally:
+                            stalled += time.monotonic() - started
+        except Exception as e:
+            error = e
+        finally:
+            finished = True
+            ready.set()
+
+    task = asyncio.ensure_future(pump())
+    try:
+        while True:
+            if not buffered and not finished:
+                ready.clear()
+                await ready.wait()
+                continue
+            if not buffered:
+                break
+            chunk = buffered.popleft()
+            size -= len(chunk)
+            drained.set()
+            yield chunk
+        if error is not None:
+            raise error
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
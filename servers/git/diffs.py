@@ -0,0 +1,94 @@
+from typing import AsyncIterator
+
+READ_CHUNK = 64 * 1024
+FLUSH_BYTES = 64 * 1024
+FILE_HEADERS = (b"diff --git ", b"diff --cc ", b"diff --combined ")
+
+
+async def pieces(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Re-split output into lines, with very long lines cut into READ_CHUNK pieces."""
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        start = 0
+        while True:
+            end = pending.find(b"\n", start, start + READ_CHUNK)
+            if end == -1:
+                if len(pending) - start < READ_CHUNK:
+                    break
+                end = start + READ_CHUNK - 1
+            yield pending[start : end + 1]
+            start = end + 1
+        pending = pending[start:]
+    if pending:
+        yield pending
+
+
+async def capped(
+    chunks: AsyncIterator[bytes], max_file_bytes: int, max_total_bytes: int
+) -> AsyncIterator[bytes]:
+    """
+    Copy `git diff`/`git show` output, cutting each file's patch after
+    `max_file_bytes` and the whole output after `max_total_bytes` (0 disables
+    either cap). Cuts are replaced by a marker line saying what was left out.
+    A file's `diff --git` line is always kept; once its patch passes the cap,
+    the rest of it up to the next file is dropped, so what remains is a
+    prefix of the patch. The per-file cap only applies once a file header
+    has been seen: summary modes (stat, numstat, name-only) and the commit
+    header `git show` prints first are bounded by the total cap alone.
+    """
+    buffer = bytearray()
+    total = file_bytes = skipped = 0
+    # Whether a file header has been seen, and whether the current file has
+    # passed max_file_bytes.
+    in_file = over = False
+    at_line_start = True
+    # Whether the last byte passed through ended mid-line.
+    open_line = False
+
+    def marker(text: str) -> bytes:
+        return (b"\n" if open_line else b"") + f"[... {text} ...]\n".encode()
+
+    def file_marker() -> bytes:
+        return marker(
+            f"{skipped} more bytes of this file's diff omitted "
+            f"(max_file_bytes={max_file_bytes})"
+        )
+
+    async for piece in pieces(chunks):
+        header = at_line_start and piece.startswith(FILE_HEADERS)
+        if header:
+            if skipped:
+                buffer += file_marker()
+            file_bytes = skipped = 0
+            in_file = True
+            over = False
+        at_line_start = piece.endswith(b"\n")
+        if (
+            in_file
+            and not header
+            and (
+                over or (max_file_bytes and file_bytes + len(piece) > max_file_bytes)
+            )
+        ):
+            over = True
+            skipped += len(piece)
+            continue
+        if max_total_bytes and total + len(piece) > max_total_bytes:
+            buffer += marker(
+                f"diff truncated at max_total_bytes={max_total_bytes}; narrow it "
+                f"with paths or check mode=stat first"
+            )
+            yield bytes(buffer)
+            return
+        file_bytes += len(piece)
+        total += len(piece)
+        buffer += piece
+        open_line = not piece.endswith(b"\n")
+        if len(buffer) >= FLUSH_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if skipped:
+        buffer += file_marker()
+    if buffer:
+        yield bytes(buffer)
@@ -0,0 +1,50 @@
+import asyncio
+
+
+class CancelOnDisconnect:
+    """
+    ASGI middleware that cancels a request's handler when the client
+    disconnects before the response is complete, so the git commands it is
+    waiting on are killed instead of running on for nobody.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        messages: asyncio.Queue = asyncio.Queue()
+        complete = False
+        disconnected = False
+
+        async def send_tracked(message):
+            nonlocal complete
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                complete = True
+            await send(message)
+
+        handler = asyncio.ensure_future(self.app(scope, messages.get, send_tracked))
+
+        async def watch():
+            nonlocal disconnected
+            while True:
+                message = await receive()
+                await messages.put(message)
+                if message["type"] == "http.disconnect":
+                    if not complete:
+                        disconnected = True
+                        handler.cancel()
+                    return
+
+        watcher = asyncio.ensure_future(watch())
+        try:
+            await handler
+        except asyncio.CancelledError:
+            if not disconnected:
+                raise
+        finally:
+            watcher.cancel()
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Set
+
+from commands import GitFailed, GitRunner
+
+logger = logging.getLogger(__name__)
+
+
+class CommitGraphs:
+    """
+    Keeps each repository's commit-graph file current, so ancestry queries
+    (merge bases, ahead/behind counts, path-limited history) walk generation
+    numbers and Bloom filters instead of parsing every commit.
+
+    A repository is refreshed in the background the first time it is used
+    after start-up, and again at most every `interval` seconds (0 disables
+    maintenance). Writes are incremental (`--split`), so a refresh only adds
+    the commits made since the last one.
+    """
+
+    def __init__(self, runner: GitRunner, interval: float = 300.0):
+        self.runner = runner
+        self.interval = interval
+        # git dir -> time.monotonic() of the last refresh started
+        self._refreshed: Dict[str, float] = {}
+        self._running: Set[str] = set()
+        # Background tasks are only weakly referenced by the event loop.
+        self._tasks: Set[asyncio.Task] = set()
+        self.writes = 0
+        self.failures = 0
+
+    def refresh(self, root: str, git_dir: str) -> None:
+        """Start a background refresh of `git_dir` if one is due."""
+        if self.interval <= 0 or git_dir in self._running:
+            return
+        last = self._refreshed.get(git_dir)
+        if last is not None and time.monotonic() - last < self.interval:
+            return
+        self._refreshed[git_dir] = time.monotonic()
+        self._running.add(git_dir)
+        task = asyncio.ensure_future(self._write(root, git_dir))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> dict:
+        return {
+            "repos": len(self._refreshed),
+            "running": len(self._running),
+            "writes": self.writes,
+            "failures": self.failures,
+        }
+
+    async def _write(self, root: str, git_dir: str) -> None:
+        try:
+            async with self.runner.command("commit_graph", root):
+                await self.runner.output(
+                    root,
+                    "commit-graph",
+                    "write",
+                    "--reachable",
+                    "--split",
+                    "--changed-paths",
+                )
+            self.writes += 1
+        except GitFailed as e:
+            self.failures += 1
+            logger.warning("commit-graph write failed in %s: %s", git_dir, e)
+        finally:
+            self._running.discard(git_dir)
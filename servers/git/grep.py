@@ -0,0 +1,66 @@
+import json
+from typing import AsyncIterator, Optional
+
+
+def parse_line(line: bytes, prefix: bytes) -> Optional[dict]:
+    """
+    Parse one line of `git grep -z -n --column` output. Matches come as
+    path NUL line NUL column NUL text, context lines without the column, and
+    `--` separates context groups. Searches of a revision prefix each path
+    with `<revision>:`, which is stripped.
+    """
+    if line == b"--":
+        return None
+    fields = line.split(b"\0", 3)
+    path = fields[0]
+    if prefix and path.startswith(prefix):
+        path = path[len(prefix) :]
+    if len(fields) == 4 and fields[2].isdigit():
+        return {
+            "type": "match",
+            "path": path.decode("utf-8", "replace"),
+            "line": int(fields[1]),
+            "column": int(fields[2]),
+            "text": fields[3].decode("utf-8", "replace"),
+        }
+    fields = line.split(b"\0", 2)
+    if len(fields) < 3 or not fields[1].isdigit():
+        return None
+    return {
+        "type": "context",
+        "path": path.decode("utf-8", "replace"),
+        "line": int(fields[1]),
+        "text": fields[2].decode("utf-8", "replace"),
+    }
+
+
+async def ndjson_matches(
+    chunks: AsyncIterator[bytes], prefix: bytes, limit: int, summary: dict
+) -> AsyncIterator[bytes]:
+    """
+    Turn grep output into NDJSON, one chunk per read from git so results reach
+    the client as they are found. Stops after `limit` matches. Fills in
+    `summary`, which the caller sends once git has exited cleanly.
+    """
+    pending = b""
+    matches = 0
+    truncated = False
+    async for chunk in chunks:
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        records = []
+        for line in lines:
+            record = parse_line(line, prefix)
+            if record is None:
+                continue
+            if record["type"] == "match":
+                if matches == limit:
+                    truncated = True
+                    break
+                matches += 1
+            records.append(json.dumps(record) + "\n")
+        if records:
+            yield "".join(records).encode()
+        if truncated:
+            break
+    summary.update(type="summary", matches=matches, truncated=truncated)
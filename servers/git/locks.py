@@ -0,0 +1,77 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict
+
+
+class ReadWriteLock:
+    """
+    Asyncio lock shared by any number of readers or held by one writer.
+    Waiting writers block new readers, so a stream of reads cannot starve a
+    commit.
+    """
+
+    def __init__(self):
+        self._cond = asyncio.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @asynccontextmanager
+    async def read(self):
+        async with self._cond:
+            await self._cond.wait_for(
+                lambda: not self._writer and not self._writers_waiting
+            )
+            self._readers += 1
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self._readers -= 1
+                self._cond.notify_all()
+
+    @asynccontextmanager
+    async def write(self):
+        async with self._cond:
+            self._writers_waiting += 1
+            try:
+                await self._cond.wait_for(
+                    lambda: not self._writer and not self._readers
+                )
+            finally:
+                self._writers_waiting -= 1
+                # A cancelled writer may have been what held readers back.
+                self._cond.notify_all()
+            self._writer = True
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class RepoLocks:
+    """One ReadWriteLock per repository path, dropped when nobody holds it."""
+
+    def __init__(self):
+        self._locks: Dict[str, ReadWriteLock] = {}
+        self._users: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def hold(self, path: str, write: bool = False):
+        lock = self._locks.get(path)
+        if lock is None:
+            lock = self._locks[path] = ReadWriteLock()
+        self._users[path] = self._users.get(path, 0) + 1
+        try:
+            async with lock.write() if write else lock.read():
+                yield
+        finally:
+            self._users[path] -= 1
+            if not self._users[path]:
+                del self._users[path]
+                del self._locks[path]
@@ -1,19 +1,56 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
 import logging
+import os
+import re
+from contextlib import aclosing
+from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from typing import List, Optional
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
 from enum import Enum
 import git
 from pydantic import BaseModel, Field
 
+import commands
+from disconnect import CancelOnDisconnect
+from blame import BlameCache, parse_porcelain
+import diffs
+from blobs import BlobCache
+from graphs import CommitGraphs
+from messages import MessageIndex, RepoMessages
+import grep
+import status
+from repos import Lease, RepoPool
+
 app = FastAPI(
     title="Git Management API",
     version="0.1.0",
     description="An API to manage Git repositories with explicit endpoints, inputs, and outputs for better OpenAPI schemas.",
 )
 
+logger = logging.getLogger(__name__)
+
 origins = ["*"]
 
 app.add_middleware(
@@ -23,6 +60,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CancelOnDisconnect)
 
 
 # ----------------- ENUMS -----------------
@@ -41,6 +79,33 @@ class GitTools(str, Enum):
     CHECKOUT = "checkout"
     SHOW = "show"
     INIT = "init"
+    GREP = "grep"
+    READ_BLOB = "read_blob"
+    LS_TREE = "ls_tree"
+    BLAME = "blame"
+    MERGE_BASE = "merge_base"
+    IS_ANCESTOR = "is_ancestor"
+    AHEAD_BEHIND = "ahead_behind"
+    BRANCHES = "branches"
+    SEARCH_COMMITS = "search_commits"
+
+
+class UntrackedMode(str, Enum):
+    ALL = "all"
+    NORMAL = "normal"
+    NO = "no"
+
+
+class PickaxeMode(str, Enum):
+    STRING = "string"
+    REGEX = "regex"
+
+
+class DiffMode(str, Enum):
+    PATCH = "patch"
+    STAT = "stat"
+    NUMSTAT = "numstat"
+    NAME_ONLY = "name-only"
 
 
 # ----------------- MODELS -----------------
@@ -51,18 +116,48 @@ class GitRepoPath(BaseModel):
 
 
 class GitStatusRequest(GitRepoPath):
-    pass
+    untracked: UntrackedMode = Field(
+        UntrackedMode.NORMAL,
+        description="'normal' lists untracked directories without their contents, "
+        "'all' lists every untracked file, 'no' skips the untracked scan, which is "
+        "the slow part on very large working trees.",
+    )
+    paths: List[str] = Field([], description="Only report status for these paths.")
+
 
+class DiffOptions(BaseModel):
+    mode: DiffMode = Field(
+        DiffMode.PATCH,
+        description="'patch' for the full diff, or a summary: 'stat', 'numstat' "
+        "(added/removed line counts per file) or 'name-only'.",
+    )
+    paths: List[str] = Field([], description="Only diff these paths.")
+    max_file_bytes: Optional[int] = Field(
+        None,
+        ge=0,
+        description="Cut each file's patch after this many bytes (0 for no limit). "
+        "Defaults to the server's GIT_DIFF_MAX_FILE_BYTES.",
+    )
+    max_total_bytes: Optional[int] = Field(
+        None,
+        ge=0,
+        description="Cut the whole output after this many bytes (0 for no limit). "
+        "Defaults to the server's GIT_DIFF_MAX_TOTAL_BYTES.",
+    )
+    stream: bool = Field(
+        False, description="Stream the output as text/plain instead of JSON."
+    )
 
-class GitDiffUnstagedRequest(GitRepoPath):
+
+class GitDiffUnstagedRequest(GitRepoPath, DiffOptions):
     pass
 
 
-class GitDiffStagedRequest(GitRepoPath):
+class GitDiffStagedRequest(GitRepoPath, DiffOptions):
     pass
 
 
-class GitDiffRequest(GitRepoPath):
+class GitDiffRequest(GitRepoPath, DiffOptions):
     target: str = Field(..., description="The branch or commit to diff against.")
 
 
@@ -81,7 +176,28 @@ class GitResetRequest(GitRepoPath):
 
 
 class GitLogRequest(GitRepoPath):
-    max_count: int = Field(10, description="Maximum number of commits to retrieve.")
+    max_count: int = Field(
+        10, ge=1, le=1000, description="Maximum number of commits to retrieve."
+    )
+    ref: Optional[str] = Field(
+        None, description="Branch, tag or commit to start from. Defaults to HEAD."
+    )
+    cursor: Optional[str] = Field(
+        None,
+        description="next_cursor from a previous page; pass the same filters again.",
+    )
+    paths: List[str] = Field(
+        [], description="Only include commits that touch one of these paths."
+    )
+    author: Optional[str] = Field(
+        None, description="Only include commits whose author matches this pattern."
+    )
+    since: Optional[str] = Field(
+        None, description="Only include commits after this date, e.g. '2024-01-31'."
+    )
+    until: Optional[str] = Field(
+        None, description="Only include commits before this date."
+    )
 
 
 class GitCreateBranchRequest(GitRepoPath):
@@ -95,7 +211,7 @@ class GitCheckoutRequest(GitRepoPath):
     branch_name: str = Field(..., description="Branch name to checkout.")
 
 
-class GitShowRequest(GitRepoPath):
+class GitShowRequest(GitRepoPath, DiffOptions):
     revision: str = Field(
         ..., description="The commit hash or branch/tag name to show."
     )
@@ -105,40 +221,844 @@ class GitInitRequest(GitRepoPath):
     pass
 
 
+class GitGrepRequest(GitRepoPath):
+    pattern: str = Field(..., description="Extended regular expression to search for.")
+    revision: Optional[str] = Field(
+        None,
+        description="Commit, branch or tag to search. Defaults to the working tree.",
+    )
+    paths: List[str] = Field(
+        [], description="Pathspecs to limit the search to, e.g. 'src/' or '*.py'."
+    )
+    fixed_strings: bool = Field(
+        False, description="Treat the pattern as a literal string."
+    )
+    ignore_case: bool = Field(False, description="Match case-insensitively.")
+    context: int = Field(
+        0, ge=0, le=20, description="Lines of context around each match."
+    )
+    max_count: Optional[int] = Field(
+        None, ge=1, description="Stop after this many matches in each file."
+    )
+    limit: int = Field(
+        1000, ge=1, le=100_000, description="Stop after this many matches in total."
+    )
+
+
+class GitLsTreeRequest(GitRepoPath):
+    revision: str = Field("HEAD", description="Commit, branch or tag to list.")
+    path: str = Field("", description="Directory to list, relative to the root.")
+    depth: int = Field(
+        1, ge=1, le=32, description="How many directory levels to descend."
+    )
+    limit: int = Field(
+        1000, ge=1, le=100_000, description="Maximum number of entries to return."
+    )
+
+
+class GitBlameRequest(GitRepoPath):
+    path: str = Field(..., description="File path relative to the repository root.")
+    revision: str = Field("HEAD", description="Commit, branch or tag to blame at.")
+    start_line: int = Field(1, ge=1, description="First line to return (1-based).")
+    end_line: Optional[int] = Field(
+        None, ge=1, description="Last line to return; defaults to the end of file."
+    )
+
+
+class GitMergeBaseRequest(GitRepoPath):
+    revisions: List[str] = Field(
+        ...,
+        min_length=2,
+        max_length=64,
+        description="Two or more commits, branches or tags.",
+    )
+    all: bool = Field(
+        False,
+        description="Return every best common ancestor instead of one; criss-cross "
+        "merges can leave several.",
+    )
+
+
+class GitIsAncestorRequest(GitRepoPath):
+    ancestor: str = Field(..., description="The commit that may be an ancestor.")
+    descendant: str = Field("HEAD", description="The commit to check it against.")
+
+
+class GitAheadBehindRequest(GitRepoPath):
+    base: str = Field("HEAD", description="The commit to count against.")
+    revisions: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=100,
+        description="Commits, branches or tags to compare with base.",
+    )
+
+
+class GitBranchesRequest(GitRepoPath):
+    remotes: bool = Field(False, description="Include remote-tracking branches.")
+    base: Optional[str] = Field(
+        None,
+        description="Also count each branch's commits ahead of and behind this "
+        "revision, e.g. 'main'.",
+    )
+    limit: int = Field(
+        100, ge=1, le=1000, description="Most branches to return, most recent first."
+    )
+
+
+class GitSearchCommitsRequest(GitRepoPath):
+    message: Optional[str] = Field(
+        None, description="Extended regular expression to match commit messages."
+    )
+    author: Optional[str] = Field(
+        None, description="Extended regular expression to match 'Name <email>'."
+    )
+    pickaxe: Optional[str] = Field(
+        None,
+        min_length=1,
+        description="Only include commits whose changes contain this; see "
+        "pickaxe_mode. Finds the commit that introduced or removed some code.",
+    )
+    pickaxe_mode: PickaxeMode = Field(
+        PickaxeMode.STRING,
+        description="'string' (git log -S) matches commits that change how many "
+        "times pickaxe occurs; 'regex' (git log -G) matches commits whose diff adds "
+        "or removes a line matching the pickaxe regular expression.",
+    )
+    ignore_case: bool = Field(
+        False, description="Match all patterns case-insensitively."
+    )
+    ref: Optional[str] = Field(
+        None, description="Branch, tag or commit to search back from. Defaults to HEAD."
+    )
+    paths: List[str] = Field(
+        [], description="Only include commits that touch one of these paths."
+    )
+    limit: int = Field(50, ge=1, le=1000, description="Most commits to return.")
+    stream: bool = Field(
+        False,
+        description="Stream NDJSON 'commit' records as they are found, then a "
+        "'summary' record, instead of one JSON response.",
+    )
+
+
+class BatchTargets(BaseModel):
+    repo_paths: List[str] = Field([], description="Repositories to run against.")
+    parent_dir: Optional[str] = Field(
+        None,
+        description="Also run against every repository found under this directory.",
+    )
+    depth: int = Field(
+        1, ge=1, le=4, description="Directory levels below parent_dir to search."
+    )
+    timeout_seconds: float = Field(
+        30, gt=0, le=600, description="Give up on a single repository after this long."
+    )
+
+
+class GitBatchStatusRequest(BatchTargets):
+    untracked: UntrackedMode = Field(
+        UntrackedMode.NORMAL, description="As for /status."
+    )
+    paths: List[str] = Field([], description="As for /status.")
+
+
+class GitBatchLogRequest(BatchTargets):
+    max_count: int = Field(
+        10, ge=1, le=1000, description="Commits to retrieve per repository."
+    )
+    ref: Optional[str] = Field(None, description="As for /log.")
+    paths: List[str] = Field([], description="As for /log.")
+    author: Optional[str] = Field(None, description="As for /log.")
+    since: Optional[str] = Field(None, description="As for /log.")
+    until: Optional[str] = Field(None, description="As for /log.")
+
+
 class TextResponse(BaseModel):
     result: str = Field(..., description="Description of the operation result.")
 
 
+class CommitRecord(BaseModel):
+    sha: str
+    parents: List[str]
+    author_name: str
+    author_email: str
+    authored_date: str = Field(..., description="ISO 8601 author date.")
+    committer_name: str
+    committer_email: str
+    committed_date: str = Field(..., description="ISO 8601 committer date.")
+    subject: str
+    body: str
+
+
+class TreeEntry(BaseModel):
+    path: str
+    type: str = Field(..., description="'blob', 'tree' or 'commit' (a submodule).")
+    mode: str
+    sha: str
+
+
+class LsTreeResponse(BaseModel):
+    commit: str = Field(..., description="The commit the revision resolved to.")
+    entries: List[TreeEntry]
+    truncated: bool = Field(
+        ..., description="Whether entries were left out because of the limit."
+    )
+
+
+class BranchStatus(BaseModel):
+    oid: Optional[str] = Field(None, description="HEAD commit; null before the first.")
+    head: Optional[str] = Field(None, description="Branch name; null if detached.")
+    upstream: Optional[str] = None
+    ahead: Optional[int] = None
+    behind: Optional[int] = None
+
+
+class StatusEntry(BaseModel):
+    kind: str = Field(
+        ..., description="'changed', 'renamed', 'unmerged', 'untracked' or 'ignored'."
+    )
+    path: str
+    orig_path: Optional[str] = Field(None, description="Source path of a rename.")
+    index: Optional[str] = Field(
+        None, description="Staged change: M, T, A, D, R, C, U or '.' for none."
+    )
+    worktree: Optional[str] = Field(None, description="Unstaged change, as index.")
+    submodule: Optional[bool] = None
+    score: Optional[str] = Field(None, description="Rename or copy score, e.g. R100.")
+
+
+class StatusResponse(BaseModel):
+    branch: BranchStatus
+    entries: List[StatusEntry]
+
+
+class BlameLine(BaseModel):
+    line: int
+    sha: str = Field(..., description="Commit that last changed this line.")
+    original_line: int = Field(..., description="The line's number in that commit.")
+    author: str
+    author_email: str
+    author_time: int = Field(..., description="Unix timestamp.")
+    summary: str
+    text: str
+
+
+class BlameResponse(BaseModel):
+    commit: str = Field(..., description="The commit the revision resolved to.")
+    total_lines: int
+    lines: List[BlameLine]
+
+
+class MergeBaseResponse(BaseModel):
+    merge_bases: List[str] = Field(
+        ..., description="Common ancestor shas; empty when the histories are unrelated."
+    )
+
+
+class IsAncestorResponse(BaseModel):
+    ancestor: str = Field(..., description="Sha the ancestor resolved to.")
+    descendant: str = Field(..., description="Sha the descendant resolved to.")
+    is_ancestor: bool = Field(
+        ..., description="True also when both are the same commit."
+    )
+
+
+class AheadBehind(BaseModel):
+    revision: str
+    sha: str
+    ahead: int = Field(..., description="Commits in revision that are not in base.")
+    behind: int = Field(..., description="Commits in base that are not in revision.")
+
+
+class AheadBehindResponse(BaseModel):
+    base: str = Field(..., description="Sha the base resolved to.")
+    results: List[AheadBehind]
+
+
+class BranchRecord(BaseModel):
+    name: str = Field(..., description="Short name, e.g. 'main' or 'origin/main'.")
+    sha: str
+    current: bool = Field(..., description="Whether this is the checked-out branch.")
+    committed_date: str
+    subject: str
+    upstream: Optional[str] = Field(None, description="The branch's upstream, if set.")
+    upstream_gone: bool = Field(
+        False, description="The upstream is configured but no longer exists."
+    )
+    upstream_ahead: Optional[int] = Field(
+        None, description="Commits on the branch that are not on its upstream."
+    )
+    upstream_behind: Optional[int] = Field(
+        None, description="Commits on the upstream that are not on the branch."
+    )
+    ahead: Optional[int] = Field(
+        None, description="Commits on the branch that are not in base."
+    )
+    behind: Optional[int] = Field(
+        None, description="Commits in base that are not on the branch."
+    )
+
+
+class BranchesResponse(BaseModel):
+    base: Optional[str] = Field(None, description="Sha the base resolved to.")
+    branches: List[BranchRecord]
+    truncated: bool
+
+
+class SearchCommitsResponse(BaseModel):
+    commits: List[CommitRecord] = Field(..., description="Matches, newest first.")
+    truncated: bool = Field(..., description="More commits matched than limit.")
+    indexed: bool = Field(
+        ..., description="Whether the answer came from the server's message index."
+    )
+
+
+class MetricsResponse(BaseModel):
+    repo_pool: Dict[str, Any]
+    blob_cache: Dict[str, Any]
+    blame_cache: Dict[str, Any]
+    status_cache: Dict[str, Any]
+    commit_graph: Dict[str, Any]
+    message_index: Dict[str, Any]
+    commands: Dict[str, Dict[str, Any]]
+
+
 class LogResponse(BaseModel):
-    commits: List[str] = Field(
-        ..., description="A list of formatted commit log entries."
+    commits: List[CommitRecord] = Field(..., description="Commits, newest first.")
+    next_cursor: Optional[str] = Field(
+        None, description="Pass as cursor to fetch the next page; null on the last."
     )
 
 
 # ----------------- UTILITY FUNCTIONS -----------------
 
 
-def get_repo(repo_path: str) -> git.Repo:
+# Repo handles are pooled so their git config and persistent cat-file
+# processes survive between requests. Handles stay reusable after errors the
+# endpoints raise themselves and after failed git subprocesses, neither of
+# which leaves a reply half-read.
+repo_pool = RepoPool(
+    max_handles=int(os.getenv("GIT_REPO_POOL_SIZE", "64")),
+    per_repo=int(os.getenv("GIT_REPO_HANDLES_PER_REPO", "4")),
+    idle_seconds=float(os.getenv("GIT_REPO_IDLE_SECONDS", "300")),
+    reusable_errors=(HTTPException, git.GitCommandError),
+)
+# git commands run as asyncio subprocesses under per-repository read/write
+# locks: reads share a repository, while /add, /commit, /reset,
+# /create_branch and /checkout have it to themselves.
+runner = commands.GitRunner(
+    max_processes=int(os.getenv("GIT_MAX_PROCESSES", "32")),
+    timeout=float(os.getenv("GIT_COMMAND_TIMEOUT_SECONDS", "120")) or None,
+)
+commit_graphs = CommitGraphs(
+    runner, float(os.getenv("GIT_COMMIT_GRAPH_SECONDS", "300"))
+)
+message_index = MessageIndex(int(os.getenv("GIT_COMMIT_INDEX_COMMITS", "0")))
+blob_cache = BlobCache(int(os.getenv("GIT_BLOB_CACHE_BYTES", str(64 * 1024 * 1024))))
+blame_cache = BlameCache(int(os.getenv("GIT_BLAME_CACHE_LINES", "1000000")))
+status_cache = status.StatusCache(float(os.getenv("GIT_STATUS_CACHE_SECONDS", "2")))
+READ_BLOB_MAX_BYTES = int(os.getenv("GIT_READ_BLOB_MAX_BYTES", str(32 * 1024 * 1024)))
+
+
+@app.on_event("shutdown")
+def close_repos():
+    repo_pool.close()
+
+
+def get_repo(repo_path: str) -> Lease:
+    """Borrow a pooled handle: `with get_repo(path) as repo: ...`"""
     try:
-        return git.Repo(repo_path)
-    except git.InvalidGitRepositoryError:
+        return repo_pool.lease(repo_path)
+    except (git.InvalidGitRepositoryError, git.NoSuchPathError):
         raise HTTPException(
             status_code=400, detail=f"Invalid Git repository at '{repo_path}'"
         )
 
 
+def leased(repo_path: str, work: Callable[[git.Repo], Any]) -> Any:
+    with get_repo(repo_path) as repo:
+        return work(repo)
+
+
+async def locate(repo_path: str) -> Tuple[str, str]:
+    """
+    The directory git commands for `repo_path` run in, which also keys the
+    repository's lock, and its git dir.
+    """
+
+    def paths(repo: git.Repo) -> Tuple[str, str]:
+        return repo.working_tree_dir or repo.git_dir, repo.git_dir
+
+    return await run_in_threadpool(leased, repo_path, paths)
+
+
+async def run_to_completion(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    run_in_threadpool for work done under a repository lock. A thread cannot
+    be stopped, so if the caller is cancelled (the client went away) this
+    still waits for the thread before re-raising, and the lock is only
+    released once the work it guards has ended.
+    """
+    task = asyncio.ensure_future(run_in_threadpool(func, *args))
+    cancelled = False
+    while not task.done():
+        try:
+            await asyncio.wait({task})
+        except asyncio.CancelledError:
+            cancelled = True
+    if cancelled:
+        if not task.cancelled():
+            task.exception()  # Retrieved, so asyncio does not log it.
+        raise asyncio.CancelledError
+    return task.result()
+
+
+async def locked(
+    name: str, repo_path: str, work: Callable[[git.Repo], Any], write: bool = False
+) -> Any:
+    """
+    Run `work(repo)` on a pooled handle in the threadpool while holding the
+    repository's read lock, or its write lock when `write` is set.
+    """
+    root, _ = await locate(repo_path)
+    async with runner.command(name, root, write):
+        return await run_to_completion(leased, repo_path, work)
+
+
+# Opt-in accelerators for huge working trees. Both are recorded in the
+# repository's index by git, so they are off unless the operator asks.
+STATUS_UNTRACKED_CACHE = os.getenv("GIT_STATUS_UNTRACKED_CACHE", "").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+STATUS_FSMONITOR = os.getenv("GIT_STATUS_FSMONITOR", "")
+GREP_THREADS = int(os.getenv("GIT_GREP_THREADS", "0"))
+BATCH_WORKERS = int(os.getenv("GIT_BATCH_WORKERS", "8"))
+BATCH_MAX_REPOS = int(os.getenv("GIT_BATCH_MAX_REPOS", "1000"))
+MAX_FILE_BYTES = int(os.getenv("GIT_DIFF_MAX_FILE_BYTES", str(256 * 1024)))
+MAX_TOTAL_BYTES = int(os.getenv("GIT_DIFF_MAX_TOTAL_BYTES", str(4 * 1024 * 1024)))
+# Streamed responses buffer this much ahead of the client. A client that
+# keeps the buffer full for GIT_STREAM_STALL_SECONDS in total is cut off,
+# releasing the repository lock its stream holds.
+STREAM_BUFFER_BYTES = int(os.getenv("GIT_STREAM_BUFFER_BYTES", str(8 * 1024 * 1024)))
+STREAM_STALL_SECONDS = float(os.getenv("GIT_STREAM_STALL_SECONDS", "10"))
+
+DIFF_MODE_FLAGS = {
+    DiffMode.PATCH: "--patch",
+    DiffMode.STAT: "--stat",
+    DiffMode.NUMSTAT: "--numstat",
+    DiffMode.NAME_ONLY: "--name-only",
+}
+
+
+def revision_commit(repo: git.Repo, revision: str) -> git.Commit:
+    # Resolved through the handle's persistent cat-file process, not a new git.
+    try:
+        commit = repo.commit(revision)
+        commit.tree
+        return commit
+    except (git.BadName, git.BadObject, ValueError):
+        raise HTTPException(status_code=400, detail=f"Unknown revision '{revision}'")
+
+
+def tree_entry(commit: git.Commit, path: str):
+    path = path.strip("/")
+    if not path:
+        return commit.tree
+    try:
+        return commit.tree / path
+    except KeyError:
+        raise HTTPException(
+            status_code=404, detail=f"'{path}' not found at {commit.hexsha}"
+        )
+
+
+def git_error(e: commands.GitFailed) -> HTTPException:
+    if isinstance(e, commands.GitTimeout):
+        return HTTPException(status_code=504, detail="git timed out")
+    return HTTPException(status_code=400, detail=e.stderr)
+
+
+async def primed(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Pull the first chunk of a git output stream before answering, so that
+    errors such as a bad revision are still a 400 rather than a failure in
+    the middle of a streamed response. The stream is read ahead of the
+    client (see commands.read_ahead), so its lock is held for as long as git
+    runs rather than for as long as the client takes to read.
+    """
+    chunks = commands.read_ahead(chunks, STREAM_BUFFER_BYTES, STREAM_STALL_SECONDS)
+    try:
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        first = b""
+    except commands.GitFailed as e:
+        raise git_error(e)
+
+    async def rest():
+        try:
+            yield first
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+    return rest()
+
+
+async def diff_response(
+    name: str, repo_path: str, args: List[str], options: DiffOptions
+):
+    """
+    Run a diff-producing git command and return its capped output, either as
+    a TextResponse or streamed. The repository's read lock is held until git
+    has finished.
+    """
+    args = [
+        *args[:1],
+        "--no-color",
+        "--no-ext-diff",
+        DIFF_MODE_FLAGS[options.mode],
+        *args[1:],
+        "--",
+        *options.paths,
+    ]
+    max_file = options.max_file_bytes
+    if max_file is None:
+        max_file = MAX_FILE_BYTES
+    max_total = options.max_total_bytes
+    if max_total is None:
+        max_total = MAX_TOTAL_BYTES
+    root, _ = await locate(repo_path)
+
+    async def output():
+        async with runner.command(name, root), aclosing(
+            runner.stream(root, *args)
+        ) as stdout:
+            async for chunk in diffs.capped(stdout, max_file, max_total):
+                yield chunk
+
+    chunks = await primed(output())
+    if options.stream:
+        return StreamingResponse(chunks, media_type="text/plain; charset=utf-8")
+    try:
+        text = b"".join([chunk async for chunk in chunks])
+    except commands.GitFailed as e:
+        raise git_error(e)
+    return TextResponse(result=text.decode("utf-8", "replace"))
+
+
+# One NUL-terminated field per placeholder; with -z each commit ends in a NUL
+# too, so the output is a flat stream of LOG_FIELDS-sized groups.
+LOG_FORMAT = "%x00".join(["%H", "%P", "%an", "%ae", "%aI", "%cn", "%ce", "%cI", "%B"])
+LOG_FIELDS = 9
+
+
+async def resolve_commit(root: str, revision: str) -> str:
+    try:
+        output = await runner.output(
+            root,
+            "rev-parse",
+            "--verify",
+            "--quiet",
+            "--end-of-options",
+            f"{revision}^{{commit}}",
+        )
+    except commands.GitTimeout as e:
+        raise git_error(e)
+    except commands.GitFailed:
+        raise HTTPException(status_code=400, detail=f"Unknown revision '{revision}'")
+    return output.decode().strip()
+
+
+def log_filters(request: GitLogRequest) -> str:
+    """A fingerprint of the filters a cursor was made with."""
+    filters = [request.author, request.since, request.until, request.paths]
+    return hashlib.sha1(json.dumps(filters).encode()).hexdigest()[:16]
+
+
+# Most commits a cursor remembers as already returned; past this, the next
+# page skips over the earlier ones instead of resuming the walk.
+LOG_CURSOR_SEEN = 256
+
+
+class LogCursor(NamedTuple):
+    filters: str
+    # The commit the first page started from, and how many commits the
+    # pages so far returned.
+    start: str
+    offset: int
+    # Where the walk stands: see log_frontier. An empty frontier means the
+    # next page skips `offset` commits from `start` instead.
+    frontier: List[str]
+    seen: List[str]
+    tied: int
+
+
+def encode_log_cursor(cursor: LogCursor) -> str:
+    raw = ":".join(
+        [
+            cursor.filters,
+            cursor.start,
+            str(cursor.offset),
+            ",".join(cursor.frontier),
+            ",".join(cursor.seen),
+            str(cursor.tied),
+        ]
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_log_cursor(cursor: str) -> LogCursor:
+    try:
+        raw = base64.urlsafe_b64decode(cursor).decode()
+        filters, start, offset, frontier, seen, tied = raw.split(":")
+        decoded = LogCursor(
+            filters,
+            start,
+            int(offset),
+            [sha for sha in frontier.split(",") if sha],
+            [sha for sha in seen.split(",") if sha],
+            int(tied),
+        )
+        for sha in [start, *decoded.frontier, *decoded.seen]:
+            if not re.fullmatch(r"[0-9a-f]{40}|[0-9a-f]{64}", sha):
+                raise ValueError(sha)
+        return decoded
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def log_frontier(cursor: LogCursor, walked: List[CommitRecord]) -> LogCursor:
+    """
+    Move `cursor` past `walked`, the commits `git log <frontier>` went on to
+    show. The frontier becomes the commits git still has queued, in the
+    order it queued them, so resuming from it carries on in the same order.
+    `seen` becomes the commits already shown that the walk may reach again:
+    those committed in the same second as the last, which git can show
+    ahead of a child that tied with them.
+    """
+    queued = dict.fromkeys(cursor.frontier)
+    visited = set(cursor.seen)
+    shown = [commit for commit in walked if commit.sha not in visited]
+    for commit in walked:
+        queued.pop(commit.sha, None)
+        visited.add(commit.sha)
+        for parent in commit.parents:
+            if parent not in queued and parent not in visited:
+                queued[parent] = None
+    tied = int(datetime.fromisoformat(walked[-1].committed_date).timestamp())
+    seen = cursor.seen if cursor.tied == tied else []
+    seen = seen + [
+        commit.sha
+        for commit in shown
+        if int(datetime.fromisoformat(commit.committed_date).timestamp()) == tied
+    ]
+    return cursor._replace(
+        offset=cursor.offset + len(shown),
+        frontier=list(queued),
+        seen=seen,
+        tied=tied,
+    )
+
+
+async def log_fields(chunks: AsyncIterator[bytes]) -> AsyncIterator[List[str]]:
+    """Split `git log -z --format=LOG_FORMAT` output into each commit's fields."""
+    pending = b""
+    fields: List[bytes] = []
+    async for chunk in chunks:
+        parts = (pending + chunk).split(b"\0")
+        pending = parts.pop()
+        fields += parts
+        while len(fields) >= LOG_FIELDS:
+            yield [f.decode("utf-8", "replace") for f in fields[:LOG_FIELDS]]
+            del fields[:LOG_FIELDS]
+    fields.append(pending)
+    if len(fields) >= LOG_FIELDS:
+        yield [f.decode("utf-8", "replace") for f in fields[:LOG_FIELDS]]
+
+
+def commit_record(fields: List[str]) -> CommitRecord:
+    sha, parents, an, ae, ad, cn, ce, cd, message = fields
+    subject, _, body = message.partition("\n")
+    return CommitRecord(
+        sha=sha,
+        parents=parents.split(),
+        author_name=an,
+        author_email=ae,
+        authored_date=ad,
+        committer_name=cn,
+        committer_email=ce,
+        committed_date=cd,
+        subject=subject.strip(),
+        body=body.strip(),
+    )
+
+
+async def index_messages(
+    root: str, git_dir: str, start: str
+) -> Optional[RepoMessages]:
+    """
+    Bring the message index up to date with the history of `start`, reading
+    only commits it does not hold yet, and return it. None if the repository
+    is too large to index, or was evicted while git was reading.
+    """
+    messages = message_index.repo(git_dir)
+    if messages is None:
+        return None
+    async with messages.updating:
+        if start in messages.commits:
+            return messages
+        room = message_index.room(git_dir)
+        # start comes from resolve_commit, so it is a sha, not an option.
+        args = ["log", "-z", f"--format={LOG_FORMAT}", start]
+        if messages.tips:
+            args += ["--not", *messages.tips]
+        new = []
+        async with aclosing(runner.stream(root, *args, "--")) as stdout:
+            async for fields in log_fields(stdout):
+                if len(new) == room:
+                    message_index.too_large(git_dir)
+                    return None
+                new.append(tuple(fields))
+        if not message_index.add(git_dir, messages, start, new):
+            return None
+        return messages
+
+
+async def locate_graphed(repo_path: str) -> str:
+    """locate() for ancestry queries, refreshing the commit-graph when due."""
+    root, git_dir = await locate(repo_path)
+    commit_graphs.refresh(root, git_dir)
+    return root
+
+
+# Most git processes one ancestry request runs side by side.
+ANCESTRY_PROCESSES = 4
+
+
+async def gather_bounded(jobs: List[Awaitable[Any]], limit: int) -> List[Any]:
+    """asyncio.gather, running at most `limit` jobs at once."""
+    slots = asyncio.Semaphore(limit)
+
+    async def one(job):
+        async with slots:
+            return await job
+
+    tasks = [asyncio.ensure_future(one(job)) for job in jobs]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        # One job failed or the request was cancelled: stop the rest before
+        # the caller lets go of the repository lock.
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def count_ahead_behind(root: str, base: str, revision: str) -> Tuple[int, int]:
+    output = await runner.output(
+        root,
+        "rev-list",
+        "--left-right",
+        "--count",
+        "--end-of-options",
+        f"{base}...{revision}",
+    )
+    behind, ahead = output.split()
+    return int(ahead), int(behind)
+
+
+BRANCH_FIELDS = [
+    "%(refname:short)",
+    "%(objectname)",
+    "%(HEAD)",
+    "%(symref)",
+    "%(upstream:short)",
+    "%(upstream:track,nobracket)",
+    "%(committerdate:iso-strict)",
+    "%(contents:subject)",
+]
+# Every field ends in a NUL: a subject can hold a carriage return or other
+# line breaks, so the newline git puts after each ref cannot delimit rows.
+BRANCH_FORMAT = "%00".join(BRANCH_FIELDS) + "%00"
+
+
+def parse_branches(output: bytes) -> Iterator[BranchRecord]:
+    fields = output.decode("utf-8", "replace").split("\0")
+    width = len(BRANCH_FIELDS)
+    for start in range(0, len(fields) - width + 1, width):
+        name, sha, head, symref, upstream, track, date, subject = fields[
+            start : start + width
+        ]
+        # Ref names cannot contain newlines; this one ended the previous row.
+        name = name.lstrip("\n")
+        # Skip symbolic refs such as origin/HEAD.
+        if symref:
+            continue
+        branch = BranchRecord(
+            name=name,
+            sha=sha,
+            current=head == "*",
+            committed_date=date,
+            subject=subject,
+            upstream=upstream or None,
+        )
+        if track == "gone":
+            branch.upstream_gone = True
+        elif upstream:
+            # "ahead 2, behind 1", either half alone, or empty when even.
+            counts = {"ahead": 0, "behind": 0}
+            for part in filter(None, track.split(", ")):
+                word, _, number = part.partition(" ")
+                counts[word] = int(number)
+            branch.upstream_ahead = counts["ahead"]
+            branch.upstream_behind = counts["behind"]
+        yield branch
+
+
 # ----------------- API ENDPOINTS -----------------
 
 
 @app.post(
     "/status",
-    response_model=TextResponse,
-    description="Get the current status of the Git repository.",
+    response_model=StatusResponse,
+    description="Get the current branch and the staged, unstaged, untracked and "
+    "conflicted files of the repository as structured records.",
 )
-def get_status(request: GitStatusRequest):
-    repo = get_repo(request.repo_path)
-    status = repo.git.status()
-    return TextResponse(result=status)
+async def get_status(request: GitStatusRequest):
+    root, git_dir = await locate(request.repo_path)
+    key = (git_dir, request.untracked, tuple(request.paths))
+    result = status_cache.get(key, status.index_stamp(git_dir))
+    if result is not None:
+        return result
+    args = []
+    if STATUS_UNTRACKED_CACHE:
+        args += ["-c", "core.untrackedCache=true"]
+    if STATUS_FSMONITOR:
+        args += ["-c", f"core.fsmonitor={STATUS_FSMONITOR}"]
+    args += [
+        "status",
+        "--porcelain=v2",
+        "-z",
+        "--branch",
+        f"--untracked-files={request.untracked.value}",
+        "--",
+        *request.paths,
+    ]
+    try:
+        async with runner.command("status", root):
+            output = await runner.output(root, *args)
+            # Stamped after the run: status may itself refresh and rewrite
+            # the index.
+            stamp = status.index_stamp(git_dir)
+    except commands.GitFailed as e:
+        raise git_error(e)
+    result = StatusResponse(**status.parse_porcelain_v2(output))
+    status_cache.put(key, stamp, result)
+    return result
 
 
 @app.post(
@@ -146,10 +1066,8 @@ def get_status(request: GitStatusRequest):
     response_model=TextResponse,
     description="Get differences of unstaged changes.",
 )
-def diff_unstaged(request: GitDiffUnstagedRequest):
-    repo = get_repo(request.repo_path)
-    diff = repo.git.diff()
-    return TextResponse(result=diff)
+async def diff_unstaged(request: GitDiffUnstagedRequest):
+    return await diff_response("diff", request.repo_path, ["diff"], request)
 
 
 @app.post(
@@ -157,10 +1075,10 @@ def diff_unstaged(request: GitDiffUnstagedRequest):
     response_model=TextResponse,
     description="Get differences of staged changes.",
 )
-def diff_staged(request: GitDiffStagedRequest):
-    repo = get_repo(request.repo_path)
-    diff = repo.git.diff("--cached")
-    return TextResponse(result=diff)
+async def diff_staged(request: GitDiffStagedRequest):
+    return await diff_response(
+        "diff", request.repo_path, ["diff", "--cached"], request
+    )
 
 
 @app.post(
@@ -168,10 +1086,13 @@ def diff_staged(request: GitDiffStagedRequest):
     response_model=TextResponse,
     description="Get comparison between two branches or commits.",
 )
-def diff_target(request: GitDiffRequest):
-    repo = get_repo(request.repo_path)
-    diff = repo.git.diff(request.target)
-    return TextResponse(result=diff)
+async def diff_target(request: GitDiffRequest):
+    return await diff_response(
+        "diff",
+        request.repo_path,
+        ["diff", "--end-of-options", request.target],
+        request,
+    )
 
 
 @app.post(
@@ -179,55 +1100,144 @@ def diff_target(request: GitDiffRequest):
     response_model=TextResponse,
     description="Commit staged changes to the repository.",
 )
-def commit_changes(request: GitCommitRequest):
-    repo = get_repo(request.repo_path)
-    commit = repo.index.commit(request.message)
+async def commit_changes(request: GitCommitRequest):
+    commit = await locked(
+        "commit",
+        request.repo_path,
+        lambda repo: repo.index.commit(request.message),
+        write=True,
+    )
     return TextResponse(result=f"Committed changes with hash {commit.hexsha}")
 
 
 @app.post("/add", response_model=TextResponse, description="Stage files for commit.")
-def add_files(request: GitAddRequest):
-    repo = get_repo(request.repo_path)
-    repo.index.add(request.files)
+async def add_files(request: GitAddRequest):
+    await locked(
+        "add", request.repo_path, lambda repo: repo.index.add(request.files), write=True
+    )
     return TextResponse(result="Files staged successfully.")
 
 
 @app.post(
     "/reset", response_model=TextResponse, description="Unstage all staged changes."
 )
-def reset_changes(request: GitResetRequest):
-    repo = get_repo(request.repo_path)
-    repo.index.reset()
+async def reset_changes(request: GitResetRequest):
+    await locked(
+        "reset", request.repo_path, lambda repo: repo.index.reset(), write=True
+    )
     return TextResponse(result="All staged changes reset.")
 
 
 @app.post(
     "/log",
     response_model=LogResponse,
-    description="Get recent commit history of the repository.",
+    description="Get commit history as structured records, newest first. Filter by "
+    "ref, paths, author and date, and page through long histories with next_cursor.",
 )
-def get_log(request: GitLogRequest):
-    repo = get_repo(request.repo_path)
-    commits = [
-        f"Commit: {commit.hexsha}\n"
-        f"Author: {commit.author}\n"
-        f"Date: {commit.authored_datetime}\n"
-        f"Message: {commit.message.strip()}\n"
-        for commit in repo.iter_commits(max_count=request.max_count)
-    ]
-    return LogResponse(commits=commits)
+async def get_log(request: GitLogRequest):
+    root = await locate_graphed(request.repo_path)
+    filters = log_filters(request)
+    # Without filters that hide commits from the walk, a page resumes from
+    # the commits git still had queued when the last one ended, so deep
+    # pages cost no more than the first. Paths, author and until hide
+    # commits whose parents the walk still needs, so those pages skip over
+    # the earlier ones instead.
+    resumable = not (request.paths or request.author or request.until)
+
+    async def walk(cursor: LogCursor):
+        args = ["log", "-z", f"--format={LOG_FORMAT}"]
+        if cursor.frontier:
+            revisions = cursor.frontier
+        else:
+            revisions = [cursor.start]
+            args.append(f"--skip={cursor.offset}")
+        seen = set(cursor.seen)
+        args.append(f"--max-count={request.max_count + 1 + len(seen)}")
+        if request.author:
+            args.append(f"--author={request.author}")
+        if request.since:
+            args.append(f"--since={request.since}")
+        if request.until:
+            args.append(f"--until={request.until}")
+        args += ["--end-of-options", *revisions, "--", *request.paths]
+        # walked also holds commits earlier pages returned, which are not
+        # returned again.
+        walked, commits, more, ordered = [], [], False, True
+        previous = cursor.tied if cursor.offset else None
+        async with aclosing(runner.stream(root, *args)) as stdout:
+            async for fields in log_fields(stdout):
+                commit = commit_record(fields)
+                if commit.sha not in seen:
+                    if len(commits) == request.max_count:
+                        more = True
+                        break
+                    commits.append(commit)
+                walked.append(commit)
+                committed = datetime.fromisoformat(commit.committed_date)
+                if previous is not None and committed.timestamp() > previous:
+                    # A commit dated after its child. Resuming only
+                    # holds up while commit dates never go up.
+                    ordered = False
+                    if cursor.frontier and cursor.offset:
+                        break
+                previous = committed.timestamp()
+        return walked, commits, more, ordered
+
+    try:
+        async with runner.command("log", root):
+            # The cursor pins the commit the first page started from, so
+            # pages stay stable while new commits land.
+            if request.cursor:
+                cursor = decode_log_cursor(request.cursor)
+                if cursor.filters != filters:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Cursor does not match these filters",
+                    )
+            else:
+                try:
+                    start = await resolve_commit(root, request.ref or "HEAD")
+                except HTTPException:
+                    # HEAD of a repository with no commits yet.
+                    if request.ref is None:
+                        return LogResponse(commits=[])
+                    raise
+                frontier = [start] if resumable else []
+                cursor = LogCursor(filters, start, 0, frontier, [], 0)
+            walked, commits, more, ordered = await walk(cursor)
+            if not ordered and cursor.frontier and cursor.offset:
+                cursor = cursor._replace(frontier=[], seen=[], tied=0)
+                walked, commits, more, ordered = await walk(cursor)
+    except commands.GitFailed as e:
+        raise git_error(e)
+
+    next_cursor = None
+    if more:
+        if cursor.frontier and ordered:
+            cursor = log_frontier(cursor, walked)
+            if len(cursor.seen) > LOG_CURSOR_SEEN:
+                cursor = cursor._replace(frontier=[], seen=[], tied=0)
+        else:
+            cursor = cursor._replace(
+                offset=cursor.offset + len(commits), frontier=[], seen=[], tied=0
+            )
+        next_cursor = encode_log_cursor(cursor)
+    return LogResponse(commits=commits, next_cursor=next_cursor)
 
 
 @app.post(
     "/create_branch", response_model=TextResponse, description="Create a new branch."
 )
-def create_branch(request: GitCreateBranchRequest):
-    repo = get_repo(request.repo_path)
-    if request.base_branch is None:
-        base_branch = repo.active_branch
-    else:
-        base_branch = repo.refs[request.base_branch]
-    repo.create_head(request.branch_name, base_branch)
+async def create_branch(request: GitCreateBranchRequest):
+    def create(repo: git.Repo) -> str:
+        if request.base_branch is None:
+            base_branch = repo.active_branch
+        else:
+            base_branch = repo.refs[request.base_branch]
+        repo.create_head(request.branch_name, base_branch)
+        return str(base_branch)
+
+    base_branch = await locked("create_branch", request.repo_path, create, write=True)
     return TextResponse(
         result=f"Created branch '{request.branch_name}' from '{base_branch}'."
     )
@@ -236,31 +1246,41 @@ def create_branch(request: GitCreateBranchRequest):
 @app.post(
     "/checkout", response_model=TextResponse, description="Checkout an existing branch."
 )
-def checkout_branch(request: GitCheckoutRequest):
-    repo = get_repo(request.repo_path)
-    repo.git.checkout(request.branch_name)
+async def checkout_branch(request: GitCheckoutRequest):
+    # git checkout takes no --end-of-options either.
+    if request.branch_name.startswith("-"):
+        raise HTTPException(
+            status_code=400, detail=f"Invalid branch name '{request.branch_name}'"
+        )
+    root, _ = await locate(request.repo_path)
+    try:
+        async with runner.command("checkout", root, write=True):
+            await runner.output(root, "checkout", request.branch_name)
+    except commands.GitFailed as e:
+        raise git_error(e)
     return TextResponse(result=f"Switched to branch '{request.branch_name}'.")
 
 
 @app.post(
     "/show",
     response_model=TextResponse,
-    description="Show details and diff of a specific commit.",
+    description="Show details and diff of a specific commit. Merges are diffed "
+    "against their first parent.",
 )
-def show_revision(request: GitShowRequest):
-    repo = get_repo(request.repo_path)
-    commit = repo.commit(request.revision)
-    details = (
-        f"Commit: {commit.hexsha}\n"
-        f"Author: {commit.author}\n"
-        f"Date: {commit.authored_datetime}\n"
-        f"Message: {commit.message.strip()}\n"
-    )
-    diff = commit.diff(
-        commit.parents[0] if commit.parents else git.NULL_TREE, create_patch=True
+async def show_revision(request: GitShowRequest):
+    return await diff_response(
+        "show",
+        request.repo_path,
+        [
+            "show",
+            "-m",
+            "--first-parent",
+            "--format=Commit: %H%nAuthor: %an%nDate: %ai%nMessage: %B",
+            "--end-of-options",
+            request.revision,
+        ],
+        request,
     )
-    diff_text = "\n".join(d.diff.decode("utf-8") for d in diff)
-    return TextResponse(result=details + "\n" + diff_text)
 
 
 @app.post(
@@ -274,3 +1294,585 @@ def init_repo(request: GitInitRequest):
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post(
+    "/grep",
+    response_class=StreamingResponse,
+    description="Search tracked files in the working tree or at a revision with "
+    "git grep. Streams NDJSON: 'match' and 'context' records with path, line and "
+    "text, then a 'summary' record saying whether the limit was reached.",
+)
+async def grep_files(request: GitGrepRequest):
+    # git grep has no --end-of-options, so keep revisions from reading as flags.
+    if request.revision is not None and request.revision.startswith("-"):
+        raise HTTPException(
+            status_code=400, detail=f"Invalid revision '{request.revision}'"
+        )
+    args = ["grep", "-z", "-n", "--column", "-I", "--no-color"]
+    args.append("-F" if request.fixed_strings else "-E")
+    if request.ignore_case:
+        args.append("-i")
+    if request.context:
+        args.append(f"-C{request.context}")
+    if request.max_count:
+        args.append(f"--max-count={request.max_count}")
+    if GREP_THREADS:
+        args.append(f"--threads={GREP_THREADS}")
+    args += ["-e", request.pattern]
+    prefix = b""
+    if request.revision is not None:
+        args.append(request.revision)
+        prefix = f"{request.revision}:".encode()
+    args += ["--", *request.paths]
+    root, _ = await locate(request.repo_path)
+
+    async def output():
+        summary = {}
+        # git grep exits with 1 when nothing matched.
+        async with runner.command("grep", root), aclosing(
+            runner.stream(root, *args, ok=(0, 1))
+        ) as stdout:
+            async for chunk in grep.ndjson_matches(
+                stdout, prefix, request.limit, summary
+            ):
+                yield chunk
+        yield (json.dumps(summary) + "\n").encode()
+
+    return StreamingResponse(
+        await primed(output()), media_type="application/x-ndjson"
+    )
+
+
+@app.get(
+    "/read_blob",
+    response_class=Response,
+    description="Read a file's contents at a revision. The response carries the "
+    "blob sha as a strong ETag; send it back in If-None-Match to get a 304 when "
+    "the file has not changed.",
+)
+async def read_blob(
+    repo_path: str = Query(..., description="File system path to the Git repository."),
+    path: str = Query(..., description="File path relative to the repository root."),
+    revision: str = Query("HEAD", description="Commit, branch or tag to read from."),
+    if_none_match: Optional[str] = Header(None),
+):
+    def read(repo: git.Repo):
+        commit = revision_commit(repo, revision)
+        blob = tree_entry(commit, path)
+        if blob.type != "blob":
+            raise HTTPException(status_code=400, detail=f"'{path}' is not a file")
+        headers = {"ETag": f'"{blob.hexsha}"'}
+        # A full commit sha pins the content for good; names like HEAD must be
+        # revalidated, which the ETag makes cheap.
+        if commit.hexsha == revision.lower():
+            headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            headers["Cache-Control"] = "no-cache"
+        if if_none_match and headers["ETag"] in (
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+        ):
+            return None, headers
+        if blob.size > READ_BLOB_MAX_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"'{path}' is {blob.size} bytes; the limit is "
+                f"{READ_BLOB_MAX_BYTES} (GIT_READ_BLOB_MAX_BYTES)",
+            )
+        data = blob_cache.get(blob.hexsha)
+        if data is None:
+            data = blob.data_stream.read()
+            blob_cache.put(blob.hexsha, data)
+        return data, headers
+
+    data, headers = await locked("read_blob", repo_path, read)
+    if data is None:
+        return Response(status_code=304, headers=headers)
+    # git's own test: a NUL byte near the start means binary.
+    if b"\0" in data[:8000]:
+        media_type = "application/octet-stream"
+    else:
+        media_type = "text/plain; charset=utf-8"
+    return Response(content=data, media_type=media_type, headers=headers)
+
+
+@app.post(
+    "/ls_tree",
+    response_model=LsTreeResponse,
+    description="List the files and directories under a path at a revision, "
+    "descending up to depth levels. Only the trees that are listed are read.",
+)
+async def ls_tree(request: GitLsTreeRequest):
+    def list_tree(repo: git.Repo) -> LsTreeResponse:
+        commit = revision_commit(repo, request.revision)
+        root = tree_entry(commit, request.path)
+        if root.type != "tree":
+            raise HTTPException(
+                status_code=400, detail=f"'{request.path}' is not a directory"
+            )
+        entries: List[TreeEntry] = []
+        level = [root]
+        for _ in range(request.depth):
+            below = []
+            for tree in level:
+                for item in tree:
+                    if len(entries) == request.limit:
+                        return LsTreeResponse(
+                            commit=commit.hexsha, entries=entries, truncated=True
+                        )
+                    entries.append(
+                        TreeEntry(
+                            path=item.path,
+                            type=item.type,
+                            mode=f"{item.mode:06o}",
+                            sha=item.hexsha,
+                        )
+                    )
+                    if item.type == "tree":
+                        below.append(item)
+            level = below
+        return LsTreeResponse(commit=commit.hexsha, entries=entries, truncated=False)
+
+    return await locked("ls_tree", request.repo_path, list_tree)
+
+
+@app.post(
+    "/blame",
+    response_model=BlameResponse,
+    description="Show which commit last changed each line of a file, optionally "
+    "for a range of lines. Results are cached, so repeated blames of the same file "
+    "are cheap, including at later commits that did not touch it.",
+)
+async def blame_file(request: GitBlameRequest):
+    path = request.path.strip("/")
+
+    def resolve(repo: git.Repo) -> str:
+        commit = revision_commit(repo, request.revision)
+        if tree_entry(commit, path).type != "blob":
+            raise HTTPException(status_code=400, detail=f"'{path}' is not a file")
+        return commit.hexsha
+
+    root, _ = await locate(request.repo_path)
+    try:
+        async with runner.command("blame", root):
+            commit = await run_to_completion(leased, request.repo_path, resolve)
+            blame = blame_cache.get(commit, path)
+            if blame is None:
+                # The last commit to change the file has the same blame for it.
+                output = await runner.output(
+                    root, "rev-list", "-1", commit, "--", f":(literal){path}"
+                )
+                origin = output.decode().strip()
+                blame = blame_cache.get_origin(commit, origin, path)
+                if blame is None:
+                    blame = parse_porcelain(
+                        await runner.output(
+                            root, "blame", "--porcelain", origin, "--", path
+                        )
+                    )
+                    blame_cache.put(commit, origin, path, blame)
+    except commands.GitFailed as e:
+        raise git_error(e)
+
+    total = len(blame.lines)
+    end = total if request.end_line is None else min(request.end_line, total)
+    lines = []
+    for number in range(request.start_line, end + 1):
+        sha, original, text = blame.lines[number - 1]
+        info = blame.commits[sha]
+        lines.append(
+            BlameLine(
+                line=number,
+                sha=sha,
+                original_line=original,
+                author=info.get("author", ""),
+                author_email=info.get("author-mail", "").strip("<>"),
+                author_time=int(info.get("author-time", 0)),
+                summary=info.get("summary", ""),
+                text=text,
+            )
+        )
+    return BlameResponse(commit=commit, total_lines=total, lines=lines)
+
+
+@app.post(
+    "/merge_base",
+    response_model=MergeBaseResponse,
+    description="Find the best common ancestor of two or more commits, e.g. the "
+    "commit a branch forked from.",
+)
+async def merge_base(request: GitMergeBaseRequest):
+    root = await locate_graphed(request.repo_path)
+    args = ["merge-base"]
+    if request.all:
+        args.append("--all")
+    # Without --octopus, git would pair the first revision with a merge of
+    # the rest rather than look for an ancestor common to all of them.
+    if len(request.revisions) > 2:
+        args.append("--octopus")
+    args += ["--end-of-options", *request.revisions]
+    try:
+        async with runner.command("merge_base", root):
+            # Exit status 1 means the histories share no commit.
+            output = await runner.output(root, *args, ok=(0, 1))
+    except commands.GitFailed as e:
+        raise git_error(e)
+    return MergeBaseResponse(merge_bases=output.decode().split())
+
+
+@app.post(
+    "/is_ancestor",
+    response_model=IsAncestorResponse,
+    description="Check whether one commit is an ancestor of another, e.g. whether "
+    "a branch has been merged into main.",
+)
+async def is_ancestor(request: GitIsAncestorRequest):
+    root = await locate_graphed(request.repo_path)
+    try:
+        async with runner.command("is_ancestor", root):
+            ancestor = await resolve_commit(root, request.ancestor)
+            descendant = await resolve_commit(root, request.descendant)
+            try:
+                await runner.output(
+                    root,
+                    "merge-base",
+                    "--is-ancestor",
+                    "--end-of-options",
+                    ancestor,
+                    descendant,
+                )
+                answer = True
+            except commands.GitFailed as e:
+                # Exit status 1 means no; anything else is a real failure.
+                if e.status != 1 or isinstance(e, commands.GitTimeout):
+                    raise
+                answer = False
+    except commands.GitFailed as e:
+        raise git_error(e)
+    return IsAncestorResponse(
+        ancestor=ancestor, descendant=descendant, is_ancestor=answer
+    )
+
+
+@app.post(
+    "/ahead_behind",
+    response_model=AheadBehindResponse,
+    description="Count the commits each revision has that base lacks (ahead) and "
+    "that base has that the revision lacks (behind).",
+)
+async def ahead_behind(request: GitAheadBehindRequest):
+    root = await locate_graphed(request.repo_path)
+    try:
+        async with runner.command("ahead_behind", root):
+            base = await resolve_commit(root, request.base)
+
+            async def compare(revision: str) -> AheadBehind:
+                sha = await resolve_commit(root, revision)
+                ahead, behind = await count_ahead_behind(root, base, sha)
+                return AheadBehind(
+                    revision=revision, sha=sha, ahead=ahead, behind=behind
+                )
+
+            results = await gather_bounded(
+                [compare(revision) for revision in request.revisions],
+                ANCESTRY_PROCESSES,
+            )
+    except commands.GitFailed as e:
+        raise git_error(e)
+    return AheadBehindResponse(base=base, results=results)
+
+
+@app.post(
+    "/branches",
+    response_model=BranchesResponse,
+    description="List branches, most recently committed first, with their upstream "
+    "and how far ahead of and behind it they are. Pass base to also count commits "
+    "ahead of and behind a branch such as main.",
+)
+async def list_branches(request: GitBranchesRequest):
+    root = await locate_graphed(request.repo_path)
+    patterns = ["refs/heads"]
+    if request.remotes:
+        patterns.append("refs/remotes")
+    try:
+        async with runner.command("branches", root):
+            base = None
+            if request.base is not None:
+                base = await resolve_commit(root, request.base)
+            output = await runner.output(
+                root,
+                "for-each-ref",
+                "--sort=-committerdate",
+                f"--format={BRANCH_FORMAT}",
+                *patterns,
+            )
+            # No --count: it would count the symbolic refs skipped below.
+            branches = list(islice(parse_branches(output), request.limit + 1))
+            truncated = len(branches) > request.limit
+            del branches[request.limit :]
+            if base is not None:
+
+                async def compare(branch: BranchRecord) -> None:
+                    branch.ahead, branch.behind = await count_ahead_behind(
+                        root, base, branch.sha
+                    )
+
+                await gather_bounded(
+                    [compare(branch) for branch in branches], ANCESTRY_PROCESSES
+                )
+    except commands.GitFailed as e:
+        raise git_error(e)
+    return BranchesResponse(base=base, branches=branches, truncated=truncated)
+
+
+@app.post(
+    "/search_commits",
+    response_model=SearchCommitsResponse,
+    description="Find commits by message, author or content change, newest first: "
+    "e.g. the commit that introduced a function (pickaxe) or mentioned an issue "
+    "(message). Narrow with ref and paths; stream to see matches as they are found.",
+)
+async def search_commits(request: GitSearchCommitsRequest):
+    if request.message is None and request.author is None and request.pickaxe is None:
+        raise HTTPException(
+            status_code=400, detail="Give at least one of message, author or pickaxe"
+        )
+    root, git_dir = await locate(request.repo_path)
+    commit_graphs.refresh(root, git_dir)
+    # Pickaxe and path-limited searches need diffs, which only git has.
+    use_index = message_index.enabled and request.pickaxe is None and not request.paths
+    if use_index:
+        flags = re.MULTILINE | (re.IGNORECASE if request.ignore_case else 0)
+        try:
+            message = request.message and re.compile(request.message, flags)
+            author = request.author and re.compile(request.author, flags)
+        except re.error as e:
+            raise HTTPException(status_code=400, detail=f"Invalid pattern: {e}")
+    args = ["log", "-z", f"--format={LOG_FORMAT}", f"--max-count={request.limit + 1}"]
+    args.append("-E")
+    if request.ignore_case:
+        args.append("-i")
+    if request.message is not None:
+        args.append(f"--grep={request.message}")
+    if request.author is not None:
+        args.append(f"--author={request.author}")
+    if request.pickaxe is not None:
+        flag = "-S" if request.pickaxe_mode == PickaxeMode.STRING else "-G"
+        args.append(f"{flag}{request.pickaxe}")
+    summary = {"type": "summary", "matches": 0, "truncated": False, "indexed": False}
+
+    async def commits() -> AsyncIterator[CommitRecord]:
+        async with runner.command("search_commits", root):
+            try:
+                start = await resolve_commit(root, request.ref or "HEAD")
+            except HTTPException:
+                # HEAD of a repository with no commits yet.
+                if request.ref is None:
+                    return
+                raise
+            indexed = use_index and await index_messages(root, git_dir, start)
+            if indexed:
+                found, summary["truncated"] = await run_to_completion(
+                    message_index.search, indexed, start, message, author, request.limit
+                )
+                summary["indexed"] = True
+                for fields in found:
+                    summary["matches"] += 1
+                    yield commit_record(list(fields))
+                return
+            scope = ["--end-of-options", start, "--", *request.paths]
+            async with aclosing(runner.stream(root, *args, *scope)) as stdout:
+                async for fields in log_fields(stdout):
+                    if summary["matches"] == request.limit:
+                        summary["truncated"] = True
+                        break
+                    summary["matches"] += 1
+                    yield commit_record(fields)
+
+    if request.stream:
+
+        async def output():
+            async with aclosing(commits()) as records:
+                async for commit in records:
+                    record = {"type": "commit", **commit.model_dump()}
+                    yield (json.dumps(record) + "\n").encode()
+            yield (json.dumps(summary) + "\n").encode()
+
+        return StreamingResponse(
+            await primed(output()), media_type="application/x-ndjson"
+        )
+    try:
+        found = [commit async for commit in commits()]
+    except commands.GitFailed as e:
+        raise git_error(e)
+    return SearchCommitsResponse(
+        commits=found, truncated=summary["truncated"], indexed=summary["indexed"]
+    )
+
+
+@app.get(
+    "/metrics",
+    response_model=MetricsResponse,
+    description="Repository handle pool and cache statistics, including hit rates, "
+    "and queue depth and latency for each kind of git command.",
+)
+async def get_metrics():
+    return MetricsResponse(
+        repo_pool=repo_pool.stats(),
+        blob_cache=blob_cache.stats(),
+        blame_cache=blame_cache.stats(),
+        status_cache=status_cache.stats(),
+        commit_graph=commit_graphs.stats(),
+        message_index=message_index.stats(),
+        commands=runner.metrics(),
+    )
+
+
+# ----------------- BATCH ENDPOINTS -----------------
+
+
+# Shared by all batch requests, so one huge batch cannot start git in
+# thousands of repositories at once.
+batch_slots = asyncio.Semaphore(BATCH_WORKERS)
+
+
+def is_repository(path: str) -> bool:
+    return os.path.exists(os.path.join(path, ".git")) or (
+        os.path.isfile(os.path.join(path, "HEAD"))
+        and os.path.isdir(os.path.join(path, "objects"))
+    )
+
+
+def batch_repositories(targets: BatchTargets) -> List[str]:
+    repos = list(dict.fromkeys(targets.repo_paths))
+    if targets.parent_dir is not None:
+        if not os.path.isdir(targets.parent_dir):
+            raise HTTPException(
+                status_code=400, detail=f"'{targets.parent_dir}' is not a directory"
+            )
+        level = [targets.parent_dir]
+        for _ in range(targets.depth):
+            below = []
+            for directory in level:
+                try:
+                    children = sorted(os.scandir(directory), key=lambda d: d.name)
+                except OSError:
+                    continue
+                for child in children:
+                    if not child.is_dir() or child.name.startswith("."):
+                        continue
+                    if is_repository(child.path):
+                        repos.append(child.path)
+                    else:
+                        below.append(child.path)
+            level = below
+        repos = list(dict.fromkeys(repos))
+    if len(repos) > BATCH_MAX_REPOS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{len(repos)} repositories requested; the limit is "
+            f"{BATCH_MAX_REPOS} (GIT_BATCH_MAX_REPOS)",
+        )
+    return repos
+
+
+async def fan_out(
+    repos: List[str], run: Callable[[str], Awaitable[Any]], timeout: float
+) -> AsyncIterator[bytes]:
+    """
+    Run `run(repo_path)` for every repository, GIT_BATCH_WORKERS at a time
+    across all batches, and stream one NDJSON record per repository as each
+    finishes, then a summary. Each repository gets `timeout` seconds once it
+    starts; git commands still running then are killed. Errors are reported
+    per repository.
+    """
+
+    async def one(repo_path: str) -> dict:
+        async with batch_slots:
+            try:
+                result = await asyncio.wait_for(run(repo_path), timeout)
+                return {
+                    "type": "result",
+                    "repo_path": repo_path,
+                    "result": jsonable_encoder(result),
+                }
+            except asyncio.TimeoutError:
+                return {
+                    "type": "error",
+                    "repo_path": repo_path,
+                    "status_code": 504,
+                    "detail": f"timed out after {timeout} seconds",
+                }
+            except HTTPException as e:
+                return {
+                    "type": "error",
+                    "repo_path": repo_path,
+                    "status_code": e.status_code,
+                    "detail": e.detail,
+                }
+            except Exception as e:
+                logger.exception("Batch request failed for %s", repo_path)
+                return {
+                    "type": "error",
+                    "repo_path": repo_path,
+                    "status_code": 500,
+                    "detail": str(e),
+                }
+
+    tasks = [asyncio.ensure_future(one(repo_path)) for repo_path in repos]
+    errors = 0
+    try:
+        for finished in asyncio.as_completed(tasks):
+            record = await finished
+            errors += record["type"] == "error"
+            yield (json.dumps(record) + "\n").encode()
+    finally:
+        # Client went away: stop the repositories still queued or running,
+        # and wait until they have given up their slots and locks.
+        for task in tasks:
+            task.cancel()
+        await asyncio.shield(asyncio.gather(*tasks, return_exceptions=True))
+    summary = {"type": "summary", "repos": len(repos), "errors": errors}
+    yield (json.dumps(summary) + "\n").encode()
+
+
+@app.post(
+    "/batch/status",
+    response_class=StreamingResponse,
+    description="Run /status across many repositories concurrently. Streams one "
+    "NDJSON 'result' or 'error' record per repository as each finishes, then a "
+    "'summary' record.",
+)
+def batch_status(request: GitBatchStatusRequest):
+    options = request.model_dump(include={"untracked", "paths"})
+    return StreamingResponse(
+        fan_out(
+            batch_repositories(request),
+            lambda repo_path: get_status(
+                GitStatusRequest(repo_path=repo_path, **options)
+            ),
+            request.timeout_seconds,
+        ),
+        media_type="application/x-ndjson",
+    )
+
+
+@app.post(
+    "/batch/log",
+    response_class=StreamingResponse,
+    description="Run /log across many repositories concurrently. Streams one "
+    "NDJSON 'result' or 'error' record per repository as each finishes, then a "
+    "'summary' record.",
+)
+def batch_log(request: GitBatchLogRequest):
+    options = request.model_dump(
+        include={"max_count", "ref", "paths", "author", "since", "until"}
+    )
+    return StreamingResponse(
+        fan_out(
+            batch_repositories(request),
+            lambda repo_path: get_log(GitLogRequest(repo_path=repo_path, **options)),
+            request.timeout_seconds,
+        ),
+        media_type="application/x-ndjson",
+    )
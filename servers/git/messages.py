@@ -0,0 +1,154 @@
+import asyncio
+import heapq
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Pattern, Set, Tuple
+
+# The fields of one LOG_FORMAT record: sha, parents, author name, author
+# email, authored date, committer name, committer email, committed date and
+# the raw message.
+Fields = Tuple[str, ...]
+
+
+class RepoMessages:
+    """The indexed part of one repository's history."""
+
+    def __init__(self):
+        # sha -> (commit timestamp, parent shas, fields)
+        self.commits: Dict[str, Tuple[float, Tuple[str, ...], Fields]] = {}
+        # Commits whose ancestors are all indexed, and whose ancestors
+        # together make up the whole index.
+        self.tips: Set[str] = set()
+        self.updating = asyncio.Lock()
+
+
+class MessageIndex:
+    """
+    Commit messages and authors kept in memory per repository, so message
+    and author searches walk parents in memory rather than having git read
+    every commit again.
+
+    A repository's index holds every ancestor of every commit it holds, so
+    bringing it up to date for a new ref tip only has git read the commits
+    made since: `git log <tip> --not <tips>`. Repositories are dropped least
+    recently used first once the index holds more than `max_commits`
+    commits, and one whose history alone is larger is not indexed at all.
+    Patterns are Python regular expressions, which agree with git's extended
+    regexps for everything but exotic syntax.
+    """
+
+    def __init__(self, max_commits: int = 0):
+        self.max_commits = max_commits
+        self._lock = threading.Lock()
+        self._repos: "OrderedDict[str, RepoMessages]" = OrderedDict()
+        self._too_large: Set[str] = set()
+        self.commits = 0
+        self.searches = 0
+        self.updates = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_commits > 0
+
+    def repo(self, git_dir: str) -> Optional[RepoMessages]:
+        """The repository's index, created empty if needed; None if too large."""
+        with self._lock:
+            if git_dir in self._too_large:
+                return None
+            messages = self._repos.get(git_dir)
+            if messages is None:
+                messages = self._repos[git_dir] = RepoMessages()
+            self._repos.move_to_end(git_dir)
+            return messages
+
+    def room(self, git_dir: str) -> int:
+        """How many more commits the repository may add to its index."""
+        with self._lock:
+            messages = self._repos.get(git_dir)
+            return self.max_commits - (len(messages.commits) if messages else 0)
+
+    def add(
+        self, git_dir: str, messages: RepoMessages, tip: str, new: List[Fields]
+    ) -> bool:
+        """
+        Record the commits `git log <tip> --not <tips>` returned. False if
+        `messages` was evicted since `repo()` handed it out.
+        """
+        with self._lock:
+            if self._repos.get(git_dir) is not messages:
+                return False
+            for fields in new:
+                parents = tuple(fields[1].split())
+                # Reached from the new tip, so no longer needed as a boundary.
+                messages.tips.difference_update(parents)
+                timestamp = datetime.fromisoformat(fields[7]).timestamp()
+                messages.commits[fields[0]] = (timestamp, parents, fields)
+            messages.tips.add(tip)
+            self.commits += len(new)
+            self.updates += 1
+            while self.commits > self.max_commits and len(self._repos) > 1:
+                evicted_dir, evicted = next(iter(self._repos.items()))
+                if evicted_dir == git_dir:
+                    self._repos.move_to_end(git_dir)
+                    continue
+                del self._repos[evicted_dir]
+                self.commits -= len(evicted.commits)
+            return True
+
+    def too_large(self, git_dir: str) -> None:
+        with self._lock:
+            messages = self._repos.pop(git_dir, None)
+            if messages is not None:
+                self.commits -= len(messages.commits)
+            self._too_large.add(git_dir)
+
+    def search(
+        self,
+        messages: RepoMessages,
+        start: str,
+        message: Optional[Pattern],
+        author: Optional[Pattern],
+        limit: int,
+    ) -> Tuple[List[Fields], bool]:
+        """
+        Commits reachable from `start`, newest first, whose message and
+        "Name <email>" match the given patterns. Returns up to `limit` of
+        them and whether there were more. Takes the index `index_messages`
+        brought up to date rather than looking it up again, so evicting the
+        repository meanwhile cannot empty the result.
+        """
+        with self._lock:
+            self.searches += 1
+        commits = messages.commits
+        found: List[Fields] = []
+        if start not in commits:
+            return found, False
+        heap = [(-commits[start][0], start)]
+        seen = {start}
+        while heap:
+            _, sha = heapq.heappop(heap)
+            _, parents, fields = commits[sha]
+            if (message is None or message.search(fields[8])) and (
+                author is None or author.search(f"{fields[2]} <{fields[3]}>")
+            ):
+                if len(found) == limit:
+                    return found, True
+                found.append(fields)
+            for parent in parents:
+                # Parents missing from the index lie past a shallow boundary.
+                if parent not in seen and parent in commits:
+                    seen.add(parent)
+                    heapq.heappush(heap, (-commits[parent][0], parent))
+        return found, False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "repos": len(self._repos),
+                "commits": self.commits,
+                "too_large": len(self._too_large),
+                "updates": self.updates,
+                "searches": self.searches,
+            }
@@ -0,0 +1,180 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+import git
+
+logger = logging.getLogger(__name__)
+
+
+class Lease:
+    """A pooled handle lent to one request; use as a context manager."""
+
+    def __init__(self, pool: "RepoPool", path: str, repo: git.Repo):
+        self.pool = pool
+        self.path = path
+        self.repo = repo
+
+    def __enter__(self) -> git.Repo:
+        return self.repo
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is None or issubclass(exc_type, self.pool.reusable_errors):
+            self.pool._release(self.path, self.repo)
+        else:
+            self.pool._discard(self.path, self.repo)
+        return False
+
+
+class RepoPool:
+    """
+    Long-lived git.Repo handles keyed by the repository's real path.
+
+    A Repo keeps its `git cat-file --batch` / `--batch-check` processes alive,
+    so object lookups on a pooled handle do not spawn anything. Those pipes
+    are not safe to share between threads, so each handle is lent to one
+    request at a time; a repository gets up to `per_repo` handles for
+    concurrent requests. Handles idle for `idle_seconds` are closed, as are
+    the least recently used idle ones once more than `max_handles` exist. A
+    handle whose request raised is closed rather than reused, in case a
+    half-read reply is left in its pipes, unless the exception is one of
+    `reusable_errors`: errors raised only after git has answered in full.
+    """
+
+    def __init__(
+        self,
+        max_handles: int = 64,
+        per_repo: int = 4,
+        idle_seconds: float = 300.0,
+        reusable_errors: Tuple[type, ...] = (),
+    ):
+        self.max_handles = max_handles
+        self.per_repo = per_repo
+        self.idle_seconds = idle_seconds
+        # A generator holding a lease can only be closed while suspended at a
+        # yield, never halfway through a git call.
+        self.reusable_errors = (GeneratorExit, *reusable_errors)
+        self._cond = threading.Condition()
+        # Idle handles, least recently released first, keyed by (path, id).
+        self._idle: "OrderedDict[Tuple[str, int], Tuple[git.Repo, float]]" = (
+            OrderedDict()
+        )
+        self._open: Dict[str, int] = {}
+        self._total = 0
+        self.created = 0
+        self.reused = 0
+        self._stopped = threading.Event()
+        if idle_seconds > 0:
+            threading.Thread(
+                target=self._reap, name="git-repo-reaper", daemon=True
+            ).start()
+
+    def lease(self, repo_path: str) -> Lease:
+        """
+        Take a handle for `repo_path`, opening one if none is idle. Raises the
+        usual git.Repo errors right away for paths that are not repositories.
+        """
+        path = os.path.realpath(repo_path)
+        return Lease(self, path, self._acquire(path))
+
+    def close(self) -> None:
+        self._stopped.set()
+        with self._cond:
+            idle = [repo for repo, _ in self._idle.values()]
+            self._idle.clear()
+        for repo in idle:
+            self._close(repo)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "open": self._total,
+                "idle": len(self._idle),
+                "created": self.created,
+                "reused": self.reused,
+            }
+
+    # --- internals ------------------------------------------------------------
+    def _acquire(self, path: str) -> git.Repo:
+        with self._cond:
+            while True:
+                for key in self._idle:
+                    if key[0] == path:
+                        repo, _ = self._idle.pop(key)
+                        self.reused += 1
+                        return repo
+                if self._open.get(path, 0) < self.per_repo:
+                    break
+                self._cond.wait()
+            # Reserve the slot before the (slow) open outside the lock.
+            self._open[path] = self._open.get(path, 0) + 1
+            self._total += 1
+            evicted = self._over_capacity()
+        for repo in evicted:
+            self._close(repo)
+        try:
+            repo = git.Repo(path)
+        except BaseException:
+            self._forget(path)
+            raise
+        with self._cond:
+            self.created += 1
+        return repo
+
+    def _release(self, path: str, repo: git.Repo) -> None:
+        with self._cond:
+            self._idle[(path, id(repo))] = (repo, time.monotonic())
+            evicted = self._over_capacity()
+            self._cond.notify_all()
+        for repo in evicted:
+            self._close(repo)
+
+    def _discard(self, path: str, repo: git.Repo) -> None:
+        self._close(repo)
+        self._forget(path)
+
+    def _forget(self, path: str) -> None:
+        with self._cond:
+            self._drop_slot(path)
+
+    def _drop_slot(self, path: str) -> None:
+        # Caller holds the lock.
+        self._open[path] -= 1
+        if not self._open[path]:
+            del self._open[path]
+        self._total -= 1
+        self._cond.notify_all()
+
+    def _over_capacity(self) -> List[git.Repo]:
+        # Caller holds the lock.
+        evicted = []
+        while self._total > self.max_handles and self._idle:
+            (path, _), (repo, _) = self._idle.popitem(last=False)
+            self._drop_slot(path)
+            evicted.append(repo)
+        return evicted
+
+    def _close(self, repo: git.Repo) -> None:
+        try:
+            repo.close()
+        except Exception:
+            logger.exception("Failed to close repository %s", repo.working_dir)
+
+    def _reap(self) -> None:
+        interval = min(max(self.idle_seconds / 4, 1.0), 30.0)
+        while not self._stopped.wait(interval):
+            cutoff = time.monotonic() - self.idle_seconds
+            with self._cond:
+                expired = [
+                    (key, repo)
+                    for key, (repo, released) in self._idle.items()
+                    if released < cutoff
+                ]
+                for key, _ in expired:
+                    del self._idle[key]
+                    self._drop_slot(key[0])
+            for _, repo in expired:
+                self._close(repo)
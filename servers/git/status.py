@@ -0,0 +1,117 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+
+# Fields before the path on each kind of porcelain v2 entry line.
+ENTRY_FIELDS = {"1": 8, "2": 9, "u": 10, "?": 1, "!": 1}
+ENTRY_KINDS = {
+    "1": "changed",
+    "2": "renamed",
+    "u": "unmerged",
+    "?": "untracked",
+    "!": "ignored",
+}
+
+
+def parse_porcelain_v2(output: bytes) -> dict:
+    """
+    Parse `git status --porcelain=v2 -z --branch` into a branch summary and a
+    list of entries. Each record is NUL-terminated; a rename's original path
+    follows as a record of its own.
+    """
+    branch = dict.fromkeys(["oid", "head", "upstream", "ahead", "behind"])
+    entries: List[dict] = []
+    records = iter(output.split(b"\0"))
+    for raw in records:
+        if not raw:
+            continue
+        record = raw.decode("utf-8", "replace")
+        if record.startswith("# "):
+            key, _, value = record[2:].partition(" ")
+            if key == "branch.oid":
+                branch["oid"] = None if value == "(initial)" else value
+            elif key == "branch.head":
+                branch["head"] = None if value == "(detached)" else value
+            elif key == "branch.upstream":
+                branch["upstream"] = value
+            elif key == "branch.ab":
+                ahead, behind = value.split()
+                branch["ahead"], branch["behind"] = int(ahead), -int(behind)
+            continue
+        kind = record[0]
+        fields = record.split(" ", ENTRY_FIELDS[kind])
+        entry = {"kind": ENTRY_KINDS[kind], "path": fields[-1]}
+        if kind in "12u":
+            entry["index"] = fields[1][0]
+            entry["worktree"] = fields[1][1]
+            entry["submodule"] = fields[2] != "N..."
+        if kind == "2":
+            entry["score"] = fields[8]
+            entry["orig_path"] = next(records).decode("utf-8", "replace")
+        entries.append(entry)
+    return {"branch": branch, "entries": entries}
+
+
+def index_stamp(git_dir: str) -> Tuple:
+    """Changes whenever the index or HEAD is rewritten."""
+    stamp = []
+    for name in ("index", "HEAD"):
+        try:
+            st = os.stat(os.path.join(git_dir, name))
+            stamp.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+class StatusCache:
+    """
+    Status results kept for `ttl_seconds` while the index and HEAD are
+    unchanged. Staging, committing and checking out all rewrite one of them,
+    so the TTL only bounds how long edits to tracked or untracked files can
+    go unseen.
+    """
+
+    def __init__(self, ttl_seconds: float = 2.0, max_entries: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> (index stamp, expiry, result)
+        self._results: "OrderedDict[Hashable, Tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, stamp: Tuple) -> Optional[dict]:
+        with self._lock:
+            cached = self._results.get(key)
+            if (
+                cached is not None
+                and cached[0] == stamp
+                and cached[1] > time.monotonic()
+            ):
+                self._results.move_to_end(key)
+                self.hits += 1
+                return cached[2]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, stamp: Tuple, result: dict) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._results[key] = (stamp, time.monotonic() + self.ttl_seconds, result)
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._results),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+            }
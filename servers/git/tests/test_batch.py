@@ -0,0 +1,46 @@
+import asyncio
+import json
+
+import main
+
+
+def test_closing_fan_out_waits_for_cancelled_repositories():
+    released = []
+
+    async def run(repo_path):
+        if repo_path == "fast":
+            return {"ok": True}
+        try:
+            await asyncio.sleep(60)
+        finally:
+            # Stands in for git being killed and its lock released.
+            await asyncio.sleep(0)
+            released.append(repo_path)
+
+    async def first_record_then_close():
+        records = main.fan_out(["fast", "slow", "slower"], run, timeout=60)
+        record = json.loads(await records.__anext__())
+        await records.aclose()
+        # Released before aclose() returns, not at some later turn of the loop.
+        assert sorted(released) == ["slow", "slower"]
+        return record
+
+    assert asyncio.run(first_record_then_close())["repo_path"] == "fast"
+
+
+def test_fan_out_reports_each_repository_and_a_summary():
+    async def run(repo_path):
+        if repo_path == "bad":
+            raise main.HTTPException(status_code=404, detail="missing")
+        return {"repo": repo_path}
+
+    async def collect():
+        return [json.loads(line) async for line in main.fan_out(["a", "bad"], run, 5)]
+
+    records = asyncio.run(collect())
+    by_type = {}
+    for record in records:
+        by_type.setdefault(record["type"], []).append(record)
+    assert [r["repo_path"] for r in by_type["result"]] == ["a"]
+    assert by_type["error"][0]["status_code"] == 404
+    assert by_type["summary"] == [{"type": "summary", "repos": 2, "errors": 1}]
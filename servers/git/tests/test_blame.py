@@ -0,0 +1,129 @@
+import os
+import subprocess
+
+from fastapi.testclient import TestClient
+
+import main
+from blame import Blame, BlameCache, parse_porcelain
+
+A = "a" * 40
+B = "b" * 40
+
+PORCELAIN = (
+    f"{A} 1 1 2\n"
+    "author Ann\n"
+    "author-mail <ann@x>\n"
+    "author-time 1700000000\n"
+    "summary first\n"
+    "filename f.txt\n"
+    "\tone\n"
+    f"{A} 2 2\n"
+    "\ttwo\n"
+    f"{B} 1 3 1\n"
+    "author Bob\n"
+    "summary second\n"
+    "previous 0123 f.txt\n"
+    "filename f.txt\n"
+    "\t\tindented\n"
+).encode()
+
+
+def test_parse_porcelain_reads_lines_and_commit_details():
+    blame = parse_porcelain(PORCELAIN)
+    assert blame.lines == [(A, 1, "one"), (A, 2, "two"), (B, 1, "\tindented")]
+    assert blame.commits[A] == {
+        "author": "Ann",
+        "author-mail": "<ann@x>",
+        "author-time": "1700000000",
+        "summary": "first",
+    }
+    assert blame.commits[B] == {"author": "Bob", "summary": "second"}
+
+
+def blame_of(lines):
+    blame = Blame()
+    blame.lines = [(A, i, "x") for i in range(lines)]
+    return blame
+
+
+def test_cache_shares_an_entry_between_commits_with_the_same_origin():
+    cache = BlameCache()
+    assert cache.get("c1", "f") is None
+    assert cache.get_origin("c1", "o", "f") is None
+    entry = blame_of(2)
+    cache.put("c1", "o", "f", entry)
+    assert cache.get("c1", "f") is entry
+    assert cache.get("c2", "f") is None
+    assert cache.get_origin("c2", "o", "f") is entry
+    assert cache.get("c2", "f") is entry
+    assert cache.stats() == {
+        "entries": 1,
+        "lines": 2,
+        "hits": 2,
+        "reused": 1,
+        "misses": 1,
+        "hit_rate": 0.75,
+    }
+
+
+def test_cache_evicts_by_lines_but_keeps_the_newest_entry():
+    cache = BlameCache(max_lines=5)
+    cache.put("c1", "o1", "f", blame_of(3))
+    cache.put("c2", "o2", "f", blame_of(3))
+    assert cache.get("c1", "f") is None
+    assert cache.get("c2", "f") is not None
+    cache.put("c3", "o3", "f", blame_of(10))
+    assert cache.stats()["entries"] == 1 and cache.get("c3", "f") is not None
+
+
+def test_blame_endpoint_reuses_the_blame_of_unchanged_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "blame_cache", BlameCache())
+
+    def git(*args):
+        env = dict(os.environ, GIT_AUTHOR_DATE="1700000000 +0000")
+        return subprocess.run(
+            ["git", "-c", "user.name=Ann", "-c", "user.email=ann@x", *args],
+            cwd=tmp_path,
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+
+    git("init", "-q")
+    (tmp_path / "f.txt").write_text("one\ntwo\nthree\n")
+    git("add", "f.txt")
+    git("commit", "-q", "-m", "add f")
+    first = git("rev-parse", "HEAD")
+    (tmp_path / "g.txt").write_text("other\n")
+    git("add", "g.txt")
+    git("commit", "-q", "-m", "add g")
+
+    client = TestClient(main.app)
+
+    def blame(**request):
+        response = client.post(
+            "/blame", json={"repo_path": str(tmp_path), "path": "f.txt", **request}
+        )
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    body = blame(revision=first, start_line=2, end_line=9)
+    assert body["total_lines"] == 3
+    assert [line["line"] for line in body["lines"]] == [2, 3]
+    assert body["lines"][0] == {
+        "line": 2,
+        "sha": first,
+        "original_line": 2,
+        "author": "Ann",
+        "author_email": "ann@x",
+        "author_time": 1700000000,
+        "summary": "add f",
+        "text": "two",
+    }
+    assert blame()["lines"] == blame(revision=first)["lines"]
+
+    stats = client.get("/metrics").json()["blame_cache"]
+    assert (stats["misses"], stats["reused"], stats["hits"]) == (1, 1, 1)
+    response = client.post("/blame", json={"repo_path": str(tmp_path), "path": ""})
+    assert response.status_code == 400
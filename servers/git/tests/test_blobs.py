@@ -0,0 +1,110 @@
+import subprocess
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from blobs import BlobCache
+
+
+def test_cache_evicts_least_recently_used_by_size():
+    cache = BlobCache(max_bytes=10, max_item_bytes=10)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    assert cache.get("a") == b"aaaa"
+    cache.put("c", b"cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa" and cache.get("c") == b"cccc"
+    assert cache.stats() == {"entries": 2, "bytes": 8, "hits": 3, "misses": 1}
+
+
+def test_cache_skips_oversized_blobs():
+    cache = BlobCache(max_bytes=80)
+    cache.put("big", b"x" * 11)
+    cache.put("small", b"x" * 10)
+    assert cache.get("big") is None
+    assert cache.get("small") == b"x" * 10
+
+
+@pytest.fixture
+def repo(tmp_path):
+    def git(*args):
+        return subprocess.run(
+            ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+            cwd=tmp_path,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+
+    git("init", "-q")
+    (tmp_path / "src" / "pkg").mkdir(parents=True)
+    (tmp_path / "a.txt").write_text("hello\n")
+    (tmp_path / "bin.dat").write_bytes(b"\0\1\2")
+    (tmp_path / "src" / "main.py").write_text("print()\n")
+    (tmp_path / "src" / "pkg" / "mod.py").write_text("x = 1\n")
+    git("add", ".")
+    git("commit", "-q", "-m", "init")
+    return str(tmp_path), git("rev-parse", "HEAD"), git("rev-parse", "HEAD:a.txt")
+
+
+def read_blob(client, repo, path, revision="HEAD", if_none_match=None):
+    return client.get(
+        "/read_blob",
+        params={"repo_path": repo, "path": path, "revision": revision},
+        headers={"If-None-Match": if_none_match} if if_none_match else {},
+    )
+
+
+def test_read_blob_sends_an_etag_and_honours_if_none_match(repo):
+    path, head, blob = repo
+    client = TestClient(main.app)
+    response = read_blob(client, path, "a.txt")
+    assert response.status_code == 200
+    assert response.content == b"hello\n"
+    assert response.headers["etag"] == f'"{blob}"'
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.headers["content-type"].startswith("text/plain")
+
+    response = read_blob(client, path, "a.txt", if_none_match=f'W/"x", "{blob}"')
+    assert response.status_code == 304 and response.content == b""
+
+    response = read_blob(client, path, "a.txt", revision=head)
+    assert "immutable" in response.headers["cache-control"]
+
+
+def test_read_blob_rejects_directories_and_flags_binary(repo):
+    path, _, _ = repo
+    client = TestClient(main.app)
+    assert read_blob(client, path, "src").status_code == 400
+    response = read_blob(client, path, "bin.dat")
+    assert response.headers["content-type"] == "application/octet-stream"
+
+
+def test_ls_tree_descends_to_the_requested_depth(repo):
+    path, head, _ = repo
+    client = TestClient(main.app)
+
+    def listing(**request):
+        response = client.post("/ls_tree", json={"repo_path": path, **request})
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    body = listing()
+    assert body["commit"] == head
+    assert [(e["path"], e["type"]) for e in body["entries"]] == [
+        ("a.txt", "blob"),
+        ("bin.dat", "blob"),
+        ("src", "tree"),
+    ]
+    assert body["entries"][0]["mode"] == "100644"
+    body = listing(path="src", depth=2)
+    assert [e["path"] for e in body["entries"]] == [
+        "src/main.py",
+        "src/pkg",
+        "src/pkg/mod.py",
+    ]
+    body = listing(depth=3, limit=2)
+    assert len(body["entries"]) == 2 and body["truncated"]
+    response = client.post("/ls_tree", json={"repo_path": path, "path": "a.txt"})
+    assert response.status_code == 400
@@ -0,0 +1,38 @@
+import subprocess
+
+from fastapi.testclient import TestClient
+
+import main
+
+
+def git(repo, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+        cwd=repo,
+        check=True,
+        capture_output=True,
+    )
+
+
+def test_branches_survive_line_breaks_and_skip_symbolic_refs(tmp_path):
+    git(tmp_path, "init", "-q", "-b", "main")
+    git(tmp_path, "commit", "-q", "--allow-empty", "-m", "old\rsubject")
+    git(tmp_path, "branch", "old")
+    git(tmp_path, "commit", "-q", "--allow-empty", "-m", "new subject")
+    git(tmp_path, "symbolic-ref", "refs/heads/alias", "refs/heads/main")
+
+    client = TestClient(main.app)
+
+    def branches(limit):
+        response = client.post(
+            "/branches", json={"repo_path": str(tmp_path), "limit": limit}
+        )
+        assert response.status_code == 200
+        body = response.json()
+        return [(b["name"], b["subject"]) for b in body["branches"]], body["truncated"]
+
+    assert branches(2) == (
+        [("main", "new subject"), ("old", "old\rsubject")],
+        False,
+    )
+    assert branches(1) == ([("main", "new subject")], True)
@@ -0,0 +1,159 @@
+import asyncio
+import subprocess
+import threading
+import time
+
+import pytest
+
+import commands
+import main
+from locks import RepoLocks
+
+
+def test_waiting_writer_holds_off_new_readers():
+    async def scenario():
+        locks = RepoLocks()
+        events = []
+
+        async def write():
+            async with locks.hold("repo", write=True):
+                events.append("write")
+
+        async def read():
+            async with locks.hold("repo"):
+                events.append("read")
+
+        async with locks.hold("repo"):
+            writer = asyncio.ensure_future(write())
+            await asyncio.sleep(0)
+            reader = asyncio.ensure_future(read())
+            await asyncio.sleep(0.01)
+            assert events == []
+        await asyncio.gather(writer, reader)
+        assert events == ["write", "read"]
+        assert len(locks) == 0
+
+    asyncio.run(scenario())
+
+
+def test_readers_share_and_other_repositories_are_independent():
+    async def scenario():
+        locks = RepoLocks()
+        async with locks.hold("a"), locks.hold("a"):
+            async with locks.hold("b", write=True):
+                assert len(locks) == 2
+
+    asyncio.run(asyncio.wait_for(scenario(), 1))
+
+
+def test_a_cancelled_writer_lets_readers_in():
+    async def scenario():
+        locks = RepoLocks()
+        async with locks.hold("repo"):
+            writer = asyncio.ensure_future(locks.hold("repo", write=True).__aenter__())
+            await asyncio.sleep(0)
+            writer.cancel()
+            await asyncio.gather(writer, return_exceptions=True)
+            async with locks.hold("repo"):
+                pass
+
+    asyncio.run(asyncio.wait_for(scenario(), 1))
+
+
+@pytest.fixture
+def repo(tmp_path):
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+    return str(tmp_path)
+
+
+def test_runner_reports_failures_and_records_stats(repo):
+    runner = commands.GitRunner(max_processes=2)
+
+    async def scenario():
+        async with runner.command("ok", repo):
+            output = await runner.output(repo, "rev-parse", "--git-dir")
+            assert output.strip() == b".git"
+        with pytest.raises(commands.GitFailed) as caught:
+            async with runner.command("bad", repo):
+                await runner.output(repo, "rev-parse", "--verify", "nope")
+        assert caught.value.status != 0 and caught.value.stderr
+
+    asyncio.run(scenario())
+    metrics = runner.metrics()
+    assert metrics["ok"]["count"] == 1 and metrics["ok"]["errors"] == 0
+    assert metrics["bad"]["errors"] == 1
+    assert metrics["ok"]["queued"] == metrics["ok"]["running"] == 0
+
+
+def test_runner_kills_git_past_its_timeout(repo):
+    runner = commands.GitRunner(timeout=0.2)
+    # Stands in for a git that hangs; an alias would leave a child holding
+    # stdout open after git itself is killed.
+    runner.executable = "sleep"
+
+    async def scenario():
+        started = time.monotonic()
+        with pytest.raises(commands.GitTimeout):
+            async with runner.command("slow", repo):
+                await runner.output(repo, "5")
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) < 3
+    assert runner.metrics()["slow"]["timeouts"] == 1
+
+
+def test_read_ahead_buffers_until_the_consumer_stalls():
+    produced = []
+
+    async def chunks():
+        for i in range(10):
+            produced.append(i)
+            yield b"x" * 10
+
+    async def scenario():
+        stream = commands.read_ahead(chunks(), max_bytes=25, stall_seconds=0.1)
+        received = [await stream.__anext__()]
+        await asyncio.sleep(0.3)
+        # The pump ran ahead until the buffer was full, then gave up.
+        assert len(produced) < 10
+        with pytest.raises(commands.StreamStalled):
+            async for chunk in stream:
+                received.append(chunk)
+        return received
+
+    received = asyncio.run(scenario())
+    assert 1 < len(received) < 10
+
+
+def test_read_ahead_passes_everything_to_a_prompt_consumer():
+    async def chunks():
+        for i in range(100):
+            yield b"%d," % i
+
+    async def scenario():
+        stream = commands.read_ahead(chunks(), max_bytes=16, stall_seconds=1)
+        return b"".join([chunk async for chunk in stream])
+
+    assert asyncio.run(scenario()) == b"".join(b"%d," % i for i in range(100))
+
+
+def test_run_to_completion_waits_for_the_thread_when_cancelled():
+    release = threading.Event()
+    finished = []
+
+    def work():
+        release.wait(2)
+        finished.append(True)
+
+    async def scenario():
+        task = asyncio.ensure_future(main.run_to_completion(work))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.sleep(0.05)
+        assert not task.done()
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert finished == [True]
+
+    asyncio.run(scenario())
@@ -0,0 +1,94 @@
+import asyncio
+
+import diffs
+
+PATCH = (
+    b"diff --git a/a.txt b/a.txt\n"
+    b"index 1111111..2222222 100644\n"
+    b"--- a/a.txt\n"
+    b"+++ b/a.txt\n"
+    b"@@ -1,3 +1,3 @@\n"
+    b"+" + b"x" * 200 + b"\n"
+    b"+y\n"
+    b"+z\n"
+    b"diff --git a/b.txt b/b.txt\n"
+    b"new file mode 100644\n"
+    b"--- /dev/null\n"
+    b"+++ b/b.txt\n"
+    b"@@ -0,0 +1 @@\n"
+    b"+b\n"
+)
+
+
+def capped(data: bytes, max_file_bytes: int, max_total_bytes: int = 0) -> bytes:
+    async def chunks():
+        yield data
+
+    async def collect():
+        return b"".join(
+            [c async for c in diffs.capped(chunks(), max_file_bytes, max_total_bytes)]
+        )
+
+    return asyncio.run(collect())
+
+
+def test_uncapped_output_is_unchanged():
+    assert capped(PATCH, 0) == PATCH
+
+
+def test_file_cap_keeps_a_prefix_and_every_file_header():
+    # The long added line overflows; the short lines after it must not leak.
+    out = capped(PATCH, 120)
+    first, second = out.split(b"diff --git a/b.txt b/b.txt\n")
+    assert first.startswith(
+        b"diff --git a/a.txt b/a.txt\nindex 1111111..2222222 100644\n"
+        b"--- a/a.txt\n+++ b/a.txt\n@@ -1,3 +1,3 @@\n[... "
+    )
+    assert first.count(b"[...") == 1
+    assert b"+y\n" not in first and b"+z\n" not in first
+    assert second == b"new file mode 100644\n--- /dev/null\n+++ b/b.txt\n@@ -0,0 +1 @@\n+b\n"
+
+
+def test_tiny_file_cap_still_names_each_file():
+    out = capped(PATCH, 20)
+    lines = out.splitlines()
+    assert lines[0] == b"diff --git a/a.txt b/a.txt"
+    assert lines[1].startswith(b"[... ")
+    assert lines[2] == b"diff --git a/b.txt b/b.txt"
+    assert lines[3].startswith(b"[... ")
+    assert len(lines) == 4
+
+
+def test_file_cap_leaves_summary_modes_alone():
+    stat = (
+        b" a.txt | 3 +++\n"
+        b" b.txt | 1 +\n"
+        b" 2 files changed, 4 insertions(+)\n"
+    )
+    numstat = b"3\t0\ta.txt\n1\t0\tb.txt\n"
+    name_only = b"a.txt\nb.txt\n"
+    for output in (stat, numstat, name_only):
+        assert capped(output, 10) == output
+
+
+def test_file_cap_passes_the_show_preamble_through():
+    preamble = (
+        b"Commit: 0123456789abcdef0123456789abcdef01234567\n"
+        b"Author: A U Thor\n"
+        b"Date: 2024-01-01 00:00:00 +0000\n"
+        b"Message: A commit message longer than the cap\n"
+        b"\n\n"
+    )
+    out = capped(preamble + PATCH, 20)
+    assert out.startswith(preamble + b"diff --git a/a.txt b/a.txt\n[... ")
+    assert out.count(b"[...") == 2
+
+
+def test_total_cap_still_bounds_summary_modes():
+    listing = b"".join(b"file%d.txt\n" % i for i in range(100))
+    out = capped(listing, 0, 50)
+    assert out.startswith(b"file0.txt\n")
+    assert out.endswith(
+        b"max_total_bytes=50; narrow it with paths or check mode=stat first ...]\n"
+    )
+    assert len(out.splitlines()) < 10
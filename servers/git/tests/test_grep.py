@@ -0,0 +1,110 @@
+import asyncio
+import json
+import subprocess
+
+from fastapi.testclient import TestClient
+
+import grep
+import main
+
+
+def test_parse_line_reads_matches_and_context():
+    assert grep.parse_line(b"a.py\x003\x005\x00x = 1", b"") == {
+        "type": "match",
+        "path": "a.py",
+        "line": 3,
+        "column": 5,
+        "text": "x = 1",
+    }
+    assert grep.parse_line(b"a.py\x004\x00y = 2", b"") == {
+        "type": "context",
+        "path": "a.py",
+        "line": 4,
+        "text": "y = 2",
+    }
+    assert grep.parse_line(b"--", b"") is None
+
+
+def test_parse_line_strips_the_revision_prefix_and_keeps_nuls_in_text():
+    record = grep.parse_line(b"HEAD:src/a.py\x001\x002\x00a\x00b", b"HEAD:")
+    assert record["path"] == "src/a.py"
+    assert record["text"] == "a\x00b"
+
+
+def test_ndjson_stops_at_the_limit_across_chunks():
+    lines = b"".join(b"a.py\x00%d\x001\x00hit\n" % i for i in range(1, 6))
+
+    async def chunks():
+        # Split mid-line so records straddle reads.
+        yield lines[:7]
+        yield lines[7:]
+
+    async def collect():
+        summary = {}
+        out = b"".join(
+            [c async for c in grep.ndjson_matches(chunks(), b"", 3, summary)]
+        )
+        return out, summary
+
+    out, summary = asyncio.run(collect())
+    records = [json.loads(line) for line in out.splitlines()]
+    assert [r["line"] for r in records] == [1, 2, 3]
+    assert summary == {"type": "summary", "matches": 3, "truncated": True}
+
+
+def make_repo(path):
+    def git(*args):
+        subprocess.run(
+            ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+            cwd=path,
+            check=True,
+            capture_output=True,
+        )
+
+    path.mkdir()
+    git("init", "-q")
+    (path / "a.txt").write_text("alpha\nbeta\ngamma\n")
+    git("add", "a.txt")
+    git("commit", "-q", "-m", "add a")
+    (path / "a.txt").write_text("alpha\nBETA\n")
+    return str(path)
+
+
+def grep_records(client, **request):
+    response = client.post("/grep", json=request)
+    assert response.status_code == 200, response.text
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_grep_endpoint_searches_the_worktree_or_a_revision(tmp_path):
+    repo = make_repo(tmp_path / "repo")
+    client = TestClient(main.app)
+
+    records = grep_records(client, repo_path=repo, pattern="beta", ignore_case=True)
+    assert records == [
+        {"type": "match", "path": "a.txt", "line": 2, "column": 1, "text": "BETA"},
+        {"type": "summary", "matches": 1, "truncated": False},
+    ]
+
+    records = grep_records(
+        client, repo_path=repo, pattern="beta", revision="HEAD", context=1
+    )
+    assert [(r["type"], r.get("line")) for r in records] == [
+        ("context", 1),
+        ("match", 2),
+        ("context", 3),
+        ("summary", None),
+    ]
+    assert records[1]["path"] == "a.txt"
+
+
+def test_grep_endpoint_reports_no_matches_and_rejects_flag_revisions(tmp_path):
+    repo = make_repo(tmp_path / "repo")
+    client = TestClient(main.app)
+    assert grep_records(client, repo_path=repo, pattern="delta") == [
+        {"type": "summary", "matches": 0, "truncated": False}
+    ]
+    response = client.post(
+        "/grep", json={"repo_path": repo, "pattern": "a", "revision": "--output=x"}
+    )
+    assert response.status_code == 400
@@ -0,0 +1,107 @@
+import os
+import subprocess
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import main
+
+SHA = "0123456789abcdef0123456789abcdef01234567"
+
+
+def make_repo(path, dates):
+    """A history with a merge per pair of commits, dated `dates` in order."""
+
+    def git(*args, date=None):
+        env = dict(os.environ, GIT_AUTHOR_NAME="t", GIT_AUTHOR_EMAIL="t@t")
+        env.update(GIT_COMMITTER_NAME="t", GIT_COMMITTER_EMAIL="t@t")
+        if date is not None:
+            env["GIT_AUTHOR_DATE"] = env["GIT_COMMITTER_DATE"] = f"{date} +0000"
+        subprocess.run(
+            ["git", *args], cwd=path, env=env, check=True, capture_output=True
+        )
+
+    git("init", "-q", "-b", "main")
+    for i, date in enumerate(dates):
+        if i % 3 == 1:
+            git("checkout", "-q", "-b", f"side{i}")
+            git("commit", "-q", "--allow-empty", "-m", f"side {i}", date=date)
+            git("checkout", "-q", "main")
+        elif i % 3 == 2:
+            git("merge", "-q", "--no-ff", "-m", f"merge {i}", f"side{i - 1}", date=date)
+        else:
+            git("commit", "-q", "--allow-empty", "-m", f"commit {i}", date=date)
+    return str(path)
+
+
+def git_log(repo, *args):
+    output = subprocess.run(
+        ["git", "log", "--format=%H", *args, "HEAD"],
+        cwd=repo,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return output.stdout.split()
+
+
+def paged(client, repo, max_count, **filters):
+    shas, cursor = [], None
+    while True:
+        response = client.post(
+            "/log",
+            json={
+                "repo_path": repo,
+                "max_count": max_count,
+                "cursor": cursor,
+                **filters,
+            },
+        )
+        assert response.status_code == 200, response.text
+        shas += [commit["sha"] for commit in response.json()["commits"]]
+        cursor = response.json()["next_cursor"]
+        if cursor is None:
+            return shas
+
+
+def test_cursor_round_trips():
+    cursor = main.LogCursor("f" * 16, SHA, 40, [SHA, "b" * 40], [SHA], 1700000000)
+    assert main.decode_log_cursor(main.encode_log_cursor(cursor)) == cursor
+
+
+@pytest.mark.parametrize("raw", ["not base64!", "YTpiOmM=", "Zjp4eXo6MDo6OjA="])
+def test_bad_cursors_are_rejected(raw):
+    with pytest.raises(HTTPException) as caught:
+        main.decode_log_cursor(raw)
+    assert caught.value.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "dates",
+    [
+        # Whole seconds apart, in the same second, and with clocks skewed so
+        # some commits are dated before their parents.
+        [1700000000 + 10 * i for i in range(30)],
+        [1700000000 + i // 4 for i in range(30)],
+        [1700000000 + (i * 7919) % 60 for i in range(30)],
+    ],
+)
+@pytest.mark.parametrize("max_count", [1, 2, 5])
+def test_pages_add_up_to_git_log(tmp_path, dates, max_count):
+    repo = make_repo(tmp_path, dates)
+    client = TestClient(main.app)
+    assert paged(client, repo, max_count) == git_log(repo)
+    assert paged(client, repo, max_count, author="t") == git_log(repo, "--author=t")
+
+
+def test_cursor_with_other_filters_is_rejected(tmp_path):
+    repo = make_repo(tmp_path, [1700000000 + i for i in range(5)])
+    client = TestClient(main.app)
+    first = client.post("/log", json={"repo_path": repo, "max_count": 2}).json()
+    response = client.post(
+        "/log",
+        json={"repo_path": repo, "cursor": first["next_cursor"], "author": "t"},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Cursor does not match these filters"
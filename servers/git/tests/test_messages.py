@@ -0,0 +1,67 @@
+import subprocess
+
+from fastapi.testclient import TestClient
+
+import main
+from messages import MessageIndex
+
+
+def fields(sha, parents="", message="m"):
+    date = "2024-01-01T00:00:00+00:00"
+    return (sha, parents, "a", "a@x", date, "c", "c@x", date, message)
+
+
+def make_repo(path, subjects):
+    def git(*args):
+        subprocess.run(
+            ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+            cwd=path,
+            check=True,
+            capture_output=True,
+        )
+
+    path.mkdir()
+    git("init", "-q")
+    for subject in subjects:
+        git("commit", "-q", "--allow-empty", "-m", subject)
+    return str(path)
+
+
+def test_add_reports_a_repository_evicted_meanwhile():
+    index = MessageIndex(max_commits=2)
+    held = index.repo("a")
+    assert index.add("b", index.repo("b"), "b2", [fields("b1"), fields("b2", "b1")])
+    index.add("c", index.repo("c"), "c1", [fields("c1")])
+
+    assert not index.add("a", held, "a1", [fields("a1")])
+    assert index.stats()["commits"] <= 2
+
+
+def test_search_uses_the_index_it_was_given_even_if_evicted():
+    index = MessageIndex(max_commits=2)
+    held = index.repo("a")
+    assert index.add("a", held, "a2", [fields("a2", "a1", "fix"), fields("a1")])
+    index.add("b", index.repo("b"), "b2", [fields("b2", "b1"), fields("b1")])
+
+    found, more = index.search(held, "a2", None, None, 10)
+    assert [f[0] for f in found] == ["a2", "a1"]
+    assert not more
+
+
+def test_search_commits_across_repositories_with_a_small_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "message_index", MessageIndex(max_commits=4))
+    first = make_repo(tmp_path / "first", ["fix one", "add two", "fix three"])
+    second = make_repo(tmp_path / "second", ["fix four", "fix five", "add six"])
+    client = TestClient(main.app)
+
+    def search(repo):
+        response = client.post(
+            "/search_commits", json={"repo_path": repo, "message": "^fix"}
+        )
+        assert response.status_code == 200
+        assert response.json()["indexed"]
+        return [c["subject"] for c in response.json()["commits"]]
+
+    for _ in range(2):
+        assert search(first) == ["fix three", "fix one"]
+        assert search(second) == ["fix five", "fix four"]
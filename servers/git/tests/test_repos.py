@@ -0,0 +1,93 @@
+import os
+import subprocess
+import threading
+import time
+
+import git
+import pytest
+
+from repos import RepoPool
+
+
+def make_repo(path):
+    path.mkdir()
+    subprocess.run(["git", "init", "-q"], cwd=path, check=True)
+    return str(path)
+
+
+@pytest.fixture
+def pool():
+    pool = RepoPool(max_handles=2, per_repo=1, idle_seconds=0)
+    yield pool
+    pool.close()
+
+
+def test_released_handles_are_reused(pool, tmp_path):
+    path = make_repo(tmp_path / "a")
+    with pool.lease(path) as first:
+        pass
+    with pool.lease(path) as second:
+        assert second is first
+    assert pool.stats() == {"open": 1, "idle": 1, "created": 1, "reused": 1}
+
+
+def test_handles_are_keyed_by_real_path(pool, tmp_path):
+    path = make_repo(tmp_path / "a")
+    os.symlink(path, tmp_path / "link")
+    with pool.lease(path) as first:
+        pass
+    with pool.lease(str(tmp_path / "link")) as second:
+        assert second is first
+
+
+def test_a_repository_waits_for_its_per_repo_limit(pool, tmp_path):
+    path = make_repo(tmp_path / "a")
+    leased = []
+    lease = pool.lease(path)
+    with lease:
+        waiter = threading.Thread(
+            target=lambda: leased.append(pool.lease(path).repo)
+        )
+        waiter.start()
+        time.sleep(0.05)
+        assert leased == []
+    waiter.join()
+    assert leased == [lease.repo]
+
+
+def test_failed_requests_discard_their_handle(tmp_path):
+    pool = RepoPool(idle_seconds=0, reusable_errors=(KeyError,))
+    path = make_repo(tmp_path / "a")
+    with pytest.raises(KeyError):
+        with pool.lease(path) as first:
+            raise KeyError
+    with pytest.raises(ValueError):
+        with pool.lease(path) as second:
+            assert second is first
+            raise ValueError
+    with pool.lease(path) as third:
+        assert third is not first
+    assert pool.stats()["created"] == 2
+    pool.close()
+
+
+def test_least_recently_used_idle_handles_are_closed_over_capacity(pool, tmp_path):
+    a, b, c = (make_repo(tmp_path / name) for name in "abc")
+    with pool.lease(a) as repo_a:
+        pass
+    with pool.lease(b):
+        pass
+    with pool.lease(c):
+        pass
+    assert pool.stats()["open"] == 2
+    with pool.lease(a) as again:
+        assert again is not repo_a
+
+
+def test_invalid_paths_raise_and_free_their_slot(pool, tmp_path):
+    with pytest.raises(git.NoSuchPathError):
+        pool.lease(str(tmp_path / "missing"))
+    (tmp_path / "plain").mkdir()
+    with pytest.raises(git.InvalidGitRepositoryError):
+        pool.lease(str(tmp_path / "plain"))
+    assert pool.stats()["open"] == 0
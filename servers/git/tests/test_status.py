@@ -0,0 +1,113 @@
+import os
+import subprocess
+
+from fastapi.testclient import TestClient
+
+import main
+import status
+
+OID = "0123456789abcdef0123456789abcdef01234567"
+
+OUTPUT = b"\0".join(
+    [
+        f"# branch.oid {OID}".encode(),
+        b"# branch.head main",
+        b"# branch.upstream origin/main",
+        b"# branch.ab +2 -1",
+        f"1 .M N... 100644 100644 100644 {OID} {OID} a file.txt".encode(),
+        f"2 R. N... 100644 100644 100644 {OID} {OID} R100 new name.txt".encode(),
+        b"old name.txt",
+        f"u UU N... 100644 100644 100644 100644 {OID} {OID} {OID} c.txt".encode(),
+        b"? new dir/",
+        b"",
+    ]
+)
+
+
+def test_parse_porcelain_v2_reads_branch_and_entries():
+    parsed = status.parse_porcelain_v2(OUTPUT)
+    assert parsed["branch"] == {
+        "oid": OID,
+        "head": "main",
+        "upstream": "origin/main",
+        "ahead": 2,
+        "behind": 1,
+    }
+    changed, renamed, unmerged, untracked = parsed["entries"]
+    assert changed == {
+        "kind": "changed",
+        "path": "a file.txt",
+        "index": ".",
+        "worktree": "M",
+        "submodule": False,
+    }
+    assert renamed["path"] == "new name.txt"
+    assert renamed["orig_path"] == "old name.txt"
+    assert (renamed["index"], renamed["score"]) == ("R", "R100")
+    assert (unmerged["kind"], unmerged["path"]) == ("unmerged", "c.txt")
+    assert untracked == {"kind": "untracked", "path": "new dir/"}
+
+
+def test_parse_porcelain_v2_reads_a_fresh_detached_head():
+    parsed = status.parse_porcelain_v2(
+        b"# branch.oid (initial)\0# branch.head (detached)\0"
+    )
+    assert parsed == {
+        "branch": dict.fromkeys(["oid", "head", "upstream", "ahead", "behind"]),
+        "entries": [],
+    }
+
+
+def test_cache_expires_and_follows_the_index_stamp(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(status.time, "monotonic", lambda: now[0])
+    cache = status.StatusCache(ttl_seconds=2)
+    cache.put("repo", ("s1",), {"x": 1})
+    assert cache.get("repo", ("s1",)) == {"x": 1}
+    assert cache.get("repo", ("s2",)) is None
+    now[0] += 3
+    assert cache.get("repo", ("s1",)) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+    disabled = status.StatusCache(ttl_seconds=0)
+    disabled.put("repo", ("s1",), {"x": 1})
+    assert disabled.get("repo", ("s1",)) is None
+
+
+def test_status_endpoint_sees_staging_through_the_cache(tmp_path):
+    def git(*args):
+        subprocess.run(
+            ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+            cwd=tmp_path,
+            check=True,
+            capture_output=True,
+        )
+
+    git("init", "-q", "-b", "main")
+    (tmp_path / "a.txt").write_text("a\n")
+    git("add", "a.txt")
+    git("commit", "-q", "-m", "init")
+    (tmp_path / "a.txt").write_text("b\n")
+    (tmp_path / "u.txt").write_text("u\n")
+
+    client = TestClient(main.app)
+
+    def entries(**request):
+        response = client.post("/status", json={"repo_path": str(tmp_path), **request})
+        assert response.status_code == 200, response.text
+        body = response.json()
+        assert body["branch"]["head"] == "main"
+        return [
+            (e["kind"], e["path"], e["index"], e["worktree"]) for e in body["entries"]
+        ]
+
+    assert entries() == [
+        ("changed", "a.txt", ".", "M"),
+        ("untracked", "u.txt", None, None),
+    ]
+    assert entries(untracked="no") == [("changed", "a.txt", ".", "M")]
+    git("add", "a.txt")
+    # Staging rewrites the index, so a cached result must not be served.
+    assert entries(untracked="no") == [("changed", "a.txt", "M", ".")]
+    os.remove(tmp_path / "u.txt")
+    assert entries(paths=["u.txt"]) == []
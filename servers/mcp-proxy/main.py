@@ -1,10 +1,11 @@
-from fastapi import FastAPI, Body
+from fastapi import FastAPI, Body, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import create_model
 
 
-from mcp import ClientSession, StdioServerParameters, types
-from mcp.client.stdio import stdio_client
+from mcp import StdioServerParameters
+
+from pool import SessionPool
 
 import argparse
 import sys
@@ -16,8 +17,11 @@ import json
 import os
 
 
-async def create_dynamic_endpoints(app: FastAPI, session: ClientSession):
-    tools_result = await session.list_tools()
+async def create_dynamic_endpoints(
+    app: FastAPI, pool: SessionPool, sticky_tools: tuple[str, ...], sticky_header: str
+):
+    async with pool.lease() as session:
+        tools_result = await session.list_tools()
     tools = tools_result.tools
 
     for tool in tools:
@@ -57,14 +61,21 @@ async def create_dynamic_endpoints(app: FastAPI, session: ClientSession):
 
         FormModel = create_model(f"{endpoint_name}_form_model", **model_fields)
 
-        def make_endpoint_func(endpoint_name: str, FormModel):
-            async def tool(form_data: FormModel):
+        sticky = "*" in sticky_tools or endpoint_name in sticky_tools
+
+        def make_endpoint_func(endpoint_name: str, FormModel, sticky: bool):
+            async def tool(form_data: FormModel, request: Request):
                 args = form_data.model_dump()
                 print(f"Calling {endpoint_name} with arguments:", args)
 
-                tool_call_result = await session.call_tool(
-                    endpoint_name, arguments=args
-                )
+                # Calls without the header share one session.
+                sticky_key = None
+                if sticky:
+                    sticky_key = request.headers.get(sticky_header, "")
+                async with pool.lease(sticky_key) as session:
+                    tool_call_result = await session.call_tool(
+                        endpoint_name, arguments=args
+                    )
 
                 response = []
                 for content in tool_call_result.content:
@@ -81,7 +92,7 @@ async def create_dynamic_endpoints(app: FastAPI, session: ClientSession):
 
             return tool
 
-        tool = make_endpoint_func(endpoint_name, FormModel)
+        tool = make_endpoint_func(endpoint_name, FormModel, sticky)
 
         # Add endpoint to FastAPI with tool descriptions
         app.post(
@@ -91,59 +102,81 @@ async def create_dynamic_endpoints(app: FastAPI, session: ClientSession):
         )(tool)
 
 
-async def run(host: str, port: int, server_cmd: list[str]):
+async def run(
+    host: str,
+    port: int,
+    server_cmd: list[str],
+    pool_size: int = 1,
+    max_in_flight: int = 0,
+    sticky_tools: tuple[str, ...] = (),
+    sticky_header: str = "X-Session-Id",
+):
     server_params = StdioServerParameters(
         command=server_cmd[0],
         args=server_cmd[1:],
         env={**os.environ},
     )
 
-    # Open connection to MCP first:
-    async with stdio_client(server_params) as (read, write):
-        async with ClientSession(read, write) as session:
-            result = await session.initialize()
+    # Start the MCP servers first:
+    async with SessionPool(server_params, pool_size, max_in_flight) as pool:
+        result = pool.server_info
 
-            server_name = (
-                result.serverInfo.name
-                if hasattr(result, "serverInfo") and hasattr(result.serverInfo, "name")
-                else None
-            )
+        server_name = (
+            result.serverInfo.name
+            if hasattr(result, "serverInfo") and hasattr(result.serverInfo, "name")
+            else None
+        )
 
-            server_description = (
-                f"{server_name.capitalize()} MCP OpenAPI Proxy"
-                if server_name
-                else "Automatically generated API endpoints based on MCP tool schemas."
-            )
+        server_description = (
+            f"{server_name.capitalize()} MCP OpenAPI Proxy"
+            if server_name
+            else "Automatically generated API endpoints based on MCP tool schemas."
+        )
 
-            server_version = (
-                result.serverInfo.version
-                if hasattr(result, "serverInfo")
-                and hasattr(result.serverInfo, "version")
-                else "1.0"
-            )
+        server_version = (
+            result.serverInfo.version
+            if hasattr(result, "serverInfo")
+            and hasattr(result.serverInfo, "version")
+            else "1.0"
+        )
 
-            app = FastAPI(
-                title=server_name if server_name else "MCP OpenAPI Proxy",
-                description=server_description,
-                version=server_version,
-            )
+        app = FastAPI(
+            title=server_name if server_name else "MCP OpenAPI Proxy",
+            description=server_description,
+            version=server_version,
+        )
 
-            origins = ["*"]
+        origins = ["*"]
 
-            app.add_middleware(
-                CORSMiddleware,
-                allow_origins=origins,
-                allow_credentials=True,
-                allow_methods=["*"],
-                allow_headers=["*"],
-            )
+        app.add_middleware(
+            CORSMiddleware,
+            allow_origins=origins,
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+        )
+
+        # Dynamic endpoint creation
+        await create_dynamic_endpoints(app, pool, sticky_tools, sticky_header)
 
-            # Dynamic endpoint creation
-            await create_dynamic_endpoints(app, session)
+        config = uvicorn.Config(app=app, host=host, port=port, log_level="info")
+        server = uvicorn.Server(config)
+        await server.serve()
 
-            config = uvicorn.Config(app=app, host=host, port=port, log_level="info")
-            server = uvicorn.Server(config)
-            await server.serve()
+
+def at_least(minimum: int):
+    """An argparse type for integers no smaller than `minimum`."""
+
+    def parse(value: str) -> int:
+        try:
+            number = int(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid integer: {value!r}")
+        if number < minimum:
+            raise argparse.ArgumentTypeError(f"must be at least {minimum}")
+        return number
+
+    return parse
 
 
 def parse_args():
@@ -159,6 +192,30 @@ def parse_args():
     parser = argparse.ArgumentParser(description="FastAPI MCP OpenAPI Proxy")
     parser.add_argument("--host", type=str, default="0.0.0.0", help="Host to listen on")
     parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument(
+        "--pool-size",
+        type=at_least(1),
+        default=1,
+        help="Number of MCP server processes to spread tool calls over",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=at_least(0),
+        default=0,
+        help="Concurrent calls per MCP server process; 0 for no limit",
+    )
+    parser.add_argument(
+        "--sticky-tools",
+        type=lambda value: tuple(t.strip() for t in value.split(",") if t.strip()),
+        default=(),
+        help="Comma-separated tools (or *) whose calls stay on one process per client",
+    )
+    parser.add_argument(
+        "--sticky-header",
+        type=str,
+        default="X-Session-Id",
+        help="Header identifying the client for sticky tools",
+    )
 
     args = parser.parse_args(proxy_args)
 
@@ -166,9 +223,19 @@ def parse_args():
         print("Error: You must specify the MCP server command after '--'")
         sys.exit(1)
 
-    return args.host, args.port, mcp_args
+    return args, mcp_args
 
 
 if __name__ == "__main__":
-    host, port, server_cmd = parse_args()
-    asyncio.run(run(host, port, server_cmd))
+    args, server_cmd = parse_args()
+    asyncio.run(
+        run(
+            args.host,
+            args.port,
+            server_cmd,
+            pool_size=args.pool_size,
+            max_in_flight=args.max_in_flight,
+            sticky_tools=args.sticky_tools,
+            sticky_header=args.sticky_header,
+        )
+    )
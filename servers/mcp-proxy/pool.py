@@ -0,0 +1,104 @@
+import asyncio
+from collections import OrderedDict
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, List, Optional
+
+from mcp import ClientSession, StdioServerParameters, types
+from mcp.client.stdio import stdio_client
+
+
+class PooledSession:
+    def __init__(self, session: ClientSession):
+        self.session = session
+        self.in_flight = 0
+
+
+class SessionPool:
+    """
+    `size` copies of the MCP server, each a subprocess behind its own stdio
+    ClientSession.
+
+    Each call goes to the session with the fewest calls in flight, waiting
+    when every session already has `max_in_flight` (0 for no limit). A call
+    with a sticky key goes to whichever session that key first landed on,
+    so a stateful tool keeps talking to the same server for a given client.
+    The `max_sticky_keys` most recently used keys are remembered.
+    """
+
+    def __init__(
+        self,
+        params: StdioServerParameters,
+        size: int = 1,
+        max_in_flight: int = 0,
+        max_sticky_keys: int = 10_000,
+    ):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        if max_in_flight < 0:
+            raise ValueError("max_in_flight must be at least 0")
+        self.params = params
+        self.size = size
+        self.max_in_flight = max_in_flight
+        self.max_sticky_keys = max_sticky_keys
+        self.server_info: Optional[types.InitializeResult] = None
+        self._stack = AsyncExitStack()
+        self._sessions: List[PooledSession] = []
+        self._sticky: "OrderedDict[str, PooledSession]" = OrderedDict()
+        self._released = asyncio.Event()
+
+    async def __aenter__(self) -> "SessionPool":
+        # Sessions start one after another: stdio_client's task group has to
+        # be entered and exited from the same task.
+        try:
+            for _ in range(self.size):
+                read, write = await self._stack.enter_async_context(
+                    stdio_client(self.params)
+                )
+                session = await self._stack.enter_async_context(
+                    ClientSession(read, write)
+                )
+                result = await session.initialize()
+                if self.server_info is None:
+                    self.server_info = result
+                self._sessions.append(PooledSession(session))
+        except BaseException:
+            await self._stack.aclose()
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._stack.aclose()
+
+    @asynccontextmanager
+    async def lease(
+        self, sticky_key: Optional[str] = None
+    ) -> AsyncIterator[ClientSession]:
+        """Hold a session for one call."""
+        while (pooled := self._pick(sticky_key)) is None:
+            # set() has already woken every waiter by the time another one
+            # clears the event, so no release is missed.
+            self._released.clear()
+            await self._released.wait()
+        pooled.in_flight += 1
+        try:
+            yield pooled.session
+        finally:
+            pooled.in_flight -= 1
+            self._released.set()
+
+    def _has_room(self, pooled: PooledSession) -> bool:
+        return not self.max_in_flight or pooled.in_flight < self.max_in_flight
+
+    def _pick(self, sticky_key: Optional[str]) -> Optional[PooledSession]:
+        if sticky_key is not None and sticky_key in self._sticky:
+            self._sticky.move_to_end(sticky_key)
+            pooled = self._sticky[sticky_key]
+            return pooled if self._has_room(pooled) else None
+        pooled = min(self._sessions, key=lambda s: s.in_flight)
+        if not self._has_room(pooled):
+            return None
+        if sticky_key is not None:
+            self._sticky[sticky_key] = pooled
+            if len(self._sticky) > self.max_sticky_keys:
+                self._sticky.popitem(last=False)
+        return pooled
@@ -0,0 +1,104 @@
+import argparse
+import asyncio
+
+import pytest
+
+mcp = pytest.importorskip("mcp")
+
+import main  # noqa: E402
+from pool import PooledSession, SessionPool  # noqa: E402
+
+
+def make_pool(size=2, **kwargs):
+    """A pool over placeholder sessions, without starting any servers."""
+    pool = SessionPool(mcp.StdioServerParameters(command="unused"), size, **kwargs)
+    pool._sessions = [PooledSession(f"session{i}") for i in range(size)]
+    return pool
+
+
+@pytest.mark.parametrize("kwargs", [{"size": 0}, {"max_in_flight": -1}])
+def test_invalid_sizes_are_rejected(kwargs):
+    with pytest.raises(ValueError):
+        SessionPool(mcp.StdioServerParameters(command="unused"), **kwargs)
+
+
+def test_calls_go_to_the_least_busy_session():
+    async def scenario():
+        pool = make_pool(3)
+        async with pool.lease() as first, pool.lease() as second:
+            async with pool.lease() as third:
+                assert {first, second, third} == {"session0", "session1", "session2"}
+            async with pool.lease() as fourth:
+                assert fourth == third
+        assert [s.in_flight for s in pool._sessions] == [0, 0, 0]
+
+    asyncio.run(scenario())
+
+
+def test_sticky_keys_stay_on_their_session():
+    async def scenario():
+        pool = make_pool(2)
+        async with pool.lease("alice") as alice:
+            async with pool.lease("bob") as bob:
+                assert bob != alice
+            # alice's session is the busier one, but the key wins.
+            async with pool.lease("alice") as again:
+                assert again == alice
+        async with pool.lease("bob") as again:
+            assert again == bob
+
+    asyncio.run(scenario())
+
+
+def test_full_sessions_make_calls_wait():
+    async def scenario():
+        pool = make_pool(1, max_in_flight=1)
+        order = []
+
+        async def call(name):
+            async with pool.lease():
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        await asyncio.wait_for(asyncio.gather(*(call(i) for i in range(3))), 1)
+        assert sorted(order) == [0, 1, 2]
+
+        async with pool.lease():
+            waiter = asyncio.ensure_future(call("late"))
+            await asyncio.sleep(0.01)
+            assert not waiter.done()
+        await asyncio.wait_for(waiter, 1)
+
+    asyncio.run(scenario())
+
+
+def test_a_sticky_key_waits_for_its_own_session():
+    async def scenario():
+        pool = make_pool(2, max_in_flight=1)
+        async with pool.lease("alice") as alice:
+            waiter = asyncio.ensure_future(pool.lease("alice").__aenter__())
+            await asyncio.sleep(0.01)
+            # The other session is idle, but alice stays put.
+            assert not waiter.done()
+        assert await asyncio.wait_for(waiter, 1) == alice
+
+    asyncio.run(scenario())
+
+
+def test_only_the_most_recent_sticky_keys_are_kept():
+    async def scenario():
+        pool = make_pool(2, max_sticky_keys=2)
+        for key in ("a", "b", "a", "c"):
+            async with pool.lease(key):
+                pass
+        assert list(pool._sticky) == ["a", "c"]
+
+    asyncio.run(scenario())
+
+
+def test_at_least_parses_bounded_integers():
+    parse = main.at_least(1)
+    assert parse("3") == 3
+    for bad in ("0", "x"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse(bad)
@@ -0,0 +1,85 @@
+"""
+Memory footprint of the in-memory graph representation.
+
+    cd servers/memory
+    python -m benchmarks.footprint --entities 1000000 --relations 1000000
+
+Reports bytes per entity and per relation as traced by tracemalloc. The
+full-text index is left out unless --with-index is given, since its size
+depends on the vocabulary rather than on the record layout.
+"""
+
+import argparse
+import gc
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from store import GraphStore
+
+from benchmarks import synthetic
+
+
+class NoIndex:
+    def add(self, doc, texts):
+        pass
+
+    def remove(self, doc, texts):
+        pass
+
+
+def traced() -> int:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entities", type=int, default=1_000_000)
+    parser.add_argument("--relations", type=int, default=1_000_000)
+    parser.add_argument("--observations", type=int, default=3)
+    parser.add_argument("--with-index", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # Generate the input up front so only the store's own allocations count.
+    entities = list(
+        synthetic.entities(args.entities, observations=args.observations, seed=args.seed)
+    )
+    relations = list(synthetic.relations(args.entities, args.relations, seed=args.seed))
+    text_bytes = sum(len(o.encode()) for e in entities for o in e["observations"])
+
+    tracemalloc.start()
+    store = GraphStore(Path(tempfile.gettempdir()) / "memory-bench.json")
+    if not args.with_index:
+        store.text_index = NoIndex()
+    baseline = traced()
+
+    started = time.perf_counter()
+    store.create_entities(entities)
+    after_entities = traced()
+    store.create_relations(relations)
+    after_relations = traced()
+    elapsed = time.perf_counter() - started
+    tracemalloc.stop()
+
+    entity_bytes = after_entities - baseline
+    relation_bytes = after_relations - after_entities
+    print(
+        f"{store.entity_count} entities, {store.relation_count} relations "
+        f"built in {elapsed:.1f}s (index {'on' if args.with_index else 'off'})"
+    )
+    print(
+        f"entities:  {entity_bytes / 2**20:8.1f} MiB  "
+        f"{entity_bytes / store.entity_count:6.1f} B/entity  "
+        f"(observation text {text_bytes / store.entity_count:.1f} B/entity)"
+    )
+    print(
+        f"relations: {relation_bytes / 2**20:8.1f} MiB  "
+        f"{relation_bytes / store.relation_count:6.1f} B/relation"
+    )
+
+
+if __name__ == "__main__":
+    main()
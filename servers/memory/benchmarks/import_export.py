@@ -0,0 +1,111 @@
+"""
+Bulk import/export throughput for the memory server.
+
+    cd servers/memory
+    python -m benchmarks.import_export --entities 200000
+    python -m benchmarks.import_export --entities 200000 --snapshot-format binary
+
+Times the phases of an import separately on a fresh store: parsing the NDJSON
+lines, applying them, the snapshot checkpoint that commits them, and the
+search index rebuild, which the server runs in the background after /import
+has responded. Then drives /import and /export through the ASGI app
+in-process (needs httpx) with a throwaway MEMORY_FILE_PATH; the TestClient
+runs background tasks before returning, so that /import time includes the
+index rebuild.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entities", type=int, default=200_000)
+    parser.add_argument("--relations", type=int, default=None)
+    parser.add_argument("--observations", type=int, default=3)
+    parser.add_argument(
+        "--snapshot-format", choices=("jsonl", "binary"), default="jsonl"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    relations = args.entities if args.relations is None else args.relations
+
+    workdir = tempfile.mkdtemp(prefix="memory-bench-")
+    os.environ["MEMORY_FILE_PATH"] = os.path.join(workdir, "memory.json")
+    os.environ["MEMORY_SNAPSHOT_FORMAT"] = args.snapshot_format
+
+    from fastapi.testclient import TestClient
+
+    import main as server
+    from store import GraphStore
+
+    from benchmarks import synthetic
+
+    lines = [
+        json.dumps({"type": "entity", **e}).encode()
+        for e in synthetic.entities(args.entities, args.observations, seed=args.seed)
+    ] + [
+        json.dumps({"type": "relation", **r}).encode()
+        for r in synthetic.relations(args.entities, relations, seed=args.seed)
+    ]
+    body = b"\n".join(lines)
+
+    phases = {}
+    started = time.perf_counter()
+    entities, relation_records = [], []
+    for number, line in enumerate(lines, 1):
+        kind, record = server.parse_import_line(line, number)
+        (entities if kind == "entity" else relation_records).append(record)
+    phases["parse"] = time.perf_counter() - started
+    store = GraphStore(
+        Path(workdir) / "phases.json", snapshot_format=args.snapshot_format
+    )
+    started = time.perf_counter()
+    store.import_records(entities, relation_records)
+    phases["apply"] = time.perf_counter() - started
+    started = time.perf_counter()
+    store.checkpoint()
+    phases["checkpoint"] = time.perf_counter() - started
+    started = time.perf_counter()
+    store.ensure_indexes()
+    phases["index"] = time.perf_counter() - started
+    for name, elapsed in phases.items():
+        print(f"  {name:<10} {elapsed:6.2f}s  {args.entities / elapsed:12,.0f} entities/s")
+    committed = phases["parse"] + phases["apply"] + phases["checkpoint"]
+    print(
+        f"import: {len(body) / 2**20:.1f} MiB committed in {committed:.2f}s  "
+        f"{args.entities / committed:,.0f} entities/s (parse + apply + checkpoint)"
+    )
+
+    client = TestClient(server.app)
+    started = time.perf_counter()
+    response = client.post(
+        "/import", content=body, headers={"content-type": "application/x-ndjson"}
+    )
+    elapsed = time.perf_counter() - started
+    response.raise_for_status()
+    print(f"/import: {response.json()}")
+    print(
+        f"/import: {elapsed:.2f}s including the index rebuild  "
+        f"{args.entities / elapsed:,.0f} entities/s  "
+        f"{len(lines) / elapsed:,.0f} records/s"
+    )
+
+    started = time.perf_counter()
+    size = 0
+    with client.stream("GET", "/export") as response:
+        for chunk in response.iter_bytes():
+            size += len(chunk)
+    elapsed = time.perf_counter() - started
+    print(
+        f"/export: {size / 2**20:.1f} MiB in {elapsed:.2f}s  "
+        f"{len(lines) / elapsed:,.0f} records/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
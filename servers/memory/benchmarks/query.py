@@ -0,0 +1,88 @@
+"""
+Pattern query benchmark for the memory server.
+
+    cd servers/memory
+    python -m benchmarks.query --entities 200000 --relations 1000000
+
+Times GraphStore.match for a few pattern shapes with different anchors: an
+exact name, a type plus full-text filter, a two-hop chain ending at a hub and
+a pattern where only types are known.
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from store import GraphStore
+
+from benchmarks import synthetic
+
+
+def patterns(rng: random.Random, entity_count: int):
+    name = synthetic.entity_name(rng.randrange(entity_count))
+    terms = " ".join(rng.sample(synthetic.WORDS, 2))
+    hub = synthetic.entity_name(rng.randrange(10))
+    return {
+        "name -> type": (
+            [{"name": name}, {"entityType": "organization"}],
+            [{"relationTypes": ["works_at"], "direction": "both"}],
+        ),
+        "type -> type+text": (
+            [{"entityType": "person"}, {"entityType": "organization", "text": terms}],
+            [{"relationTypes": ["works_at"]}],
+        ),
+        "type -> type -> hub": (
+            [{"entityType": "person"}, {"entityType": "person"}, {"name": hub}],
+            [{"relationTypes": ["knows"]}, {}],
+        ),
+        "type -> type": (
+            [{"entityType": "person"}, {"entityType": "project"}],
+            [{"relationTypes": ["member_of"]}],
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entities", type=int, default=200_000)
+    parser.add_argument("--relations", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    store = GraphStore(Path(tempfile.gettempdir()) / "memory-bench.json")
+    started = time.perf_counter()
+    store.create_entities(
+        list(synthetic.entities(args.entities, observations=2, seed=args.seed))
+    )
+    store.create_relations(
+        list(synthetic.relations(args.entities, args.relations, seed=args.seed))
+    )
+    print(
+        f"built {store.entity_count} entities / {store.relation_count} relations "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+    rng = random.Random(args.seed)
+    workload = [patterns(rng, args.entities) for _ in range(args.queries)]
+    for shape in workload[0]:
+        samples, matches, anchors = [], 0, {}
+        for queries in workload:
+            nodes, edges = queries[shape]
+            t0 = time.perf_counter()
+            _, found, _, plan = store.match(nodes, edges, limit=args.limit)
+            samples.append((time.perf_counter() - t0) * 1000)
+            matches += found
+            anchors[plan["index"]] = anchors.get(plan["index"], 0) + 1
+        p50, p99 = synthetic.percentiles(samples)
+        print(
+            f"{shape:<22} p50 {p50:7.2f} ms  p99 {p99:7.2f} ms  "
+            f"{matches / len(workload):6.1f} matches/query  anchors {anchors}"
+        )
+
+
+if __name__ == "__main__":
+    main()
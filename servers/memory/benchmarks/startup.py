@@ -0,0 +1,69 @@
+"""
+Startup time for JSONL versus binary snapshots.
+
+    cd servers/memory
+    python -m benchmarks.startup --entities 1000000 --relations 1000000
+
+Writes the same synthetic graph in both snapshot formats and times
+GraphStore.load() for each, then the lazy index build that the first search
+pays for (the same for both formats).
+"""
+
+import argparse
+import gc
+import tempfile
+import time
+from pathlib import Path
+
+from store import GraphStore
+
+from benchmarks import synthetic
+
+
+def timed_load(path: Path, snapshot_format: str) -> GraphStore:
+    gc.collect()
+    store = GraphStore(path, snapshot_format=snapshot_format)
+    started = time.perf_counter()
+    store.load()
+    elapsed = time.perf_counter() - started
+    print(
+        f"{snapshot_format:>6}: {path.stat().st_size / 2**20:8.1f} MiB  "
+        f"load {elapsed:6.2f}s  "
+        f"({store.entity_count:,} entities, {store.relation_count:,} relations)"
+    )
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entities", type=int, default=1_000_000)
+    parser.add_argument("--relations", type=int, default=1_000_000)
+    parser.add_argument("--observations", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="memory-bench-"))
+    source = GraphStore(workdir / "source.json")
+    source.import_records(
+        list(synthetic.entities(args.entities, args.observations, seed=args.seed)),
+        list(synthetic.relations(args.entities, args.relations, seed=args.seed)),
+    )
+    for snapshot_format in ("jsonl", "binary"):
+        source.path = workdir / f"memory.{snapshot_format}"
+        source.snapshot_format = snapshot_format
+        started = time.perf_counter()
+        source.save()
+        print(f"{snapshot_format:>6}: save {time.perf_counter() - started:6.2f}s")
+    del source
+
+    for snapshot_format in ("jsonl", "binary"):
+        store = timed_load(workdir / f"memory.{snapshot_format}", snapshot_format)
+        del store
+    store = timed_load(workdir / "memory.binary", "binary")
+    started = time.perf_counter()
+    store.ensure_indexes()
+    print(f"index build on first search: {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
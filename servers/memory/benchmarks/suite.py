@@ -0,0 +1,236 @@
+"""
+End-to-end benchmark suite for the memory server.
+
+    cd servers/memory
+    python -m benchmarks.suite --sizes 10000,100000 --clients 8
+    python -m benchmarks.suite --sizes 1000000 --snapshot-format binary --output runs.jsonl
+
+For each graph size this starts the server with uvicorn on a throwaway
+MEMORY_FILE_PATH and loads a synthetic graph through /import. Observations
+have Zipf-distributed words and log-normal lengths; relation targets are
+heavy-tailed. It then drives each endpoint from concurrent clients and
+reports p50/p99 latency, throughput, the server's RSS and the size of its
+files on disk. --output appends one JSON line per measurement, tagged with
+the snapshot format and size, so storage backends can be compared run
+against run.
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks import synthetic
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+IMPORT_CHUNK_LINES = 10_000
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_mib(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def disk_mib(directory: Path) -> float:
+    return sum(p.stat().st_size for p in directory.rglob("*") if p.is_file()) / 2**20
+
+
+class Server:
+    def __init__(self, workdir: Path, snapshot_format: str):
+        self.port = free_port()
+        env = {
+            **os.environ,
+            "MEMORY_FILE_PATH": str(workdir / "memory.json"),
+            "MEMORY_SNAPSHOT_FORMAT": snapshot_format,
+        }
+        self.process = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "main:app",
+                "--port", str(self.port), "--log-level", "warning",
+            ],
+            cwd=SERVER_DIR,
+            env=env,
+        )
+        self.url = f"http://127.0.0.1:{self.port}"
+        deadline = time.monotonic() + 120
+        while True:
+            try:
+                httpx.get(self.url + "/stats", timeout=5).raise_for_status()
+                return
+            except httpx.HTTPError:
+                if time.monotonic() > deadline or self.process.poll() is not None:
+                    self.stop()
+                    raise RuntimeError("memory server did not start")
+                time.sleep(0.2)
+
+    def stop(self) -> None:
+        self.process.terminate()
+        self.process.wait(timeout=300)
+
+
+def import_lines(size: int, corpus: synthetic.Corpus, seed: int):
+    entities = synthetic.realistic_entities(size, corpus, seed=seed)
+    relations = synthetic.relations(size, size * 3, seed=seed)
+    chunk: List[str] = []
+    for kind, records in (("entity", entities), ("relation", relations)):
+        for record in records:
+            chunk.append(json.dumps({"type": kind, **record}))
+            if len(chunk) == IMPORT_CHUNK_LINES:
+                yield ("\n".join(chunk) + "\n").encode()
+                chunk = []
+    if chunk:
+        yield "\n".join(chunk).encode()
+
+
+def operations(size: int, corpus: synthetic.Corpus) -> Dict[str, Callable]:
+    counter = iter(range(10**12))
+    lock = threading.Lock()
+
+    def fresh_names(k: int) -> List[str]:
+        with lock:
+            return [f"bench-{next(counter)}" for _ in range(k)]
+
+    def entity(rng):
+        return synthetic.entity_name(rng.randrange(size))
+
+    return {
+        "create_entities": lambda c, rng: c.post(
+            "/create_entities",
+            json={
+                "entities": [
+                    {
+                        "name": name,
+                        "entityType": rng.choice(synthetic.ENTITY_TYPES),
+                        "observations": [corpus.sentence(rng) for _ in range(3)],
+                    }
+                    for name in fresh_names(10)
+                ]
+            },
+        ),
+        "add_observations": lambda c, rng: c.post(
+            "/add_observations",
+            json={
+                "observations": [
+                    {"entityName": entity(rng), "contents": [corpus.sentence(rng)]}
+                ]
+            },
+        ),
+        "search_nodes": lambda c, rng: c.post(
+            "/search_nodes",
+            json={"query": " ".join(corpus.draw(rng, 2)), "limit": 10},
+        ),
+        "open_nodes": lambda c, rng: c.post(
+            "/open_nodes", json={"names": [entity(rng) for _ in range(5)]}
+        ),
+        "read_graph": lambda c, rng: c.get(
+            "/read_graph",
+            params={"limit": 100, "entityType": rng.choice(synthetic.ENTITY_TYPES)},
+        ),
+    }
+
+
+def drive(url: str, request: Callable, total: int, clients: int, seed: int):
+    def worker(index: int) -> List[float]:
+        rng = random.Random(seed * 1000 + index)
+        samples = []
+        with httpx.Client(base_url=url, timeout=300) as client:
+            for _ in range(total // clients):
+                t0 = time.perf_counter()
+                request(client, rng).raise_for_status()
+                samples.append((time.perf_counter() - t0) * 1000)
+        return samples
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        samples = [s for chunk in pool.map(worker, range(clients)) for s in chunk]
+    return samples, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=2000, help="per operation")
+    parser.add_argument("--snapshot-format", choices=["jsonl", "binary"], default="jsonl")
+    parser.add_argument("--output", type=Path, help="append JSON lines here")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = synthetic.Corpus(seed=args.seed)
+    for size in map(int, args.sizes.split(",")):
+        workdir = Path(tempfile.mkdtemp(prefix="memory-bench-"))
+        server = Server(workdir, args.snapshot_format)
+        results = []
+        try:
+            with httpx.Client(base_url=server.url, timeout=None) as client:
+                t0 = time.perf_counter()
+                client.post(
+                    "/import", content=import_lines(size, corpus, args.seed)
+                ).raise_for_status()
+                load = time.perf_counter() - t0
+                t0 = time.perf_counter()
+                client.post("/search_nodes", json={"query": "warm up"}).raise_for_status()
+                warm = time.perf_counter() - t0
+            print(
+                f"\n{size:,} entities ({args.snapshot_format}): "
+                f"import {load:.1f}s, index build {warm:.1f}s, "
+                f"RSS {rss_mib(server.process.pid) or 0:.0f} MiB, "
+                f"disk {disk_mib(workdir):.1f} MiB"
+            )
+            for name, request in operations(size, corpus).items():
+                samples, elapsed = drive(
+                    server.url, request, args.requests, args.clients, args.seed
+                )
+                p50, p99 = synthetic.percentiles(samples)
+                result = {
+                    "size": size,
+                    "snapshotFormat": args.snapshot_format,
+                    "operation": name,
+                    "clients": args.clients,
+                    "p50Ms": round(p50, 3),
+                    "p99Ms": round(p99, 3),
+                    "requestsPerSecond": round(len(samples) / elapsed, 1),
+                    "rssMiB": rss_mib(server.process.pid),
+                    "diskMiB": round(disk_mib(workdir), 2),
+                }
+                results.append(result)
+                print(
+                    f"  {name:<17} p50 {p50:8.2f} ms  p99 {p99:8.2f} ms  "
+                    f"{result['requestsPerSecond']:8.1f} req/s"
+                )
+            print(
+                f"  after run: RSS {rss_mib(server.process.pid) or 0:.0f} MiB, "
+                f"disk {disk_mib(workdir):.1f} MiB"
+            )
+        finally:
+            server.stop()
+        if args.output:
+            with open(args.output, "a") as f:
+                f.writelines(json.dumps(r) + "\n" for r in results)
+
+
+if __name__ == "__main__":
+    main()
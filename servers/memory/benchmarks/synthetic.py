@@ -0,0 +1,97 @@
+import itertools
+import math
+import random
+from typing import Iterator, List, Tuple
+
+ENTITY_TYPES = ["person", "organization", "project", "place", "event", "document"]
+RELATION_TYPES = ["works_at", "knows", "member_of", "located_in", "attended", "wrote"]
+WORDS = (
+    "the a project meeting team review deadline launch customer budget report "
+    "design plan release feedback issue roadmap hiring office travel contract "
+    "prefers likes mentioned decided owns leads joined moved started finished"
+).split()
+
+
+def entity_name(i: int) -> str:
+    return f"entity-{i}"
+
+
+def entities(count: int, observations: int = 3, seed: int = 0) -> Iterator[dict]:
+    rng = random.Random(seed)
+    for i in range(count):
+        yield {
+            "name": entity_name(i),
+            "entityType": rng.choice(ENTITY_TYPES),
+            "observations": [
+                " ".join(rng.choices(WORDS, k=rng.randint(4, 16)))
+                for _ in range(observations)
+            ],
+        }
+
+
+def relations(entity_count: int, count: int, seed: int = 0) -> Iterator[dict]:
+    """Relations with a skewed target distribution so a few entities act as hubs."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        source = rng.randrange(entity_count)
+        target = min(int(rng.paretovariate(1.2)) - 1, entity_count - 1)
+        if rng.random() < 0.5:
+            target = rng.randrange(entity_count)
+        yield {
+            "from": entity_name(source),
+            "to": entity_name(target),
+            "relationType": rng.choice(RELATION_TYPES),
+        }
+
+
+def vocabulary(size: int = 5000, seed: int = 0) -> List[str]:
+    """Pronounceable pseudo-words, so term frequencies are controlled by us."""
+    rng = random.Random(seed)
+    consonants, vowels = "bcdfghklmnprstvz", "aeiou"
+    words = dict.fromkeys(WORDS)
+    while len(words) < size:
+        syllables = rng.randint(1, 4)
+        word = "".join(rng.choice(consonants) + rng.choice(vowels) for _ in range(syllables))
+        words[word] = None
+    return list(words)
+
+
+class Corpus:
+    """Draws words with a Zipf distribution, like natural-language text."""
+
+    def __init__(self, size: int = 5000, exponent: float = 1.1, seed: int = 0):
+        self.words = vocabulary(size, seed)
+        self.cum_weights = list(
+            itertools.accumulate(1 / (rank**exponent) for rank in range(1, size + 1))
+        )
+
+    def draw(self, rng: random.Random, k: int) -> List[str]:
+        return rng.choices(self.words, cum_weights=self.cum_weights, k=k)
+
+    def sentence(self, rng: random.Random) -> str:
+        # Word counts are roughly log-normal: mostly short notes, a long tail.
+        length = max(2, min(120, int(rng.lognormvariate(2.4, 0.6))))
+        return " ".join(self.draw(rng, length))
+
+
+def realistic_entities(
+    count: int, corpus: Corpus, mean_observations: float = 4, seed: int = 0
+) -> Iterator[dict]:
+    """Entities with a geometric number of observations of varying length."""
+    rng = random.Random(seed)
+    p = 1 / (mean_observations + 1)
+    for i in range(count):
+        observations = int(math.log(1 - rng.random()) / math.log(1 - p))
+        yield {
+            "name": entity_name(i),
+            "entityType": rng.choice(ENTITY_TYPES),
+            "observations": [corpus.sentence(rng) for _ in range(observations)],
+        }
+
+
+def percentiles(samples: List[float]) -> Tuple[float, float]:
+    ordered = sorted(samples)
+    return (
+        ordered[len(ordered) // 2],
+        ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+    )
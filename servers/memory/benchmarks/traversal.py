@@ -0,0 +1,66 @@
+"""
+Traversal benchmark for the memory server.
+
+    cd servers/memory
+    python -m benchmarks.traversal --entities 200000 --relations 1000000
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from store import GraphStore
+
+from benchmarks import synthetic
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entities", type=int, default=200_000)
+    parser.add_argument("--relations", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    store = GraphStore(Path(tempfile.gettempdir()) / "memory-bench.json")
+    started = time.perf_counter()
+    store.create_entities(
+        list(synthetic.entities(args.entities, observations=1, seed=args.seed))
+    )
+    store.create_relations(
+        list(synthetic.relations(args.entities, args.relations, seed=args.seed))
+    )
+    print(
+        f"built {store.entity_count} entities / {store.relation_count} relations "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+    rng = random.Random(args.seed)
+    starts = [synthetic.entity_name(rng.randrange(args.entities)) for _ in range(args.queries)]
+    for depth in (1, 2, 3):
+        samples = []
+        for name in starts:
+            t0 = time.perf_counter()
+            store.neighbors([name], depth=depth, max_fanout=50, max_nodes=5000)
+            samples.append((time.perf_counter() - t0) * 1000)
+        p50, p99 = synthetic.percentiles(samples)
+        print(f"neighbors depth={depth}: p50 {p50:.2f} ms  p99 {p99:.2f} ms")
+
+    for direction in ("out", "both"):
+        samples, found = [], 0
+        for name in starts:
+            target = synthetic.entity_name(rng.randrange(args.entities))
+            t0 = time.perf_counter()
+            found += store.shortest_path(name, target, direction=direction) is not None
+            samples.append((time.perf_counter() - t0) * 1000)
+        p50, p99 = synthetic.percentiles(samples)
+        print(
+            f"shortest_path direction={direction}: p50 {p50:.2f} ms  p99 {p99:.2f} ms  "
+            f"({found}/{len(starts)} connected)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,31 @@
-from fastapi import FastAPI, HTTPException, Body
+from fastapi import (
+    BackgroundTasks,
+    Body,
+    Depends,
+    FastAPI,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+)
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 
 
 from pydantic import BaseModel, Field
-from typing import List, Literal, Union
+from typing import Iterator, List, Literal, Optional, Union
 from pathlib import Path
+import base64
+import binascii
 import json
 import os
+import re
+import threading
+
+from namespaces import NAMESPACE_PATTERN, Namespace, NamespaceRegistry
+from store import GraphStore, LimitExceeded
+from writer import MutationQueue, StoreFailed
 
 app = FastAPI(
     title="Knowledge Graph Server",
@@ -58,6 +77,83 @@ class KnowledgeGraph(BaseModel):
     relations: List[Relation]
 
 
+class GraphPage(KnowledgeGraph):
+    nextCursor: Optional[str] = Field(
+        None, description="Pass as `cursor` to fetch the next page; null on the last page"
+    )
+
+
+class SubgraphResponse(KnowledgeGraph):
+    truncated: bool = Field(
+        ..., description="Whether a fan-out or node cap stopped the traversal early"
+    )
+
+
+class PathResponse(KnowledgeGraph):
+    length: int = Field(..., description="Number of relations on the path")
+
+
+class QueryPlan(BaseModel):
+    anchor: int = Field(..., description="Index of the pattern node the search started from")
+    index: Literal["name", "text", "type", "scan"] = Field(
+        ..., description="How the anchor's candidates were found"
+    )
+    estimates: List[int] = Field(
+        ..., description="Upper bound on matching entities for each pattern node"
+    )
+
+
+class QueryResponse(KnowledgeGraph):
+    matches: int = Field(..., description="Number of pattern matches found")
+    truncated: bool = Field(
+        ..., description="Whether the match limit or search budget stopped the query early"
+    )
+    plan: QueryPlan
+
+
+class StatsResponse(BaseModel):
+    namespace: str
+    entities: int
+    relations: int
+    observationBytes: int = Field(..., description="Bytes of live observation text")
+    snapshotBytes: int
+    journalBytes: int
+    evictedEntities: int = Field(
+        ..., description="Entities evicted by retention since the namespace was loaded"
+    )
+    evictedObservations: int = Field(
+        ..., description="Observations dropped by the per-entity cap since the namespace was loaded"
+    )
+    residentNamespaces: int
+    namespaceEvictions: int = Field(
+        ..., description="Namespaces unloaded from memory since the server started"
+    )
+
+
+class ScoredEntity(Entity):
+    score: float = Field(..., description="Relevance score; higher is better")
+
+
+class SearchResponse(KnowledgeGraph):
+    total: int = Field(
+        ..., description="Number of entities that matched, before limit and offset"
+    )
+
+
+class SemanticSearchResponse(BaseModel):
+    entities: List[ScoredEntity]
+    relations: List[Relation]
+
+
+class ImportResponse(BaseModel):
+    entitiesCreated: int = Field(..., description="Entities that did not exist before")
+    entitiesMerged: int = Field(
+        ..., description="Entity records merged into an existing entity"
+    )
+    observationsAdded: int = Field(..., description="New observations stored")
+    relationsCreated: int = Field(..., description="Relations that did not exist before")
+
+
 class EntityWrapper(BaseModel):
     type: Literal["entity"]
     name: str
@@ -72,38 +168,121 @@ class RelationWrapper(BaseModel):
     relationType: str
 
 
-# ----- I/O Handlers -----
-def read_graph_file() -> KnowledgeGraph:
-    if not MEMORY_FILE_PATH.exists():
-        return KnowledgeGraph(entities=[], relations=[])
-    with open(MEMORY_FILE_PATH, "r", encoding="utf-8") as f:
-        lines = [line for line in f if line.strip()]
-        entities = []
-        relations = []
-        for line in lines:
-            print(line)
-            item = json.loads(line)
-            if item["type"] == "entity":
-                entities.append(
-                    Entity(
-                        name=item["name"],
-                        entityType=item["entityType"],
-                        observations=item["observations"],
-                    )
-                )
-            elif item["type"] == "relation":
-                relations.append(Relation(**item))
-
-        return KnowledgeGraph(entities=entities, relations=relations)
-
-
-def save_graph(graph: KnowledgeGraph):
-    lines = [json.dumps({"type": "entity", **e.dict()}) for e in graph.entities] + [
-        json.dumps({"type": "relation", **r.dict(by_alias=True)})
-        for r in graph.relations
-    ]
-    with open(MEMORY_FILE_PATH, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines))
+# ----- Graph Store -----
+SEARCH_STEMMING = os.getenv("MEMORY_SEARCH_STEMMING", "false").lower() == "true"
+SEMANTIC_INDEX = os.getenv("MEMORY_SEMANTIC_INDEX", "false").lower() == "true"
+COMMIT_INTERVAL_MS = float(os.getenv("MEMORY_COMMIT_INTERVAL_MS", "5"))
+COMPACT_BYTES = int(os.getenv("MEMORY_COMPACT_BYTES", str(64 << 20)))
+SNAPSHOT_FORMAT = os.getenv("MEMORY_SNAPSHOT_FORMAT", "jsonl").lower()
+if SNAPSHOT_FORMAT not in ("jsonl", "binary"):
+    raise ValueError("MEMORY_SNAPSHOT_FORMAT must be 'jsonl' or 'binary'")
+STREAM_CHUNK_RECORDS = 1000
+
+# Retention; 0 disables each limit.
+MAX_OBSERVATIONS_PER_ENTITY = int(os.getenv("MEMORY_MAX_OBSERVATIONS_PER_ENTITY", "0"))
+RETENTION_MAX_ENTITIES = int(os.getenv("MEMORY_RETENTION_MAX_ENTITIES", "0"))
+RETENTION_TTL_SECONDS = float(os.getenv("MEMORY_RETENTION_TTL_SECONDS", "0"))
+RETENTION_INTERVAL_SECONDS = float(os.getenv("MEMORY_RETENTION_INTERVAL_SECONDS", "60"))
+
+
+# ----- Namespaces -----
+# Each tenant gets its own graph, selected with the X-Memory-Namespace header
+# or a /ns/{namespace}/ path prefix. The default namespace is MEMORY_FILE_PATH.
+DEFAULT_NAMESPACE = "default"
+NAMESPACE_DIR_ENV = os.getenv("MEMORY_NAMESPACE_DIR")
+NAMESPACE_DIR = (
+    Path(NAMESPACE_DIR_ENV) if NAMESPACE_DIR_ENV else MEMORY_FILE_PATH.parent / "namespaces"
+)
+MAX_RESIDENT_NAMESPACES = int(os.getenv("MEMORY_MAX_RESIDENT_NAMESPACES", "64"))
+NAMESPACE_IDLE_SECONDS = float(os.getenv("MEMORY_NAMESPACE_IDLE_SECONDS", "300"))
+NAMESPACE_MAX_ENTITIES = int(os.getenv("MEMORY_NAMESPACE_MAX_ENTITIES", "0"))
+NAMESPACE_MAX_RELATIONS = int(os.getenv("MEMORY_NAMESPACE_MAX_RELATIONS", "0"))
+NAMESPACE_PREFIX = re.compile(r"^/ns/([^/]+)(/.*)?$")
+
+
+def open_namespace(name: str):
+    if name == DEFAULT_NAMESPACE:
+        path = MEMORY_FILE_PATH
+    else:
+        NAMESPACE_DIR.mkdir(parents=True, exist_ok=True)
+        path = NAMESPACE_DIR / f"{name}.json"
+    store = GraphStore(
+        path,
+        stemming=SEARCH_STEMMING,
+        semantic=SEMANTIC_INDEX,
+        compact_bytes=COMPACT_BYTES,
+        snapshot_format=SNAPSHOT_FORMAT,
+        max_entities=NAMESPACE_MAX_ENTITIES,
+        max_relations=NAMESPACE_MAX_RELATIONS,
+        max_observations=MAX_OBSERVATIONS_PER_ENTITY,
+        retain_entities=RETENTION_MAX_ENTITIES,
+        ttl_seconds=RETENTION_TTL_SECONDS,
+    )
+    store.load()
+    # Serve requests right away; searches that arrive first wait for the build.
+    threading.Thread(
+        target=store.ensure_indexes, name="memory-indexer", daemon=True
+    ).start()
+    return store, MutationQueue(
+        store,
+        interval=COMMIT_INTERVAL_MS / 1000,
+        maintenance_interval=(
+            RETENTION_INTERVAL_SECONDS
+            if RETENTION_MAX_ENTITIES or RETENTION_TTL_SECONDS
+            else None
+        ),
+    )
+
+
+registry = NamespaceRegistry(
+    open_namespace,
+    max_resident=MAX_RESIDENT_NAMESPACES,
+    idle_seconds=NAMESPACE_IDLE_SECONDS,
+)
+
+
+@app.middleware("http")
+async def namespace_prefix(request: Request, call_next):
+    match = NAMESPACE_PREFIX.match(request.scope["path"])
+    if match:
+        request.scope["memory_namespace"] = match.group(1)
+        request.scope["path"] = match.group(2) or "/"
+    return await call_next(request)
+
+
+def namespace(
+    request: Request,
+    x_memory_namespace: Optional[str] = Header(
+        None, description="Graph namespace; defaults to the shared graph"
+    ),
+) -> Iterator[Namespace]:
+    name = (
+        request.scope.get("memory_namespace") or x_memory_namespace or DEFAULT_NAMESPACE
+    )
+    if not NAMESPACE_PATTERN.match(name):
+        raise HTTPException(status_code=400, detail=f"Invalid namespace {name!r}")
+    with registry.lease(name) as graph:
+        yield graph
+
+
+def submit(graph: Namespace, op: str, payload: dict):
+    try:
+        return graph.writer.submit(op, payload)
+    except LimitExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except StoreFailed as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@app.on_event("startup")
+def open_default_namespace():
+    with registry.lease(DEFAULT_NAMESPACE):
+        pass
+
+
+@app.on_event("shutdown")
+def flush_graph():
+    registry.close()
 
 
 # ----- Request Models -----
@@ -168,130 +347,429 @@ class SearchNodesRequest(BaseModel):
         ...,
         description="The search query to match against entity names, types, and observation content",
     )
+    limit: Optional[int] = Field(
+        None, ge=1, description="Maximum number of entities to return; all matches when omitted"
+    )
+    offset: int = Field(
+        0, ge=0, description="Number of top-ranked entities to skip, for paging"
+    )
+
+
+class SemanticSearchRequest(BaseModel):
+    query: str = Field(..., description="Natural-language text to find similar entities for")
+    limit: int = Field(10, ge=1, le=1000, description="Number of entities to return")
+    mode: Literal["vector", "hybrid"] = Field(
+        "vector",
+        description="Rank by vector similarity only, or fuse vector and keyword rankings",
+    )
 
 
 class OpenNodesRequest(BaseModel):
     names: List[str] = Field(..., description="An array of entity names to retrieve")
 
 
+class NeighborsRequest(BaseModel):
+    names: List[str] = Field(..., description="Entity names to start the traversal from")
+    depth: int = Field(1, ge=1, le=6, description="Number of hops to expand")
+    direction: Literal["out", "in", "both"] = Field(
+        "both", description="Follow outgoing relations, incoming relations, or both"
+    )
+    relationTypes: Optional[List[str]] = Field(
+        None, description="Only follow relations of these types"
+    )
+    maxFanout: int = Field(
+        100, ge=1, description="Maximum number of relations followed from any single entity"
+    )
+    maxNodes: int = Field(
+        1000, ge=1, le=100000, description="Maximum number of entities in the result"
+    )
+
+
+class ShortestPathRequest(BaseModel):
+    from_: str = Field(..., alias="from", description="The entity the path starts at")
+    to: str = Field(..., description="The entity the path ends at")
+    direction: Literal["out", "in", "both"] = Field(
+        "out", description="Follow relations forwards, backwards, or in either direction"
+    )
+    relationTypes: Optional[List[str]] = Field(
+        None, description="Only follow relations of these types"
+    )
+    maxDepth: int = Field(6, ge=1, le=12, description="Maximum path length in relations")
+
+
+class PatternNode(BaseModel):
+    name: Optional[str] = Field(None, description="Exact entity name")
+    entityType: Optional[str] = Field(None, description="Entity type")
+    text: Optional[str] = Field(
+        None,
+        description="Terms that must all occur in the entity's name, type or observations",
+    )
+
+
+class PatternEdge(BaseModel):
+    relationTypes: Optional[List[str]] = Field(
+        None, description="Only match relations of these types"
+    )
+    direction: Literal["out", "in", "both"] = Field(
+        "out", description="Relation goes from the previous node to the next, the reverse, or either"
+    )
+
+
+class QueryRequest(BaseModel):
+    nodes: List[PatternNode] = Field(
+        ..., min_length=1, max_length=5, description="Node filters, in chain order"
+    )
+    edges: List[PatternEdge] = Field(
+        default_factory=list,
+        description="Edge filters; edges[i] joins nodes[i] and nodes[i + 1]",
+    )
+    limit: int = Field(100, ge=1, le=10000, description="Maximum number of matches")
+
+
 # ----- Endpoints -----
 
 
 @app.post("/create_entities", summary="Create multiple entities in the graph")
-def create_entities(req: CreateEntitiesRequest):
-    graph = read_graph_file()
-    existing_names = {e.name for e in graph.entities}
-    new_entities = [e for e in req.entities if e.name not in existing_names]
-    graph.entities.extend(new_entities)
-    save_graph(graph)
-    return new_entities
+def create_entities(req: CreateEntitiesRequest, graph: Namespace = Depends(namespace)):
+    return submit(graph, "create_entities", req.model_dump())
 
 
 @app.post("/create_relations", summary="Create multiple relations between entities")
-def create_relations(req: CreateRelationsRequest):
-    graph = read_graph_file()
-    existing = {(r.from_, r.to, r.relationType) for r in graph.relations}
-    new = [r for r in req.relations if (r.from_, r.to, r.relationType) not in existing]
-    graph.relations.extend(new)
-    save_graph(graph)
-    return new
+def create_relations(req: CreateRelationsRequest, graph: Namespace = Depends(namespace)):
+    return submit(graph, "create_relations", req.model_dump(by_alias=True))
 
 
 @app.post("/add_observations", summary="Add new observations to existing entities")
-def add_observations(req: AddObservationsRequest):
-    graph = read_graph_file()
-    results = []
-
+def add_observations(req: AddObservationsRequest, graph: Namespace = Depends(namespace)):
     for obs in req.observations:
-        name = obs.entityName.lower()
-        contents = obs.contents
-        entity = next((e for e in graph.entities if e.name == name), None)
-        if not entity:
-            raise HTTPException(status_code=404, detail=f"Entity {name} not found")
-        added = [c for c in contents if c not in entity.observations]
-        entity.observations.extend(added)
-        results.append({"entityName": name, "addedObservations": added})
-
-    save_graph(graph)
-    return results
+        obs.entityName = obs.entityName.lower()
+    try:
+        return submit(graph, "add_observations", req.model_dump())
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Entity {e.args[0]} not found")
 
 
 @app.post("/delete_entities", summary="Delete entities and associated relations")
-def delete_entities(req: DeleteEntitiesRequest):
-    graph = read_graph_file()
-    graph.entities = [e for e in graph.entities if e.name not in req.entityNames]
-    graph.relations = [
-        r
-        for r in graph.relations
-        if r.from_ not in req.entityNames and r.to not in req.entityNames
-    ]
-    save_graph(graph)
+def delete_entities(req: DeleteEntitiesRequest, graph: Namespace = Depends(namespace)):
+    submit(graph, "delete_entities", req.model_dump())
     return {"message": "Entities deleted successfully"}
 
 
 @app.post("/delete_observations", summary="Delete specific observations from entities")
-def delete_observations(req: DeleteObservationsRequest):
-    graph = read_graph_file()
-
+def delete_observations(req: DeleteObservationsRequest, graph: Namespace = Depends(namespace)):
     for deletion in req.deletions:
-        name = deletion.entityName.lower()
-        to_delete = deletion.observations
-        entity = next((e for e in graph.entities if e.name == name), None)
-        if entity:
-            entity.observations = [
-                obs for obs in entity.observations if obs not in to_delete
-            ]
-
-    save_graph(graph)
+        deletion.entityName = deletion.entityName.lower()
+    submit(graph, "delete_observations", req.model_dump())
     return {"message": "Observations deleted successfully"}
 
 
 @app.post("/delete_relations", summary="Delete relations from the graph")
-def delete_relations(req: DeleteRelationsRequest):
-    graph = read_graph_file()
-    del_set = {(r.from_, r.to, r.relationType) for r in req.relations}
-    graph.relations = [
-        r for r in graph.relations if (r.from_, r.to, r.relationType) not in del_set
-    ]
-    save_graph(graph)
+def delete_relations(req: DeleteRelationsRequest, graph: Namespace = Depends(namespace)):
+    submit(graph, "delete_relations", req.model_dump(by_alias=True))
     return {"message": "Relations deleted successfully"}
 
 
+def ndjson_records(
+    store: GraphStore,
+    entity_type: Optional[str] = None,
+    relation_type: Optional[str] = None,
+) -> Iterator[str]:
+    # Each chunk is read under its own lock so slow clients never hold up the
+    # writer; the stream is not a point-in-time snapshot while writes land.
+    position = ("entities", 0)
+    while position is not None:
+        with store.lock.read():
+            records, position = store.page(
+                position,
+                STREAM_CHUNK_RECORDS,
+                entity_type=entity_type,
+                relation_type=relation_type,
+            )
+            chunk = "".join(json.dumps({"type": kind, **r}) + "\n" for kind, r in records)
+        if chunk:
+            yield chunk
+
+
+def encode_cursor(store: GraphStore, position) -> Optional[str]:
+    if position is None:
+        return None
+    raw = f"{store.epoch}:{position[0]}:{position[1]}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(store: GraphStore, cursor: str):
+    try:
+        epoch, section, slot = base64.urlsafe_b64decode(cursor).decode().split(":")
+        position = (section, int(slot))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if section not in ("entities", "relations"):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if epoch != store.epoch:
+        raise HTTPException(
+            status_code=400,
+            detail="Cursor is no longer valid; restart from the first page",
+        )
+    return position
+
+
 @app.get(
-    "/read_graph", response_model=KnowledgeGraph, summary="Read entire knowledge graph"
+    "/read_graph",
+    response_model=GraphPage,
+    summary="Read the knowledge graph",
+    description="Returns the whole graph, or one page of it when `limit` is set. Pages list entities first, then relations.",
 )
-def read_graph():
-    return read_graph_file()
+def read_graph(
+    limit: Optional[int] = Query(
+        None, ge=1, le=10000, description="Records per page; omit to read everything"
+    ),
+    cursor: Optional[str] = Query(None, description="`nextCursor` of the previous page"),
+    entityType: Optional[str] = Query(None, description="Only return entities of this type"),
+    relationType: Optional[str] = Query(
+        None, description="Only return relations of this type"
+    ),
+    graph: Namespace = Depends(namespace),
+):
+    # Records go straight from the store to JSON; building a pydantic model per
+    # record dominates the cost on large graphs.
+    store = graph.store
+    with store.lock.read():
+        position = decode_cursor(store, cursor) if cursor else ("entities", 0)
+        records, next_position = store.page(
+            position,
+            limit or len(store.names) + len(store.rel_type),
+            entity_type=entityType,
+            relation_type=relationType,
+        )
+        body = json.dumps(
+            {
+                "entities": [r for kind, r in records if kind == "entity"],
+                "relations": [r for kind, r in records if kind == "relation"],
+                "nextCursor": encode_cursor(store, next_position),
+            }
+        )
+    return Response(body, media_type="application/json")
+
+
+@app.get(
+    "/read_graph/stream",
+    summary="Stream the knowledge graph as NDJSON",
+    description="One JSON record per line in the same format as the memory file. Each chunk is read under its own lock, so the stream is not a point-in-time snapshot while writes are in flight.",
+    response_class=StreamingResponse,
+)
+def stream_graph(
+    entityType: Optional[str] = Query(None, description="Only return entities of this type"),
+    relationType: Optional[str] = Query(
+        None, description="Only return relations of this type"
+    ),
+    graph: Namespace = Depends(namespace),
+):
+    return StreamingResponse(
+        ndjson_records(graph.store, entityType, relationType),
+        media_type="application/x-ndjson",
+    )
+
+
+@app.get(
+    "/export",
+    summary="Export the knowledge graph as NDJSON",
+    description="Streams every entity and relation in the memory-file format, ready for /import.",
+    response_class=StreamingResponse,
+)
+def export_graph(graph: Namespace = Depends(namespace)):
+    return StreamingResponse(
+        ndjson_records(graph.store),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="memory.jsonl"'},
+    )
+
+
+def parse_import_line(line: bytes, number: int):
+    try:
+        item = json.loads(line)
+        if item["type"] == "entity":
+            record = {
+                "name": item["name"],
+                "entityType": item["entityType"],
+                "observations": item["observations"],
+            }
+            valid = (
+                isinstance(record["name"], str)
+                and isinstance(record["entityType"], str)
+                and isinstance(record["observations"], list)
+                and all(isinstance(o, str) for o in record["observations"])
+            )
+        elif item["type"] == "relation":
+            record = {
+                "from": item["from"],
+                "to": item["to"],
+                "relationType": item["relationType"],
+            }
+            valid = all(isinstance(v, str) for v in record.values())
+        else:
+            valid = False
+    except (ValueError, KeyError, TypeError):
+        valid = False
+    if not valid:
+        raise HTTPException(status_code=400, detail=f"Invalid record on line {number}")
+    return item["type"], record
+
+
+@app.post(
+    "/import",
+    response_model=ImportResponse,
+    summary="Bulk import entities and relations from NDJSON",
+    description="Send one memory-file record per line (as produced by /export). Records are parsed as the body streams in and applied in a single commit; observations of existing entities are merged.",
+)
+async def import_graph(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    graph: Namespace = Depends(namespace),
+):
+    entities, relations = [], []
+    buffer, number = b"", 0
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            if line.strip():
+                kind, record = parse_import_line(line, number)
+                (entities if kind == "entity" else relations).append(record)
+    if buffer.strip():
+        kind, record = parse_import_line(buffer, number + 1)
+        (entities if kind == "entity" else relations).append(record)
+    result = await run_in_threadpool(
+        submit,
+        graph,
+        "import_records",
+        {"entities": entities, "relations": relations},
+    )
+    # Warm the search indexes now instead of on the first search.
+    background_tasks.add_task(graph.store.ensure_indexes)
+    return result
 
 
 @app.post(
     "/search_nodes",
-    response_model=KnowledgeGraph,
+    response_model=SearchResponse,
     summary="Search for nodes by keyword",
+    description="Full-text search over entity names, types and observations. Matches whole words, case-insensitively: 'ali' does not find 'alice'. Entities are ranked by BM25 relevance; relations among the returned entities are included, and total counts every match.",
 )
-def search_nodes(req: SearchNodesRequest):
-    graph = read_graph_file()
-    print(graph)
-    entities = [
-        e
-        for e in graph.entities
-        if req.query.lower() in e.name.lower()
-        or req.query.lower() in e.entityType.lower()
-        or any(req.query.lower() in o.lower() for o in e.observations)
-    ]
-    names = {e.name for e in entities}
-    relations = [r for r in graph.relations if r.from_ in names and r.to in names]
-
-    print(names, relations)
-    return KnowledgeGraph(entities=entities, relations=relations)
+def search_nodes(req: SearchNodesRequest, graph: Namespace = Depends(namespace)):
+    with graph.store.indexed_read():
+        return SearchResponse.model_validate(
+            graph.store.search(req.query, limit=req.limit, offset=req.offset)
+        )
+
+
+@app.post(
+    "/semantic_search",
+    response_model=SemanticSearchResponse,
+    summary="Search for nodes by meaning",
+    description="Ranks entities by similarity of their observations to the query using a local hashing vectorizer. Requires MEMORY_SEMANTIC_INDEX=true.",
+)
+def semantic_search(req: SemanticSearchRequest, graph: Namespace = Depends(namespace)):
+    store = graph.store
+    if store.vector_index is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Semantic index is disabled; set MEMORY_SEMANTIC_INDEX=true",
+        )
+    with store.indexed_read():
+        ranked = store.semantic_search(
+            req.query, limit=req.limit, hybrid=req.mode == "hybrid"
+        )
+        return SemanticSearchResponse(
+            entities=[
+                ScoredEntity(**store.entity(nid), score=score) for nid, score in ranked
+            ],
+            relations=store.relations_among({nid: None for nid, _ in ranked}),
+        )
 
 
 @app.post(
     "/open_nodes", response_model=KnowledgeGraph, summary="Open specific nodes by name"
 )
-def open_nodes(req: OpenNodesRequest):
-    graph = read_graph_file()
-    entities = [e for e in graph.entities if e.name in req.names]
-    names = {e.name for e in entities}
-    relations = [r for r in graph.relations if r.from_ in names and r.to in names]
-    return KnowledgeGraph(entities=entities, relations=relations)
+def open_nodes(req: OpenNodesRequest, graph: Namespace = Depends(namespace)):
+    with graph.store.lock.read():
+        return KnowledgeGraph.model_validate(graph.store.subgraph(req.names))
+
+
+@app.post(
+    "/neighbors",
+    response_model=SubgraphResponse,
+    summary="Get the k-hop neighborhood of entities",
+)
+def neighbors(req: NeighborsRequest, graph: Namespace = Depends(namespace)):
+    with graph.store.lock.read():
+        subgraph, truncated = graph.store.neighbors(
+            req.names,
+            depth=req.depth,
+            direction=req.direction,
+            relation_types=set(req.relationTypes) if req.relationTypes else None,
+            max_fanout=req.maxFanout,
+            max_nodes=req.maxNodes,
+        )
+        return SubgraphResponse.model_validate({**subgraph, "truncated": truncated})
+
+
+@app.post(
+    "/shortest_path",
+    response_model=PathResponse,
+    summary="Find the shortest path between two entities",
+)
+def shortest_path(req: ShortestPathRequest, graph: Namespace = Depends(namespace)):
+    with graph.store.lock.read():
+        path = graph.store.shortest_path(
+            req.from_,
+            req.to,
+            direction=req.direction,
+            relation_types=set(req.relationTypes) if req.relationTypes else None,
+            max_depth=req.maxDepth,
+        )
+        if path is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No path from {req.from_} to {req.to} within {req.maxDepth} hops",
+            )
+        return PathResponse.model_validate({**path, "length": len(path["relations"])})
+
+
+@app.post(
+    "/query",
+    response_model=QueryResponse,
+    summary="Match a pattern of entities and relations",
+    description="Finds chains of entities joined by relations, e.g. people who `works_at` a company whose observations mention a term. Node filters use the name, type and full-text indexes; the most selective node anchors the search. Returns only the matching subgraph.",
+)
+def query(req: QueryRequest, graph: Namespace = Depends(namespace)):
+    if len(req.edges) != len(req.nodes) - 1:
+        raise HTTPException(
+            status_code=400, detail="A pattern with n nodes needs n - 1 edges"
+        )
+    store = graph.store
+    with store.indexed_read():
+        subgraph, matches, truncated, plan = store.match(
+            [n.model_dump() for n in req.nodes],
+            [e.model_dump() for e in req.edges],
+            limit=req.limit,
+        )
+        return QueryResponse.model_validate(
+            {**subgraph, "matches": matches, "truncated": truncated, "plan": plan}
+        )
+
+
+@app.get(
+    "/stats",
+    response_model=StatsResponse,
+    summary="Report graph size and retention activity",
+)
+def stats(graph: Namespace = Depends(namespace)):
+    with graph.store.lock.read():
+        counts = graph.store.stats()
+    return StatsResponse(
+        namespace=graph.name,
+        residentNamespaces=len(registry),
+        namespaceEvictions=registry.evictions,
+        **counts,
+    )
@@ -0,0 +1,181 @@
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from store import GraphStore
+from writer import MutationQueue
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE_PATTERN = re.compile(r"^[A-Za-z0-9_-][A-Za-z0-9_.-]{0,63}$")
+
+
+class Namespace:
+    """One tenant's graph while it is resident. Leased per request."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.store: Optional[GraphStore] = None
+        self.writer: Optional[MutationQueue] = None
+        self.ready = threading.Event()
+        self.error: Optional[BaseException] = None
+        self.leases = 0
+        self.last_used = time.monotonic()
+
+
+class NamespaceRegistry:
+    """
+    Bounded LRU of loaded namespaces.
+
+    A namespace is opened on first use and stays resident while requests hold
+    a lease on it. Once released it may be evicted, least recently used first,
+    when more than `max_resident` are loaded or after `idle_seconds` without
+    use. Eviction closes the namespace's writer, which flushes pending
+    mutations and checkpoints the snapshot, so reopening it is a plain load.
+    Namespaces that are leased are never evicted; the bound is exceeded
+    instead until they are released. A namespace whose writer failed to
+    commit is evicted as soon as it is released, without a checkpoint, so
+    the next request reloads its last durable state.
+    """
+
+    def __init__(
+        self,
+        open_namespace: Callable[[str], Tuple[GraphStore, MutationQueue]],
+        max_resident: int = 64,
+        idle_seconds: float = 300.0,
+    ):
+        self.open_namespace = open_namespace
+        self.max_resident = max_resident
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._resident: "OrderedDict[str, Namespace]" = OrderedDict()
+        # Namespaces being flushed; reopening waits so two stores never write
+        # the same files.
+        self._closing: Dict[str, threading.Event] = {}
+        self.evictions = 0
+        self._stopped = threading.Event()
+        self._reaper: Optional[threading.Thread] = None
+        if idle_seconds > 0:
+            self._reaper = threading.Thread(
+                target=self._reap, name="memory-namespace-reaper", daemon=True
+            )
+            self._reaper.start()
+
+    def __len__(self) -> int:
+        return len(self._resident)
+
+    @contextmanager
+    def lease(self, name: str) -> Iterator[Namespace]:
+        namespace = self._acquire(name)
+        try:
+            yield namespace
+        finally:
+            with self._lock:
+                namespace.leases -= 1
+                namespace.last_used = time.monotonic()
+                failed = []
+                if (
+                    namespace.writer is not None
+                    and namespace.writer.failed is not None
+                    and self._evictable(namespace)
+                    and self._resident.get(namespace.name) is namespace
+                ):
+                    failed = self._take([namespace])
+            self._evict(failed + self._over_capacity())
+
+    def close(self) -> None:
+        """Flush and drop every resident namespace."""
+        self._stopped.set()
+        if self._reaper is not None:
+            self._reaper.join()
+        with self._lock:
+            namespaces = list(self._resident.values())
+            self._resident.clear()
+        for namespace in namespaces:
+            if namespace.writer is not None:
+                namespace.writer.close()
+
+    # --- residency ------------------------------------------------------------
+    def _acquire(self, name: str) -> Namespace:
+        with self._lock:
+            namespace = self._resident.get(name)
+            opening = namespace is None
+            if opening:
+                namespace = self._resident[name] = Namespace(name)
+            self._resident.move_to_end(name)
+            namespace.leases += 1
+            closing = self._closing.get(name)
+        if opening:
+            if closing is not None:
+                closing.wait()
+            try:
+                namespace.store, namespace.writer = self.open_namespace(name)
+            except BaseException as e:
+                namespace.error = e
+                with self._lock:
+                    if self._resident.get(name) is namespace:
+                        del self._resident[name]
+                raise
+            finally:
+                namespace.ready.set()
+            self._evict(self._over_capacity())
+        else:
+            namespace.ready.wait()
+            if namespace.error is not None:
+                with self._lock:
+                    namespace.leases -= 1
+                raise namespace.error
+        return namespace
+
+    def _evictable(self, namespace: Namespace) -> bool:
+        return (
+            namespace.leases == 0
+            and namespace.ready.is_set()
+            and namespace.error is None
+        )
+
+    def _over_capacity(self) -> List[Namespace]:
+        with self._lock:
+            excess = len(self._resident) - self.max_resident
+            if excess <= 0:
+                return []
+            victims = [ns for ns in self._resident.values() if self._evictable(ns)]
+            return self._take(victims[:excess])
+
+    def _idle(self) -> List[Namespace]:
+        cutoff = time.monotonic() - self.idle_seconds
+        with self._lock:
+            return self._take(
+                [
+                    ns
+                    for ns in self._resident.values()
+                    if self._evictable(ns) and ns.last_used < cutoff
+                ]
+            )
+
+    def _take(self, namespaces: List[Namespace]) -> List[Namespace]:
+        # Caller holds the lock.
+        for namespace in namespaces:
+            del self._resident[namespace.name]
+            self._closing[namespace.name] = threading.Event()
+        return namespaces
+
+    def _evict(self, namespaces: List[Namespace]) -> None:
+        for namespace in namespaces:
+            try:
+                namespace.writer.close()
+            except Exception:
+                logger.exception("Failed to flush namespace %s", namespace.name)
+            finally:
+                with self._lock:
+                    self._closing.pop(namespace.name).set()
+                    self.evictions += 1
+
+    def _reap(self) -> None:
+        interval = min(max(self.idle_seconds / 4, 1.0), 30.0)
+        while not self._stopped.wait(interval):
+            self._evict(self._idle())
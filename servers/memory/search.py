@@ -0,0 +1,151 @@
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Longest suffixes first so "ies" wins over "s".
+STEM_SUFFIXES = ("ational", "ations", "ation", "ness", "ment", "ing", "ies", "ed", "ly", "es", "s")
+
+
+def stem(token: str) -> str:
+    """Very light suffix stripping; keeps at least three characters of stem."""
+    for suffix in STEM_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            if suffix == "ies":
+                return token[: -len(suffix)] + "y"
+            return token[: -len(suffix)]
+    return token
+
+
+class FullTextIndex:
+    """
+    Inverted index over entity documents, ranked with Okapi BM25.
+    Documents are updated incrementally: callers add and remove the texts
+    (name, type, observations) that make up a document as they change.
+    """
+
+    def __init__(self, stemming: bool = False, k1: float = 1.2, b: float = 0.75):
+        self.stemming = stemming
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[Hashable, int]] = {}
+        self._lengths: Dict[Hashable, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def tokenize(self, text: str) -> List[str]:
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        if self.stemming:
+            return [stem(t) for t in tokens]
+        return tokens
+
+    def _count(self, texts: Iterable[str]) -> Counter:
+        # One regex pass over the joined texts is much cheaper than one per text.
+        return Counter(self.tokenize("\n".join(texts)))
+
+    # --- maintenance ----------------------------------------------------------
+    def add(self, doc: Hashable, texts: Iterable[str]) -> None:
+        counts = self._count(texts)
+        if not counts:
+            return
+        postings = self._postings
+        for term, tf in counts.items():
+            posting = postings.get(term)
+            if posting is None:
+                postings[term] = {doc: tf}
+            else:
+                posting[doc] = posting.get(doc, 0) + tf
+        added = sum(counts.values())
+        self._lengths[doc] = self._lengths.get(doc, 0) + added
+        self._total_length += added
+
+    def add_documents(self, documents: Iterable[Tuple[Hashable, Iterable[str]]]) -> None:
+        """add() for documents not yet in the index, as one pass for rebuilds."""
+        postings, lengths = self._postings, self._lengths
+        total = 0
+        for doc, texts in documents:
+            tokens = self.tokenize("\n".join(texts))
+            if not tokens:
+                continue
+            for term, tf in Counter(tokens).items():
+                posting = postings.get(term)
+                if posting is None:
+                    postings[term] = {doc: tf}
+                else:
+                    posting[doc] = tf
+            lengths[doc] = len(tokens)
+            total += len(tokens)
+        self._total_length += total
+
+    def remove(self, doc: Hashable, texts: Iterable[str]) -> None:
+        if doc not in self._lengths:
+            return
+        counts = self._count(texts)
+        removed = 0
+        for term, tf in counts.items():
+            posting = self._postings.get(term)
+            if posting is None or doc not in posting:
+                continue
+            left = posting[doc] - tf
+            removed += min(tf, posting[doc])
+            if left > 0:
+                posting[doc] = left
+            else:
+                del posting[doc]
+                if not posting:
+                    del self._postings[term]
+        self._total_length -= removed
+        remaining = self._lengths[doc] - removed
+        if remaining > 0:
+            self._lengths[doc] = remaining
+        else:
+            del self._lengths[doc]
+
+    # --- queries --------------------------------------------------------------
+    def document_frequency(self, term: str) -> int:
+        return len(self._postings.get(term, ()))
+
+    def postings(self, query: str) -> List[Dict[Hashable, int]]:
+        """Postings of each distinct query term, rarest first; {} for unknown terms."""
+        return sorted(
+            (self._postings.get(term, {}) for term in set(self.tokenize(query))),
+            key=len,
+        )
+
+    def search(
+        self, query: str, limit: Optional[int] = 10, offset: int = 0
+    ) -> List[Tuple[Hashable, float]]:
+        return self.search_page(query, limit, offset)[0]
+
+    def search_page(
+        self, query: str, limit: Optional[int], offset: int = 0
+    ) -> Tuple[List[Tuple[Hashable, float]], int]:
+        """
+        The `limit` best documents after the first `offset` (all of them when
+        limit is None), and how many documents matched in all.
+        """
+        terms = set(self.tokenize(query))
+        n_docs = len(self._lengths)
+        if not terms or not n_docs:
+            return [], 0
+        avg_length = self._total_length / n_docs
+        scores: Dict[Hashable, float] = {}
+        for term in terms:
+            posting = self._postings.get(term)
+            if not posting:
+                continue
+            df = len(posting)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for doc, tf in posting.items():
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc] / avg_length)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        if limit is None:
+            ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        else:
+            ranked = heapq.nlargest(offset + limit, scores.items(), key=lambda kv: kv[1])
+        return ranked[offset:], len(scores)
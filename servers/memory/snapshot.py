@@ -0,0 +1,150 @@
+"""
+Columnar binary snapshot for GraphStore.
+
+The file is MAGIC, a little-endian u32 header length, a JSON header and then
+the sections back to back. The header maps each section name to its offset
+(from the end of the header), length and array typecode. Names and types are
+stored as JSON string lists so they decode in a single C-level call; every
+other section is a raw array that loads with one copy. The observation arena
+is not copied at all: the store reads texts straight out of the mapped file.
+
+Deleted nodes and relations are dropped on write, so ids are renumbered.
+Access times used by retention are kept too; JSONL snapshots have none, so
+every entity loaded from one counts as accessed at load time.
+"""
+
+import itertools
+import json
+import mmap
+import struct
+import sys
+import time
+from array import array
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple, Union
+
+MAGIC = b"KGSNAP\x00\x01"
+HEADER_LENGTH = struct.Struct("<I")
+
+Section = Union[bytes, array]
+
+
+def is_binary(path) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def _csr(lists: Iterable, remap: Optional[array] = None) -> Tuple[array, array]:
+    """Flatten per-node arrays into (starts, values); starts has n + 1 entries."""
+    starts, values = array("Q", [0]), array("I")
+    for items in lists:
+        if items:
+            values.extend(items if remap is None else (remap[i] for i in items))
+        starts.append(len(values))
+    return starts, values
+
+
+def write(store, f: BinaryIO) -> None:
+    live = [nid for nid, name in enumerate(store.names) if name is not None]
+    node_map = array("i", [-1]) * len(store.names)
+    for new, nid in enumerate(live):
+        node_map[nid] = new
+    # Deleted relations carry a negative type id.
+    live_relations = [rid for rid, t in enumerate(store.rel_type) if t >= 0]
+    if len(live_relations) == len(store.rel_type):
+        relation_map = None
+    else:
+        relation_map = array("i", [-1]) * len(store.rel_type)
+        for new, rid in enumerate(live_relations):
+            relation_map[rid] = new
+
+    obs_start, obs = array("Q", [0]), array("Q")
+    for nid in live:
+        packed = store.observations[nid]
+        if packed:
+            obs.extend(packed)
+        obs_start.append(len(obs))
+    out_start, out = _csr((store.out_edges[nid] for nid in live), relation_map)
+    in_start, in_ = _csr((store.in_edges[nid] for nid in live), relation_map)
+
+    sections: Dict[str, Section] = {
+        "types": json.dumps(store.types.strings).encode("utf-8"),
+        "names": json.dumps([store.names[nid] for nid in live]).encode("utf-8"),
+        "entity_types": array("i", (store.entity_types[nid] for nid in live)),
+        "accessed": array("d", (store.accessed[nid] for nid in live)),
+        "obs_start": obs_start,
+        "obs": obs,
+        "rel_from": array("I", (node_map[store.rel_from[r]] for r in live_relations)),
+        "rel_to": array("I", (node_map[store.rel_to[r]] for r in live_relations)),
+        "rel_type": array("i", (store.rel_type[r] for r in live_relations)),
+        "out_start": out_start,
+        "out": out,
+        "in_start": in_start,
+        "in": in_,
+    }
+    layout, offset = {}, 0
+    for name, data in sections.items():
+        length = len(data) * data.itemsize if isinstance(data, array) else len(data)
+        typecode = data.typecode if isinstance(data, array) else None
+        layout[name] = [offset, length, typecode]
+        offset += length
+    layout["arena"] = [offset, len(store.arena), None]
+    header = json.dumps({"byteorder": sys.byteorder, "sections": layout}).encode()
+
+    f.write(MAGIC)
+    f.write(HEADER_LENGTH.pack(len(header)))
+    f.write(header)
+    for data in sections.values():
+        f.write(data)
+    for chunk in store.arena.chunks():
+        f.write(chunk)
+
+
+def _split(starts: array, values: array) -> List:
+    return [
+        values[a:b] if b > a else None
+        for a, b in zip(starts, itertools.islice(starts, 1, None))
+    ]
+
+
+def read(store, path) -> memoryview:
+    """
+    Fill an empty store's columns from a binary snapshot and return the mapped
+    observation arena.
+    """
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    start = len(MAGIC) + HEADER_LENGTH.size
+    (header_length,) = HEADER_LENGTH.unpack_from(mapped, len(MAGIC))
+    header = json.loads(mapped[start : start + header_length])
+    base = start + header_length
+    swap = header["byteorder"] != sys.byteorder
+
+    def section(name: str):
+        offset, length, typecode = header["sections"][name]
+        raw = mapped[base + offset : base + offset + length]
+        if typecode is None:
+            return raw
+        column = array(typecode)
+        column.frombytes(raw)
+        if swap:
+            column.byteswap()
+        return column
+
+    store.types.strings = json.loads(section("types"))
+    store.types.ids = {s: i for i, s in enumerate(store.types.strings)}
+    store.names = json.loads(section("names"))
+    store.node_ids = dict(zip(store.names, range(len(store.names))))
+    store.entity_types = section("entity_types")
+    if "accessed" in header["sections"]:
+        store.accessed = section("accessed")
+    else:
+        store.accessed = array("d", [time.time()]) * len(store.names)
+    store.observations = _split(section("obs_start"), section("obs"))
+    store.rel_from = section("rel_from")
+    store.rel_to = section("rel_to")
+    store.rel_type = section("rel_type")
+    store.out_edges = _split(section("out_start"), section("out"))
+    store.in_edges = _split(section("in_start"), section("in"))
+
+    offset, length, _ = header["sections"]["arena"]
+    return memoryview(mapped)[base + offset : base + offset + length]
@@ -0,0 +1,1138 @@
+import heapq
+import itertools
+import json
+import os
+import secrets
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from json.encoder import encode_basestring_ascii as json_string
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import snapshot
+from search import FullTextIndex
+from vectors import VectorIndex, reciprocal_rank_fusion
+from writer import ReadWriteLock
+
+REVERSE_DIRECTION = {"out": "in", "in": "out", "both": "both"}
+
+# entity_types value for nodes that only exist as relation endpoints.
+NOT_AN_ENTITY = -1
+# rel_type value for deleted relations.
+DELETED = -1
+# Snapshot lines, byte for byte what json.dumps makes of records().
+ENTITY_LINE = '{"type": "entity", "name": %s, "entityType": %s, "observations": [%s]}'
+RELATION_LINE = '{"type": "relation", "from": %s, "to": %s, "relationType": %s}'
+
+
+# Entities indexed per read-lock hold while rebuilding the indexes.
+INDEX_BUILD_CHUNK = 2000
+
+# (full-text index, vector index or None, entity ids per type id)
+Indexes = Tuple[FullTextIndex, Optional[VectorIndex], Dict[int, Set[int]]]
+
+
+class LimitExceeded(Exception):
+    """A mutation would take the graph past its configured size limits."""
+
+
+class Interner:
+    """Maps repeated strings (entity and relation types) to small integers."""
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self.ids: Dict[str, int] = {}
+
+    def __getitem__(self, i: int) -> str:
+        return self.strings[i]
+
+    def intern(self, s: str) -> int:
+        i = self.ids.get(s)
+        if i is None:
+            i = self.ids[s] = len(self.strings)
+            self.strings.append(s)
+        return i
+
+    def lookup(self, s: str) -> Optional[int]:
+        return self.ids.get(s)
+
+
+class StringArena:
+    """
+    Observation texts stored back to back as UTF-8 in one buffer and addressed
+    by (offset, length). Deleted texts leave dead bytes until compaction.
+
+    An arena loaded from a binary snapshot keeps the snapshot's texts in the
+    mapped file (`base`); texts added since go to `data`, after them.
+    """
+
+    def __init__(self, base: Optional[memoryview] = None):
+        self.base = base if base is not None else memoryview(b"")
+        self.data = bytearray()
+        self.dead = 0
+
+    def __len__(self) -> int:
+        return len(self.base) + len(self.data)
+
+    def add(self, text: str) -> Tuple[int, int]:
+        raw = text.encode("utf-8")
+        offset = len(self)
+        self.data += raw
+        return offset, len(raw)
+
+    def get(self, offset: int, length: int) -> str:
+        local = offset - len(self.base)
+        if local >= 0:
+            return self.data[local : local + length].decode("utf-8")
+        return str(self.base[offset : offset + length], "utf-8")
+
+    def chunks(self) -> Iterator[bytes]:
+        yield self.base
+        yield self.data
+
+    def release(self, length: int) -> None:
+        self.dead += length
+
+
+class NodeFilter:
+    """
+    One node of a pattern query resolved against the store's indexes. The
+    estimate is an upper bound on how many entities pass, taken from the most
+    selective index the filter can use: name, full-text terms or type.
+    """
+
+    # Tie-break between equally selective indexes: cheapest to enumerate first.
+    INDEX_RANK = {"name": 0, "text": 1, "type": 2, "scan": 3}
+
+    def __init__(self, store: "GraphStore", spec: dict):
+        self.store = store
+        self.name = spec.get("name")
+        self.entity_type = spec.get("entityType")
+        self.nid = None if self.name is None else store.entity_id(self.name)
+        self.type_id = (
+            None if self.entity_type is None else store.types.lookup(self.entity_type)
+        )
+        # Empty when the text has no terms; a {} posting means no entity matches.
+        self.postings = store.text_index.postings(spec["text"]) if spec.get("text") else []
+        options = [(store.entity_count, "scan")]
+        if self.name is not None:
+            options.append((0 if self.nid is None else 1, "name"))
+        if self.postings:
+            options.append((len(self.postings[0]), "text"))
+        if self.entity_type is not None:
+            options.append((len(store.type_members.get(self.type_id, ())), "type"))
+        self.estimate, self.index = min(
+            options, key=lambda option: (option[0], self.INDEX_RANK[option[1]])
+        )
+
+    def accepts(self, nid: int) -> bool:
+        type_id = self.store.entity_types[nid]
+        return (
+            type_id != NOT_AN_ENTITY
+            and (self.name is None or nid == self.nid)
+            and (self.entity_type is None or type_id == self.type_id)
+            and all(nid in posting for posting in self.postings)
+        )
+
+    def candidates(self) -> Iterator[int]:
+        if self.index == "name":
+            found: Iterable[int] = () if self.nid is None else (self.nid,)
+        elif self.index == "text":
+            found = self.postings[0]
+        elif self.index == "type":
+            found = self.store.type_members.get(self.type_id, ())
+        else:
+            found = range(len(self.store.names))
+        return (nid for nid in found if self.accepts(nid))
+
+
+class IndexBuild:
+    """Indexes being rebuilt, covering node ids below `cursor` so far."""
+
+    def __init__(self, text_index: FullTextIndex, vector_index: Optional[VectorIndex]):
+        self.text_index = text_index
+        self.vector_index = vector_index
+        self.type_members: Dict[int, Set[int]] = {}
+        self.cursor = 0
+
+
+class GraphStore:
+    """
+    In-memory knowledge graph backed by a snapshot (JSONL or the columnar
+    binary format in snapshot.py) plus a journal of mutations applied since
+    the snapshot was written.
+
+    Records are stored compactly and only turned into dicts for API responses:
+    every name gets an integer node id, entity and relation types are interned,
+    observations live in a shared string arena, and relations are parallel
+    int columns with per-node adjacency arrays of relation ids. Node and
+    relation ids follow insertion order, so they double as paging positions.
+
+    A full-text index is maintained alongside every mutation so reads never
+    have to scan the whole graph. The optional vector index is kept up to date
+    the same way. Both are built on first use after a load or bulk import.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        stemming: bool = False,
+        semantic: bool = False,
+        compact_bytes: int = 64 << 20,
+        snapshot_format: str = "jsonl",
+        max_entities: int = 0,
+        max_relations: int = 0,
+        max_observations: int = 0,
+        retain_entities: int = 0,
+        ttl_seconds: float = 0,
+    ):
+        self.path = path
+        self.snapshot_format = snapshot_format
+        # 0 means unlimited. Not enforced while replaying the journal, which
+        # only holds mutations that were accepted at the time.
+        self.max_entities = max_entities
+        self.max_relations = max_relations
+        self._replaying = False
+        # Retention, also 0 for off: observations beyond max_observations are
+        # dropped oldest first as they are added; entities beyond
+        # retain_entities or not accessed for ttl_seconds are evicted in the
+        # background through retention_mutations().
+        self.max_observations = max_observations
+        self.retain_entities = retain_entities
+        self.ttl_seconds = ttl_seconds
+        self.evicted_entities = 0
+        self.evicted_observations = 0
+        self.compact_bytes = compact_bytes
+        self.lock = ReadWriteLock()
+        self.types = Interner()
+        self.arena = StringArena()
+        # Nodes: every entity plus names that only appear in relations. Deleted
+        # nodes leave a None name; ids are never reused within a process.
+        self.names: List[Optional[str]] = []
+        self.node_ids: Dict[str, int] = {}
+        self.entity_types = array("i")
+        # Flat (offset, length, offset, length, ...) pairs into the arena.
+        self.observations: List[Optional[array]] = []
+        self.out_edges: List[Optional[array]] = []
+        self.in_edges: List[Optional[array]] = []
+        # Last read or write per node, as a Unix timestamp.
+        self.accessed = array("d")
+        # Relations: one column per field, indexed by relation id.
+        self.rel_from = array("I")
+        self.rel_to = array("I")
+        self.rel_type = array("i")
+        self.entity_count = 0
+        self.relation_count = 0
+        # Paging cursors are only valid for the ids of this process.
+        self.epoch = secrets.token_hex(4)
+        self.text_index = FullTextIndex(stemming=stemming)
+        # Entity ids per type id, for pattern queries that filter on type.
+        self.type_members: Dict[int, Set[int]] = {}
+        self.vector_index = VectorIndex() if semantic else None
+        # Set by bulk loads: per-record index upkeep is skipped and the indexes
+        # are rebuilt in one pass the next time a search needs them.
+        self.indexes_stale = False
+        self._index_build = threading.Lock()
+        self._build: Optional[IndexBuild] = None
+
+    # --- persistence ----------------------------------------------------------
+    @property
+    def journal_path(self) -> Path:
+        return self.path.with_name(self.path.name + ".wal")
+
+    def load(self) -> None:
+        """
+        Load the last snapshot, then replay mutations journaled since. Indexes
+        are left stale so startup does not wait for them.
+        """
+        self.indexes_stale = True
+        loaded_format = self.snapshot_format
+        if self.path.exists():
+            if snapshot.is_binary(self.path):
+                loaded_format = "binary"
+                self.arena = StringArena(snapshot.read(self, self.path))
+                self.entity_count = len(self.names) - self.entity_types.count(
+                    NOT_AN_ENTITY
+                )
+                self.relation_count = len(self.rel_type)
+            else:
+                loaded_format = "jsonl"
+                self._load_jsonl()
+        if self.journal_path.exists():
+            self._replaying = True
+            try:
+                with open(self.journal_path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        # A torn final line means that batch was never acknowledged.
+                        try:
+                            item = json.loads(line)
+                        except json.JSONDecodeError:
+                            break
+                        self.apply(item.pop("op"), item)
+            finally:
+                self._replaying = False
+            self.checkpoint()
+        elif loaded_format != self.snapshot_format:
+            self.checkpoint()
+
+    def _load_jsonl(self) -> None:
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                if item["type"] == "entity":
+                    self._add_entity(item)
+                elif item["type"] == "relation":
+                    self._add_relation(item["from"], item["to"], item["relationType"])
+
+    def records(self) -> Iterator[dict]:
+        """Every entity, then every relation, as memory-file records."""
+        for nid in range(len(self.names)):
+            if self.entity_types[nid] != NOT_AN_ENTITY:
+                yield {"type": "entity", **self.entity(nid)}
+        for rid in range(len(self.rel_type)):
+            if self.rel_type[rid] != DELETED:
+                yield {"type": "relation", **self.relation(rid)}
+
+    def jsonl_lines(self) -> Iterator[str]:
+        """
+        records() serialized for a JSONL snapshot. Formatted directly: a dict
+        and an encoder call per record cost more than the strings themselves.
+        """
+        names, types, entity_types = self.names, self.types, self.entity_types
+        for nid in range(len(names)):
+            type_id = entity_types[nid]
+            if type_id != NOT_AN_ENTITY:
+                yield ENTITY_LINE % (
+                    json_string(names[nid]),
+                    json_string(types[type_id]),
+                    ", ".join(map(json_string, self.observation_texts(nid))),
+                )
+        rel_from, rel_to, rel_type = self.rel_from, self.rel_to, self.rel_type
+        for rid in range(len(rel_type)):
+            type_id = rel_type[rid]
+            if type_id != DELETED:
+                yield RELATION_LINE % (
+                    json_string(names[rel_from[rid]]),
+                    json_string(names[rel_to[rid]]),
+                    json_string(types[type_id]),
+                )
+
+    def save(self) -> None:
+        """Atomically rewrite the snapshot in the configured format."""
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            if self.snapshot_format == "binary":
+                snapshot.write(self, f)
+            else:
+                for i, line in enumerate(self.jsonl_lines()):
+                    f.write((line if i == 0 else "\n" + line).encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def commit(self, mutations: List[Tuple[str, dict]]) -> None:
+        """Durably journal a batch of applied mutations with one fsync."""
+        if not mutations:
+            return
+        if any(op in self.SNAPSHOT_MUTATIONS for op, _ in mutations):
+            # Bulk payloads are not worth journaling; a snapshot covers the batch.
+            self.checkpoint()
+            return
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps({"op": op, **p}) + "\n" for op, p in mutations))
+            f.flush()
+            os.fsync(f.fileno())
+        if self.journal_path.stat().st_size > self.compact_bytes:
+            self.checkpoint()
+
+    def checkpoint(self) -> None:
+        """
+        Fold the journal into a fresh snapshot. Mutations are idempotent, so a
+        crash between the two steps only means replaying already-applied work.
+        """
+        self.save()
+        if self.journal_path.exists():
+            self.journal_path.unlink()
+
+    # --- record access --------------------------------------------------------
+    def entity_id(self, name: str) -> Optional[int]:
+        nid = self.node_ids.get(name)
+        if nid is None or self.entity_types[nid] == NOT_AN_ENTITY:
+            return None
+        return nid
+
+    def observation_texts(self, nid: int) -> List[str]:
+        packed = self.observations[nid]
+        if not packed:
+            return []
+        get = self.arena.get
+        return [get(packed[i], packed[i + 1]) for i in range(0, len(packed), 2)]
+
+    def entity(self, nid: int) -> dict:
+        return {
+            "name": self.names[nid],
+            "entityType": self.types[self.entity_types[nid]],
+            "observations": self.observation_texts(nid),
+        }
+
+    def relation(self, rid: int) -> dict:
+        return {
+            "from": self.names[self.rel_from[rid]],
+            "to": self.names[self.rel_to[rid]],
+            "relationType": self.types[self.rel_type[rid]],
+        }
+
+    # --- nodes ----------------------------------------------------------------
+    def _node(self, name: str) -> int:
+        nid = self.node_ids.get(name)
+        if nid is None:
+            nid = self.node_ids[name] = len(self.names)
+            self.names.append(name)
+            self.entity_types.append(NOT_AN_ENTITY)
+            self.observations.append(None)
+            self.out_edges.append(None)
+            self.in_edges.append(None)
+            self.accessed.append(time.time())
+        return nid
+
+    def _release_node(self, nid: int) -> None:
+        if (
+            self.entity_types[nid] == NOT_AN_ENTITY
+            and not self.out_edges[nid]
+            and not self.in_edges[nid]
+        ):
+            del self.node_ids[self.names[nid]]
+            self.names[nid] = None
+            self.out_edges[nid] = self.in_edges[nid] = None
+
+    def _pack_observations(self, nid: int, texts: List[str]) -> None:
+        packed = self.observations[nid]
+        if packed is None:
+            packed = self.observations[nid] = array("Q")
+        for text in texts:
+            packed.extend(self.arena.add(text))
+
+    def _drop_observations(self, nid: int) -> None:
+        packed = self.observations[nid]
+        if packed:
+            self.arena.release(sum(packed[1::2]))
+        self.observations[nid] = None
+
+    def _compact_arena(self) -> None:
+        if self.arena.dead < (1 << 20) or self.arena.dead * 2 < len(self.arena):
+            return
+        old, self.arena = self.arena, StringArena()
+        for nid, packed in enumerate(self.observations):
+            if packed:
+                self.observations[nid] = array(
+                    "Q",
+                    itertools.chain.from_iterable(
+                        self.arena.add(old.get(packed[i], packed[i + 1]))
+                        for i in range(0, len(packed), 2)
+                    ),
+                )
+
+    def _trim_observations(self, nid: int) -> None:
+        packed = self.observations[nid]
+        if not self.max_observations or not packed:
+            return
+        cut = len(packed) - 2 * self.max_observations
+        if cut <= 0:
+            return
+        dropped = [self.arena.get(packed[i], packed[i + 1]) for i in range(0, cut, 2)]
+        self.arena.release(sum(packed[1:cut:2]))
+        del packed[:cut]
+        self._index_remove(nid, dropped)
+        self.evicted_observations += len(dropped)
+
+    def touch(self, nids: Iterable[int]) -> None:
+        """Record an access. Safe under the read lock: each store is one item."""
+        now = time.time()
+        accessed = self.accessed
+        for nid in nids:
+            accessed[nid] = now
+
+    # --- index maintenance ----------------------------------------------------
+    def _index_add(self, nid: int, texts: List[str]) -> None:
+        indexes = self._indexes_for(nid)
+        if indexes is None:
+            return
+        text_index, vector_index, _ = indexes
+        text_index.add(nid, texts)
+        if vector_index is not None:
+            vector_index.add(nid, texts)
+
+    def _index_remove(self, nid: int, texts: List[str]) -> None:
+        indexes = self._indexes_for(nid)
+        if indexes is None:
+            return
+        text_index, vector_index, _ = indexes
+        text_index.remove(nid, texts)
+        if vector_index is not None:
+            vector_index.remove(nid, texts)
+
+    def ensure_indexes(self) -> None:
+        """
+        Rebuild stale indexes. Call without holding the lock; searches go
+        through indexed_read().
+
+        Entities are indexed INDEX_BUILD_CHUNK at a time, each chunk under the
+        read lock, so a queued write (and the reads queued behind it) waits for
+        one chunk rather than the whole rebuild. Writes landing between chunks
+        also update the new indexes for the entities they already cover. The
+        finished indexes are swapped in under the write lock.
+        """
+        if not self.indexes_stale:
+            return
+        with self._index_build:
+            if not self.indexes_stale:
+                return
+            build = self._build = IndexBuild(
+                FullTextIndex(stemming=self.text_index.stemming),
+                None
+                if self.vector_index is None
+                else VectorIndex(self.vector_index.vectorizer),
+            )
+            try:
+                covered = False
+                while not covered:
+                    with self.lock.read():
+                        covered = self._index_chunk(build, INDEX_BUILD_CHUNK)
+                with self.lock.write():
+                    self._index_chunk(build, None)
+                    self.text_index = build.text_index
+                    self.vector_index = build.vector_index
+                    self.type_members = build.type_members
+                    self.indexes_stale = False
+            finally:
+                self._build = None
+
+    def _index_chunk(self, build: IndexBuild, limit: Optional[int]) -> bool:
+        """Index the next `limit` node ids (None for all); True once all are."""
+        entity_types = self.entity_types
+        end = len(entity_types)
+        if limit is not None:
+            end = min(end, build.cursor + limit)
+
+        def documents():
+            for nid in range(build.cursor, end):
+                type_id = entity_types[nid]
+                if type_id != NOT_AN_ENTITY:
+                    texts = self._entity_texts(nid)
+                    if build.vector_index is not None:
+                        build.vector_index.add(nid, texts)
+                    build.type_members.setdefault(type_id, set()).add(nid)
+                    yield nid, texts
+
+        build.text_index.add_documents(documents())
+        build.cursor = end
+        return end == len(entity_types)
+
+    def _indexes_for(self, nid: int) -> Optional[Indexes]:
+        """
+        The indexes a mutation of `nid` must keep up to date: the live ones,
+        or during a rebuild the new ones once they cover `nid`. None if the
+        indexes are stale and the rebuild will pick the change up anyway.
+        """
+        if not self.indexes_stale:
+            return self.text_index, self.vector_index, self.type_members
+        build = self._build
+        if build is not None and nid < build.cursor:
+            return build.text_index, build.vector_index, build.type_members
+        return None
+
+    @contextmanager
+    def indexed_read(self) -> Iterator[None]:
+        """
+        The read lock, taken once the indexes are current. A bulk import
+        committed between the rebuild and the lock marks them stale again, so
+        the check is repeated under the lock.
+        """
+        while True:
+            self.ensure_indexes()
+            with self.lock.read():
+                if not self.indexes_stale:
+                    yield
+                    return
+
+    def _entity_texts(self, nid: int) -> List[str]:
+        return [
+            self.names[nid],
+            self.types[self.entity_types[nid]],
+            *self.observation_texts(nid),
+        ]
+
+    def _add_entity(self, entity: dict) -> bool:
+        nid = self._node(entity["name"])
+        if self.entity_types[nid] != NOT_AN_ENTITY:
+            return False
+        type_id = self.entity_types[nid] = self.types.intern(entity["entityType"])
+        self._pack_observations(nid, entity["observations"])
+        self.entity_count += 1
+        texts = [entity["name"], entity["entityType"], *entity["observations"]]
+        self._index_add(nid, texts)
+        self._trim_observations(nid)
+        indexes = self._indexes_for(nid)
+        if indexes is not None:
+            indexes[2].setdefault(type_id, set()).add(nid)
+        self.accessed[nid] = time.time()
+        return True
+
+    def _remove_entity(self, nid: int) -> None:
+        texts = self._entity_texts(nid)
+        self._index_remove(nid, texts)
+        indexes = self._indexes_for(nid)
+        if indexes is not None:
+            indexes[2][self.entity_types[nid]].discard(nid)
+        self._drop_observations(nid)
+        self.entity_types[nid] = NOT_AN_ENTITY
+        self.entity_count -= 1
+        self._release_node(nid)
+
+    def _find_relation(self, source: int, target: int, type_id: int) -> Optional[int]:
+        # Duplicate check by scanning the shorter of the two adjacency arrays.
+        outgoing, incoming = self.out_edges[source], self.in_edges[target]
+        if not outgoing or not incoming:
+            return None
+        if len(outgoing) <= len(incoming):
+            for rid in outgoing:
+                if self.rel_to[rid] == target and self.rel_type[rid] == type_id:
+                    return rid
+        else:
+            for rid in incoming:
+                if self.rel_from[rid] == source and self.rel_type[rid] == type_id:
+                    return rid
+        return None
+
+    def _add_relation(self, source: str, target: str, relation_type: str) -> bool:
+        f, t = self._node(source), self._node(target)
+        type_id = self.types.intern(relation_type)
+        if self._find_relation(f, t, type_id) is not None:
+            return False
+        rid = len(self.rel_type)
+        self.rel_from.append(f)
+        self.rel_to.append(t)
+        self.rel_type.append(type_id)
+        for adjacency, nid in ((self.out_edges, f), (self.in_edges, t)):
+            if adjacency[nid] is None:
+                adjacency[nid] = array("I")
+            adjacency[nid].append(rid)
+        self.relation_count += 1
+        return True
+
+    def _remove_relation(self, rid: int) -> None:
+        f, t = self.rel_from[rid], self.rel_to[rid]
+        for adjacency, nid in ((self.out_edges, f), (self.in_edges, t)):
+            adjacency[nid].remove(rid)
+            if not adjacency[nid]:
+                adjacency[nid] = None
+        self.rel_type[rid] = DELETED
+        self.relation_count -= 1
+        self._release_node(f)
+        if t != f:
+            self._release_node(t)
+
+    # --- mutations ------------------------------------------------------------
+    # Each mutation takes the JSON payload it is journaled with and validates
+    # before changing anything, so a failed mutation leaves no partial state.
+    def apply(self, op: str, payload: dict):
+        if op not in self.MUTATIONS:
+            raise ValueError(f"Unknown mutation {op}")
+        result = getattr(self, op)(**payload)
+        self._compact_arena()
+        return result
+
+    def _check_limits(self, entities: List[dict], relations: List[dict]) -> None:
+        """Raise LimitExceeded before applying a mutation that would not fit."""
+        if self._replaying:
+            return
+        if self.max_entities:
+            new = {e["name"] for e in entities if self.entity_id(e["name"]) is None}
+            if self.entity_count + len(new) > self.max_entities:
+                raise LimitExceeded(
+                    f"Graph is limited to {self.max_entities} entities"
+                )
+        if self.max_relations:
+            new = set()
+            for r in relations:
+                f, t = self.node_ids.get(r["from"]), self.node_ids.get(r["to"])
+                type_id = self.types.lookup(r["relationType"])
+                if None in (f, t, type_id) or self._find_relation(f, t, type_id) is None:
+                    new.add((r["from"], r["to"], r["relationType"]))
+            if self.relation_count + len(new) > self.max_relations:
+                raise LimitExceeded(
+                    f"Graph is limited to {self.max_relations} relations"
+                )
+
+    def create_entities(self, entities: List[dict]) -> List[dict]:
+        self._check_limits(entities, [])
+        return [e for e in entities if self._add_entity(e)]
+
+    def create_relations(self, relations: List[dict]) -> List[dict]:
+        self._check_limits([], relations)
+        return [
+            r
+            for r in relations
+            if self._add_relation(r["from"], r["to"], r["relationType"])
+        ]
+
+    def add_observations(self, observations: List[dict]) -> List[dict]:
+        for obs in observations:
+            if self.entity_id(obs["entityName"]) is None:
+                raise KeyError(obs["entityName"])
+        results = []
+        for obs in observations:
+            name = obs["entityName"]
+            nid = self.node_ids[name]
+            seen = set(self.observation_texts(nid))
+            added = []
+            for content in obs["contents"]:
+                if content not in seen:
+                    seen.add(content)
+                    added.append(content)
+            self._pack_observations(nid, added)
+            self._index_add(nid, added)
+            self._trim_observations(nid)
+            self.touch((nid,))
+            results.append({"entityName": name, "addedObservations": added})
+        return results
+
+    def delete_entities(self, entityNames: List[str]) -> None:
+        for name in set(entityNames):
+            nid = self.node_ids.get(name)
+            if nid is None:
+                continue
+            for rid in list(self.out_edges[nid] or ()) + list(self.in_edges[nid] or ()):
+                if self.rel_type[rid] != DELETED:
+                    self._remove_relation(rid)
+            if self.entity_types[nid] != NOT_AN_ENTITY:
+                self._remove_entity(nid)
+
+    def delete_observations(self, deletions: List[dict]) -> None:
+        for deletion in deletions:
+            nid = self.entity_id(deletion["entityName"])
+            if nid is None:
+                continue
+            to_delete = set(deletion["observations"])
+            current = self.observation_texts(nid)
+            removed = [o for o in current if o in to_delete]
+            if not removed:
+                continue
+            self._drop_observations(nid)
+            self._pack_observations(nid, [o for o in current if o not in to_delete])
+            self._index_remove(nid, removed)
+
+    def delete_relations(self, relations: List[dict]) -> None:
+        for r in relations:
+            f, t = self.node_ids.get(r["from"]), self.node_ids.get(r["to"])
+            type_id = self.types.lookup(r["relationType"])
+            if f is None or t is None or type_id is None:
+                continue
+            rid = self._find_relation(f, t, type_id)
+            if rid is not None:
+                self._remove_relation(rid)
+
+    def import_records(self, entities: List[dict], relations: List[dict]) -> dict:
+        """
+        Bulk upsert: new entities are created, observations of entities that
+        already exist (or repeat within the import) are merged with set-based
+        dedup, and duplicate relations are skipped. Indexes are left stale and
+        rebuilt in one pass afterwards rather than updated per record.
+        """
+        self._check_limits(entities, relations)
+        self.indexes_stale = True
+        created = merged = added = 0
+        for entity in entities:
+            nid = self.entity_id(entity["name"])
+            if nid is None:
+                unique = list(dict.fromkeys(entity["observations"]))
+                self._add_entity({**entity, "observations": unique})
+                created += 1
+                added += len(unique)
+                continue
+            seen = set(self.observation_texts(nid))
+            new = [o for o in dict.fromkeys(entity["observations"]) if o not in seen]
+            if new:
+                self._pack_observations(nid, new)
+                self._index_add(nid, new)
+                self._trim_observations(nid)
+            merged += 1
+            added += len(new)
+        relations_created = len(self.create_relations(relations))
+        return {
+            "entitiesCreated": created,
+            "entitiesMerged": merged,
+            "observationsAdded": added,
+            "relationsCreated": relations_created,
+        }
+
+    def evict_entities(self, entityNames: List[str]) -> None:
+        """delete_entities on behalf of retention, counted separately."""
+        before = self.entity_count
+        self.delete_entities(entityNames)
+        self.evicted_entities += before - self.entity_count
+
+    def retention_mutations(self) -> List[Tuple[str, dict]]:
+        """
+        Evictions due now: entities idle for longer than the TTL, then the
+        least recently accessed ones beyond the entity cap. Run by the writer
+        thread, the only mutator, so reading without the lock is safe.
+        """
+        if not self.ttl_seconds and not self.retain_entities:
+            return []
+        live = [
+            nid
+            for nid, type_id in enumerate(self.entity_types)
+            if type_id != NOT_AN_ENTITY
+        ]
+        accessed = self.accessed
+        victims: List[int] = []
+        if self.ttl_seconds:
+            cutoff = time.time() - self.ttl_seconds
+            victims = [nid for nid in live if accessed[nid] < cutoff]
+        excess = len(live) - len(victims) - self.retain_entities
+        if self.retain_entities and excess > 0:
+            expired = set(victims)
+            victims += heapq.nsmallest(
+                excess,
+                (nid for nid in live if nid not in expired),
+                key=accessed.__getitem__,
+            )
+        if not victims:
+            return []
+        return [("evict_entities", {"entityNames": [self.names[n] for n in victims]})]
+
+    MUTATIONS = frozenset(
+        {
+            "create_entities",
+            "create_relations",
+            "add_observations",
+            "delete_entities",
+            "delete_observations",
+            "delete_relations",
+            "import_records",
+            "evict_entities",
+        }
+    )
+    SNAPSHOT_MUTATIONS = frozenset({"import_records"})
+
+    # --- queries --------------------------------------------------------------
+    def relations_among(self, nids: Dict[int, None]) -> List[dict]:
+        return [
+            self.relation(rid)
+            for nid in nids
+            for rid in self.out_edges[nid] or ()
+            if self.rel_to[rid] in nids
+        ]
+
+    def subgraph_ids(self, nids: Iterable[int]) -> dict:
+        found = {nid: None for nid in nids if self.entity_types[nid] != NOT_AN_ENTITY}
+        return {
+            "entities": [self.entity(nid) for nid in found],
+            "relations": self.relations_among(found),
+        }
+
+    def subgraph(self, names: Iterable[str]) -> dict:
+        """Entities by name and the relations among them; counts as an access."""
+        nids = [nid for nid in map(self.entity_id, names) if nid is not None]
+        self.touch(nids)
+        return self.subgraph_ids(nids)
+
+    def search(self, query: str, limit: Optional[int], offset: int = 0) -> dict:
+        """
+        BM25 search; returned entities count as accessed. `total` is how many
+        entities matched, however many limit and offset let through.
+        """
+        ranked, total = self.text_index.search_page(query, limit, offset)
+        nids = [nid for nid, _ in ranked]
+        self.touch(nids)
+        return {**self.subgraph_ids(nids), "total": total}
+
+    def semantic_search(
+        self, query: str, limit: int, hybrid: bool = False
+    ) -> List[Tuple[int, float]]:
+        """Top entity ids by vector similarity, or fused with BM25 ranks when hybrid."""
+        if not hybrid:
+            ranked = self.vector_index.search(query, limit=limit)
+        else:
+            pool = max(limit * 5, 50)
+            ranked = reciprocal_rank_fusion(
+                self.vector_index.search(query, limit=pool),
+                self.text_index.search(query, limit=pool),
+            )[:limit]
+        types = self.entity_types
+        return [(nid, score) for nid, score in ranked if types[nid] != NOT_AN_ENTITY]
+
+    def stats(self) -> dict:
+        def size(path: Path) -> int:
+            try:
+                return path.stat().st_size
+            except FileNotFoundError:
+                return 0
+
+        return {
+            "entities": self.entity_count,
+            "relations": self.relation_count,
+            "observationBytes": len(self.arena) - self.arena.dead,
+            "snapshotBytes": size(self.path),
+            "journalBytes": size(self.journal_path),
+            "evictedEntities": self.evicted_entities,
+            "evictedObservations": self.evicted_observations,
+        }
+
+    # --- traversal ------------------------------------------------------------
+    def _type_ids(self, relation_types: Optional[Iterable[str]]) -> Optional[Set[int]]:
+        if relation_types is None:
+            return None
+        return {i for i in map(self.types.lookup, relation_types) if i is not None}
+
+    def _edges(
+        self, nid: int, direction: str, type_ids: Optional[Set[int]]
+    ) -> Iterator[Tuple[int, int]]:
+        if direction in ("out", "both"):
+            for rid in self.out_edges[nid] or ():
+                if type_ids is None or self.rel_type[rid] in type_ids:
+                    yield rid, self.rel_to[rid]
+        if direction in ("in", "both"):
+            for rid in self.in_edges[nid] or ():
+                if type_ids is None or self.rel_type[rid] in type_ids:
+                    yield rid, self.rel_from[rid]
+
+    def _subgraph_records(self, nids: Iterable[int], rids: Iterable[int]) -> dict:
+        return {
+            "entities": [
+                self.entity(nid)
+                for nid in nids
+                if self.entity_types[nid] != NOT_AN_ENTITY
+            ],
+            "relations": [self.relation(rid) for rid in rids],
+        }
+
+    def neighbors(
+        self,
+        names: Iterable[str],
+        depth: int,
+        direction: str = "both",
+        relation_types: Optional[Set[str]] = None,
+        max_fanout: int = 100,
+        max_nodes: int = 1000,
+    ) -> Tuple[dict, bool]:
+        """Breadth-first k-hop neighborhood; returns the subgraph and whether a cap was hit."""
+        type_ids = self._type_ids(relation_types)
+        visited = {
+            nid: None for nid in map(self.node_ids.get, names) if nid is not None
+        }
+        frontier = list(visited)
+        edges: Dict[int, None] = {}
+        truncated = False
+        for _ in range(depth):
+            next_frontier = []
+            for nid in frontier:
+                followed = 0
+                for rid, other in self._edges(nid, direction, type_ids):
+                    if followed >= max_fanout:
+                        truncated = True
+                        break
+                    followed += 1
+                    if other not in visited:
+                        if len(visited) >= max_nodes:
+                            truncated = True
+                            continue
+                        visited[other] = None
+                        next_frontier.append(other)
+                    edges[rid] = None
+            frontier = next_frontier
+            if not frontier:
+                break
+        return self._subgraph_records(visited, edges), truncated
+
+    def _expand(
+        self,
+        frontier: List[int],
+        parents: Dict[int, Tuple[Optional[int], Optional[int], int]],
+        opposite: Dict[int, Tuple[Optional[int], Optional[int], int]],
+        direction: str,
+        type_ids: Optional[Set[int]],
+    ) -> Tuple[List[int], List[int]]:
+        next_frontier = []
+        meetings = []
+        for nid in frontier:
+            depth = parents[nid][2] + 1
+            for rid, other in self._edges(nid, direction, type_ids):
+                if other in parents:
+                    continue
+                parents[other] = (nid, rid, depth)
+                next_frontier.append(other)
+                if other in opposite:
+                    meetings.append(other)
+        return next_frontier, meetings
+
+    def shortest_path(
+        self,
+        source: str,
+        target: str,
+        direction: str = "out",
+        relation_types: Optional[Set[str]] = None,
+        max_depth: int = 6,
+    ) -> Optional[dict]:
+        """Bidirectional BFS; returns the path as a subgraph in path order, or None."""
+        start, end = self.node_ids.get(source), self.node_ids.get(target)
+        if start is None or end is None:
+            return None
+        if start == end:
+            return self._subgraph_records([start], [])
+        type_ids = self._type_ids(relation_types)
+        forward = {start: (None, None, 0)}
+        backward = {end: (None, None, 0)}
+        forward_frontier, backward_frontier = [start], [end]
+        length = 0
+        while forward_frontier and backward_frontier and length < max_depth:
+            # Always grow the smaller side; each round adds one hop to the path.
+            if len(forward_frontier) <= len(backward_frontier):
+                forward_frontier, meetings = self._expand(
+                    forward_frontier, forward, backward, direction, type_ids
+                )
+            else:
+                backward_frontier, meetings = self._expand(
+                    backward_frontier,
+                    backward,
+                    forward,
+                    REVERSE_DIRECTION[direction],
+                    type_ids,
+                )
+            length += 1
+            if meetings:
+                meet = min(meetings, key=lambda n: forward[n][2] + backward[n][2])
+                nodes, rids = [meet], []
+                while forward[nodes[0]][0] is not None:
+                    rids.insert(0, forward[nodes[0]][1])
+                    nodes.insert(0, forward[nodes[0]][0])
+                while backward[nodes[-1]][0] is not None:
+                    rids.append(backward[nodes[-1]][1])
+                    nodes.append(backward[nodes[-1]][0])
+                return self._subgraph_records(nodes, rids)
+        return None
+
+    # --- pattern queries ------------------------------------------------------
+    def match(
+        self,
+        nodes: List[dict],
+        edges: List[dict],
+        limit: int = 100,
+        budget: int = 1_000_000,
+    ) -> Tuple[dict, int, bool, dict]:
+        """
+        Match a chain pattern: nodes[i] and nodes[i + 1] are joined by a
+        relation passing edges[i]. The planner anchors the search at the node
+        whose index admits the fewest entities and extends matches outwards
+        along adjacency lists, depth first, so partial matches never pile up.
+
+        Returns the subgraph of matched entities and relations, the number of
+        matches, whether `limit` or the `budget` of examined edges cut the
+        search short, and the plan.
+        """
+        filters = [NodeFilter(self, spec) for spec in nodes]
+        anchor = min(range(len(filters)), key=lambda i: filters[i].estimate)
+        # (position to bind, bound neighbour, relation slot, direction, type ids)
+        steps = [
+            (
+                i,
+                i - 1,
+                i - 1,
+                edges[i - 1].get("direction", "out"),
+                self._type_ids(edges[i - 1].get("relationTypes")),
+            )
+            for i in range(anchor + 1, len(filters))
+        ] + [
+            (
+                i,
+                i + 1,
+                i,
+                REVERSE_DIRECTION[edges[i].get("direction", "out")],
+                self._type_ids(edges[i].get("relationTypes")),
+            )
+            for i in range(anchor - 1, -1, -1)
+        ]
+        bound: List[int] = [0] * len(filters)
+        rels: List[Optional[int]] = [None] * len(edges)
+        found_nodes: Dict[int, None] = {}
+        found_rels: Dict[int, None] = {}
+        state = {"matches": 0, "visits": 0, "truncated": False}
+
+        def extend(depth: int) -> bool:
+            # Returns False once the search has to stop.
+            if depth == len(steps):
+                if state["matches"] >= limit:
+                    state["truncated"] = True
+                    return False
+                state["matches"] += 1
+                found_nodes.update(dict.fromkeys(bound))
+                found_rels.update(dict.fromkeys(rels))
+                return True
+            position, neighbour, slot, direction, type_ids = steps[depth]
+            for rid, other in self._edges(bound[neighbour], direction, type_ids):
+                state["visits"] += 1
+                if state["visits"] > budget:
+                    state["truncated"] = True
+                    return False
+                if rid in rels or not filters[position].accepts(other):
+                    continue
+                bound[position], rels[slot] = other, rid
+                if not extend(depth + 1):
+                    return False
+            rels[slot] = None
+            return True
+
+        for nid in filters[anchor].candidates():
+            bound[anchor] = nid
+            if not extend(0):
+                break
+        plan = {
+            "anchor": anchor,
+            "index": filters[anchor].index,
+            "estimates": [f.estimate for f in filters],
+        }
+        return (
+            self._subgraph_records(found_nodes, found_rels),
+            state["matches"],
+            state["truncated"],
+            plan,
+        )
+
+    # --- paging ---------------------------------------------------------------
+    def page(
+        self,
+        position: Tuple[str, int],
+        limit: int,
+        entity_type: Optional[str] = None,
+        relation_type: Optional[str] = None,
+    ) -> Tuple[List[Tuple[str, dict]], Optional[Tuple[str, int]]]:
+        """
+        Up to `limit` ("entity" | "relation", record) pairs, entities first, from
+        a (section, id) position, plus the position to resume from or None.
+        """
+        section, slot = position
+        records: List[Tuple[str, dict]] = []
+        if section == "entities":
+            wanted = None if entity_type is None else self.types.lookup(entity_type)
+            end = len(self.names) if entity_type is None or wanted is not None else slot
+            while slot < end and len(records) < limit:
+                type_id = self.entity_types[slot]
+                if type_id != NOT_AN_ENTITY and (wanted is None or type_id == wanted):
+                    records.append(("entity", self.entity(slot)))
+                slot += 1
+            if slot < end:
+                return records, ("entities", slot)
+            section, slot = "relations", 0
+        wanted = None if relation_type is None else self.types.lookup(relation_type)
+        end = len(self.rel_type) if relation_type is None or wanted is not None else slot
+        while slot < end and len(records) < limit:
+            type_id = self.rel_type[slot]
+            if type_id != DELETED and (wanted is None or type_id == wanted):
+                records.append(("relation", self.relation(slot)))
+            slot += 1
+        return records, ("relations", slot) if slot < end else None
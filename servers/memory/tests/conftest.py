@@ -0,0 +1,17 @@
+import os
+import tempfile
+
+import pytest
+
+from store import GraphStore
+
+# main reads its configuration when it is imported; keep the default graph
+# and namespaces of tests out of the working directory.
+_workdir = tempfile.mkdtemp(prefix="memory-tests-")
+os.environ.setdefault("MEMORY_FILE_PATH", os.path.join(_workdir, "memory.json"))
+os.environ.setdefault("MEMORY_NAMESPACE_DIR", os.path.join(_workdir, "namespaces"))
+
+
+@pytest.fixture
+def store(tmp_path):
+    return GraphStore(tmp_path / "memory.json")
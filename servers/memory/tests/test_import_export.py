@@ -0,0 +1,92 @@
+import json
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import main
+
+
+def entity(name, entity_type, *observations):
+    return {
+        "type": "entity",
+        "name": name,
+        "entityType": entity_type,
+        "observations": list(observations),
+    }
+
+
+def ndjson(*records):
+    return "\n".join(json.dumps(r) for r in records).encode()
+
+
+@pytest.fixture
+def client():
+    client = TestClient(main.app)
+    client.headers["X-Memory-Namespace"] = uuid.uuid4().hex
+    return client
+
+
+def test_import_merges_and_export_round_trips(client):
+    client.post(
+        "/create_entities",
+        json={"entities": [{"name": "a", "entityType": "p", "observations": ["old"]}]},
+    ).raise_for_status()
+    body = ndjson(
+        entity("a", "p", "old", "new"),
+        entity("b", "q", "x", "x"),
+        {"type": "relation", "from": "a", "to": "b", "relationType": "r"},
+        {"type": "relation", "from": "a", "to": "b", "relationType": "r"},
+    )
+    response = client.post("/import", content=body + b"\n\n")
+    assert response.json() == {
+        "entitiesCreated": 1,
+        "entitiesMerged": 1,
+        "observationsAdded": 2,
+        "relationsCreated": 1,
+    }
+
+    exported = client.get("/export")
+    assert exported.headers["content-disposition"].endswith('"memory.jsonl"')
+    records = [json.loads(line) for line in exported.text.splitlines()]
+    assert records == [
+        entity("a", "p", "old", "new"),
+        entity("b", "q", "x"),
+        {"type": "relation", "from": "a", "to": "b", "relationType": "r"},
+    ]
+
+    # Importing an export into an empty graph reproduces it.
+    copy = TestClient(main.app)
+    copy.headers["X-Memory-Namespace"] = uuid.uuid4().hex
+    copy.post("/import", content=exported.content).raise_for_status()
+    assert copy.get("/export").text == exported.text
+    # The index rebuilt after the import serves searches.
+    found = copy.post("/search_nodes", json={"query": "new"}).json()["entities"]
+    assert [e["name"] for e in found] == ["a"]
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        b"not json",
+        b'{"type": "entity", "name": "a"}',
+        b'{"type": "entity", "name": "a", "entityType": "p", "observations": [1]}',
+        b'{"type": "relation", "from": "a", "to": 2, "relationType": "r"}',
+        b'{"type": "other"}',
+        b"[]",
+    ],
+)
+def test_invalid_lines_are_rejected_with_their_number(line):
+    with pytest.raises(HTTPException) as caught:
+        main.parse_import_line(line, 7)
+    assert caught.value.status_code == 400
+    assert caught.value.detail == "Invalid record on line 7"
+
+
+def test_a_bad_line_imports_nothing(client):
+    body = ndjson(entity("a", "p"))
+    response = client.post("/import", content=body + b"\n{broken")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid record on line 2"
+    assert client.get("/export").text == ""
@@ -0,0 +1,114 @@
+import time
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from namespaces import NamespaceRegistry
+from store import GraphStore
+from writer import MutationQueue
+
+
+@pytest.fixture
+def registry(tmp_path):
+    opened = []
+
+    def open_namespace(name):
+        if name == "broken":
+            raise OSError("cannot open")
+        store = GraphStore(tmp_path / f"{name}.json")
+        store.load()
+        opened.append(name)
+        return store, MutationQueue(store)
+
+    registry = NamespaceRegistry(open_namespace, max_resident=2, idle_seconds=0)
+    registry.opened = opened
+    yield registry
+    registry.close()
+
+
+def create(graph, name):
+    entity = {"name": name, "entityType": "thing", "observations": []}
+    graph.writer.submit("create_entities", {"entities": [entity]})
+
+
+def test_least_recently_used_namespace_is_flushed_and_reloaded(registry, tmp_path):
+    with registry.lease("a") as graph:
+        create(graph, "from-a")
+    with registry.lease("b"):
+        pass
+    with registry.lease("a"):
+        pass
+    with registry.lease("c"):
+        pass
+    assert set(registry._resident) == {"a", "c"} and registry.evictions == 1
+    assert (tmp_path / "b.json").exists()
+
+    with registry.lease("b"):
+        pass
+    with registry.lease("a") as graph:
+        assert graph.store.entity_id("from-a") is not None
+    assert registry.opened == ["a", "b", "c", "b", "a"]
+
+
+def test_leased_namespaces_are_never_evicted(registry):
+    with registry.lease("a"), registry.lease("b"), registry.lease("c"):
+        assert len(registry) == 3
+    assert len(registry) == 2
+
+
+def test_a_failed_writer_is_dropped_on_release(registry, tmp_path):
+    with registry.lease("a") as graph:
+        create(graph, "durable")
+        graph.writer.failed = OSError("disk full")
+    assert "a" not in registry._resident
+    with registry.lease("a") as graph:
+        assert graph.store.entity_id("durable") is not None
+
+
+def test_open_errors_are_not_cached(registry):
+    for _ in range(2):
+        with pytest.raises(OSError):
+            with registry.lease("broken"):
+                pass
+    assert len(registry) == 0
+
+
+def test_idle_namespaces_are_evicted(registry):
+    registry.idle_seconds = 0.01
+    with registry.lease("a"):
+        pass
+    time.sleep(0.02)
+    registry._evict(registry._idle())
+    assert len(registry) == 0
+
+
+def test_header_and_path_prefix_select_the_same_graph():
+    client = TestClient(main.app)
+    name = uuid.uuid4().hex
+    entity = {"name": "only-here", "entityType": "thing", "observations": []}
+    client.post(
+        f"/ns/{name}/create_entities", json={"entities": [entity]}
+    ).raise_for_status()
+
+    by_header = client.post(
+        "/open_nodes",
+        json={"names": ["only-here"]},
+        headers={"X-Memory-Namespace": name},
+    )
+    assert [e["name"] for e in by_header.json()["entities"]] == ["only-here"]
+    other = client.post(
+        "/open_nodes",
+        json={"names": ["only-here"]},
+        headers={"X-Memory-Namespace": uuid.uuid4().hex},
+    )
+    assert other.json()["entities"] == []
+
+
+@pytest.mark.parametrize("name", ["../escape", ".hidden", "x" * 65])
+def test_invalid_namespace_names_are_rejected(name):
+    response = TestClient(main.app).get(
+        "/read_graph", headers={"X-Memory-Namespace": name}
+    )
+    assert response.status_code == 400
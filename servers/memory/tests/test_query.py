@@ -0,0 +1,135 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def company(store):
+    store.create_entities(
+        [
+            {"name": "acme", "entityType": "company", "observations": ["rockets"]},
+            {"name": "globex", "entityType": "company", "observations": ["paper"]},
+            *(
+                {"name": f"p{i}", "entityType": "person", "observations": []}
+                for i in range(6)
+            ),
+        ]
+    )
+    store.create_relations(
+        [
+            *(
+                {"from": f"p{i}", "to": to, "relationType": "r"}
+                for i, to in enumerate(["acme", "globex"] * 3)
+            ),
+            {"from": "p0", "to": "p1", "relationType": "knows"},
+        ]
+    )
+    return store
+
+
+def match(store, nodes, edges=(), **kwargs):
+    with store.indexed_read():
+        return store.match(list(nodes), list(edges), **kwargs)
+
+
+def names(subgraph):
+    return {entity["name"] for entity in subgraph["entities"]}
+
+
+def test_chain_matches_only_joined_entities(company):
+    subgraph, matches, truncated, _ = match(
+        company,
+        [{"entityType": "person"}, {"text": "rockets"}],
+        [{"relationTypes": ["r"]}],
+    )
+    assert matches == 3 and not truncated
+    assert names(subgraph) == {"acme", "p0", "p2", "p4"}
+    assert {r["relationType"] for r in subgraph["relations"]} == {"r"}
+
+
+@pytest.mark.parametrize(
+    "nodes, anchor, index",
+    [
+        ([{"entityType": "person"}, {"name": "acme"}], 1, "name"),
+        ([{"entityType": "person"}, {"text": "paper"}], 1, "text"),
+        ([{}, {"entityType": "company"}], 1, "type"),
+        ([{}, {}], 0, "scan"),
+        # An unknown name admits nothing, so it wins over every other index.
+        ([{"name": "missing"}, {"text": "rockets"}], 0, "name"),
+    ],
+)
+def test_planner_anchors_at_the_most_selective_node(company, nodes, anchor, index):
+    _, _, _, plan = match(company, nodes, [{}])
+    assert (plan["anchor"], plan["index"]) == (anchor, index)
+
+
+def test_plan_reports_estimates(company):
+    _, _, _, plan = match(
+        company, [{"entityType": "person"}, {"name": "acme"}, {}], [{}, {}]
+    )
+    assert plan["estimates"] == [6, 1, company.entity_count]
+
+
+def test_direction_and_relation_types(company):
+    pattern = [{"name": "acme"}, {"entityType": "person"}]
+    assert match(company, pattern, [{}])[1] == 0
+    subgraph, matches, _, _ = match(company, pattern, [{"direction": "in"}])
+    assert matches == 3 and names(subgraph) == {"acme", "p0", "p2", "p4"}
+    both = [{"name": "p0"}, {}]
+    assert match(company, both, [{"direction": "both"}])[1] == 2
+    assert match(company, both, [{"relationTypes": ["knows"]}])[1] == 1
+
+
+def test_a_relation_is_not_reused_within_one_match(company):
+    # p0 -knows-> p1 may not be walked back as the second hop.
+    _, matches, _, _ = match(
+        company,
+        [{"name": "p0"}, {}, {}],
+        [
+            {"relationTypes": ["knows"]},
+            {"direction": "both", "relationTypes": ["knows"]},
+        ],
+    )
+    assert matches == 0
+
+
+def test_limit_and_budget_truncate(company):
+    pattern = ([{"entityType": "person"}, {}], [{}])
+    _, matches, truncated, _ = match(company, *pattern, limit=2)
+    assert matches == 2 and truncated
+    _, matches, truncated, _ = match(company, *pattern, budget=3)
+    assert matches == 3 and truncated
+
+
+def test_query_endpoint():
+    client = TestClient(main.app)
+    client.headers["X-Memory-Namespace"] = uuid.uuid4().hex
+    client.post(
+        "/create_entities",
+        json={
+            "entities": [
+                {"name": "ada", "entityType": "person", "observations": []},
+                {"name": "acme", "entityType": "company", "observations": ["rockets"]},
+            ]
+        },
+    ).raise_for_status()
+    client.post(
+        "/create_relations",
+        json={"relations": [{"from": "ada", "to": "acme", "relationType": "works_at"}]},
+    ).raise_for_status()
+
+    response = client.post(
+        "/query",
+        json={"nodes": [{"entityType": "person"}, {"text": "rockets"}], "edges": [{}]},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["matches"] == 1 and not body["truncated"]
+    assert body["plan"]["anchor"] == 0
+    assert {e["name"] for e in body["entities"]} == {"ada", "acme"}
+
+    response = client.post("/query", json={"nodes": [{}, {}], "edges": []})
+    assert response.status_code == 400
@@ -0,0 +1,85 @@
+import base64
+import json
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def client():
+    client = TestClient(main.app)
+    client.headers["X-Memory-Namespace"] = uuid.uuid4().hex
+    entities = [
+        {"name": f"e{i}", "entityType": ("even", "odd")[i % 2], "observations": []}
+        for i in range(7)
+    ]
+    relations = [
+        {"from": f"e{i}", "to": f"e{i + 1}", "relationType": "next"} for i in range(6)
+    ]
+    client.post("/create_entities", json={"entities": entities}).raise_for_status()
+    client.post("/create_relations", json={"relations": relations}).raise_for_status()
+    return client
+
+
+def read_pages(client, limit, **filters):
+    pages, cursor = [], None
+    while True:
+        params = {"limit": limit, **filters}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/read_graph", params=params)
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.json()["nextCursor"]
+        if cursor is None:
+            return pages
+
+
+def test_pages_add_up_to_the_whole_graph(client):
+    whole = client.get("/read_graph").json()
+    assert len(whole["entities"]) == 7 and len(whole["relations"]) == 6
+    assert whole["nextCursor"] is None
+
+    pages = read_pages(client, 3)
+    assert all(len(p["entities"]) + len(p["relations"]) <= 3 for p in pages)
+    assert [e for p in pages for e in p["entities"]] == whole["entities"]
+    assert [r for p in pages for r in p["relations"]] == whole["relations"]
+
+
+def test_pages_filter_by_type(client):
+    pages = read_pages(client, 2, entityType="odd", relationType="missing")
+    names = [e["name"] for p in pages for e in p["entities"]]
+    assert names == ["e1", "e3", "e5"]
+    assert not any(p["relations"] for p in pages)
+
+
+def test_stream_matches_the_memory_file_format(client):
+    lines = client.get("/read_graph/stream").text.splitlines()
+    records = [json.loads(line) for line in lines]
+    assert [r["type"] for r in records] == ["entity"] * 7 + ["relation"] * 6
+    assert records[-1] == {
+        "type": "relation",
+        "from": "e5",
+        "to": "e6",
+        "relationType": "next",
+    }
+
+
+@pytest.mark.parametrize(
+    "cursor, detail",
+    [
+        ("%%%", "Invalid cursor"),
+        (base64.urlsafe_b64encode(b"x:nowhere:0").decode(), "Invalid cursor"),
+        (
+            base64.urlsafe_b64encode(b"stale:entities:0").decode(),
+            "Cursor is no longer valid; restart from the first page",
+        ),
+    ],
+)
+def test_bad_cursors_are_rejected(client, cursor, detail):
+    response = client.get("/read_graph", params={"limit": 2, "cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == detail
@@ -0,0 +1,106 @@
+import time
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from store import GraphStore, LimitExceeded
+from writer import MutationQueue
+
+
+def entity(name, *observations):
+    return {"name": name, "entityType": "thing", "observations": list(observations)}
+
+
+def test_observations_beyond_the_cap_drop_oldest_first(tmp_path):
+    store = GraphStore(tmp_path / "memory.json", max_observations=2)
+    store.ensure_indexes()
+    store.create_entities([entity("a", "first", "second", "third")])
+    store.add_observations([{"entityName": "a", "contents": ["fourth"]}])
+    nid = store.entity_id("a")
+    assert store.observation_texts(nid) == ["third", "fourth"]
+    assert store.evicted_observations == 2
+    assert store.search("first", None)["total"] == 0
+    assert store.search("fourth", None)["total"] == 1
+
+
+def test_entity_cap_evicts_least_recently_accessed(tmp_path):
+    store = GraphStore(tmp_path / "memory.json", retain_entities=2)
+    store.create_entities([entity("a"), entity("b"), entity("c")])
+    store.subgraph(["a"])
+    mutations = store.retention_mutations()
+    assert mutations == [("evict_entities", {"entityNames": ["b"]})]
+    for op, payload in mutations:
+        store.apply(op, payload)
+    assert [store.entity_id(n) is not None for n in "abc"] == [True, False, True]
+    assert store.stats()["evictedEntities"] == 1
+    assert store.retention_mutations() == []
+
+
+def test_ttl_evicts_idle_entities(tmp_path):
+    store = GraphStore(tmp_path / "memory.json", ttl_seconds=60)
+    store.create_entities([entity("a"), entity("b")])
+    store.accessed[store.entity_id("a")] = time.time() - 120
+    assert store.retention_mutations() == [
+        ("evict_entities", {"entityNames": ["a"]})
+    ]
+
+
+def test_retention_is_off_by_default(store):
+    store.create_entities([entity("a")])
+    store.accessed[store.entity_id("a")] = 0
+    assert store.retention_mutations() == []
+
+
+def test_evictions_are_journaled(tmp_path):
+    path = tmp_path / "memory.json"
+    store = GraphStore(path, retain_entities=1)
+    writer = MutationQueue(store, maintenance_interval=0.01)
+    writer.submit("create_entities", {"entities": [entity("a"), entity("b")]})
+    deadline = time.monotonic() + 5
+    while store.entity_count > 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.close()
+    reloaded = GraphStore(path)
+    reloaded.load()
+    assert reloaded.entity_count == 1
+
+
+def test_size_limits_reject_the_whole_mutation(tmp_path):
+    store = GraphStore(tmp_path / "memory.json", max_entities=2, max_relations=1)
+    store.create_entities([entity("a"), entity("b")])
+    # Names that already exist do not count against the cap.
+    store.create_entities([entity("a")])
+    with pytest.raises(LimitExceeded):
+        store.create_entities([entity("c")])
+    store.create_relations([{"from": "a", "to": "b", "relationType": "r"}])
+    store.create_relations([{"from": "a", "to": "b", "relationType": "r"}])
+    with pytest.raises(LimitExceeded):
+        store.create_relations(
+            [
+                {"from": "b", "to": "a", "relationType": "r"},
+                {"from": "a", "to": "a", "relationType": "r"},
+            ]
+        )
+    assert (store.entity_count, store.relation_count) == (2, 1)
+
+
+def test_limit_exceeded_is_a_413_and_stats_report_sizes(monkeypatch):
+    monkeypatch.setattr(main, "NAMESPACE_MAX_ENTITIES", 1)
+    client = TestClient(main.app)
+    client.headers["X-Memory-Namespace"] = uuid.uuid4().hex
+    response = client.post(
+        "/create_entities", json={"entities": [entity("a", "hello")]}
+    )
+    assert response.status_code == 200
+    response = client.post("/create_entities", json={"entities": [entity("b")]})
+    assert response.status_code == 413
+    assert "limited to 1 entities" in response.json()["detail"]
+
+    stats = client.get("/stats").json()
+    assert stats["namespace"] == client.headers["X-Memory-Namespace"]
+    assert (stats["entities"], stats["relations"]) == (1, 0)
+    assert stats["observationBytes"] == len("hello")
+    assert stats["journalBytes"] > 0
+    assert stats["evictedEntities"] == stats["evictedObservations"] == 0
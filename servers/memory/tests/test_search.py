@@ -0,0 +1,83 @@
+import uuid
+
+from fastapi.testclient import TestClient
+
+import main
+from search import FullTextIndex
+from store import GraphStore
+
+
+def entity(name, entity_type="person", *observations):
+    return {"name": name, "entityType": entity_type, "observations": list(observations)}
+
+
+def test_bm25_ranks_rarer_and_more_frequent_terms_higher():
+    index = FullTextIndex()
+    index.add("a", ["graph databases store graph data"])
+    index.add("b", ["a database of people"])
+    index.add("c", ["graph"])
+    index.add("d", ["people and people and people"])
+
+    ranked = [doc for doc, _ in index.search("graph", limit=10)]
+    assert ranked[0] == "c" and set(ranked) == {"a", "c"}
+    assert index.search("people", limit=1)[0][0] == "d"
+    assert index.search("nothing", limit=10) == []
+
+
+def test_removed_texts_stop_matching():
+    index = FullTextIndex()
+    index.add("a", ["alpha beta"])
+    index.remove("a", ["alpha beta"])
+    assert index.search("alpha") == [] and len(index) == 0
+
+
+def test_stemming_matches_inflected_forms():
+    index = FullTextIndex(stemming=True)
+    index.add("a", ["companies"])
+    assert index.search("company")[0][0] == "a"
+    assert FullTextIndex().search("company") == []
+
+
+def test_search_page_counts_every_match(tmp_path):
+    store = GraphStore(tmp_path / "memory.json")
+    store.create_entities(
+        [entity(f"e{i}", "person", "shared word", f"unique{i}") for i in range(30)]
+    )
+    store.ensure_indexes()
+
+    page = store.search("shared", limit=5, offset=10)
+    assert len(page["entities"]) == 5 and page["total"] == 30
+    everything = store.search("shared", limit=None)
+    assert len(everything["entities"]) == 30 and everything["total"] == 30
+    assert store.search("unique7", limit=None)["entities"][0]["name"] == "e7"
+
+
+def test_search_skips_names_that_are_only_relation_endpoints(tmp_path):
+    store = GraphStore(tmp_path / "memory.json")
+    store.create_entities([entity("alice", "person", "knows bob")])
+    store.create_relations([{"from": "alice", "to": "bob", "relationType": "knows"}])
+    store.ensure_indexes()
+    assert [e["name"] for e in store.search("bob", limit=None)["entities"]] == ["alice"]
+
+
+def test_search_nodes_returns_every_match_by_default():
+    client = TestClient(main.app)
+    headers = {"X-Memory-Namespace": uuid.uuid4().hex}
+    entities = [entity(f"n{i}", "note", "common") for i in range(25)]
+    client.post(
+        "/create_entities", json={"entities": entities}, headers=headers
+    ).raise_for_status()
+
+    response = client.post("/search_nodes", json={"query": "common"}, headers=headers)
+    assert len(response.json()["entities"]) == 25
+    assert response.json()["total"] == 25
+
+    response = client.post(
+        "/search_nodes", json={"query": "common", "limit": 10}, headers=headers
+    )
+    assert len(response.json()["entities"]) == 10
+    assert response.json()["total"] == 25
+
+    # Whole words only: a prefix is not a match.
+    response = client.post("/search_nodes", json={"query": "comm"}, headers=headers)
+    assert response.json() == {"entities": [], "relations": [], "total": 0}
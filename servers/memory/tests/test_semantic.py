@@ -0,0 +1,62 @@
+import math
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from store import GraphStore
+from vectors import HashingVectorizer, VectorIndex, reciprocal_rank_fusion
+
+
+def test_vectors_are_unit_length():
+    vector = HashingVectorizer().transform("Alice works at Acme")
+    assert math.isclose(math.sqrt(sum(v * v for v in vector.values())), 1.0)
+    assert HashingVectorizer().transform("") == {}
+
+
+def test_similar_texts_rank_first_even_with_typos():
+    index = VectorIndex()
+    index.add("cat", ["the cat sat on the mat"])
+    index.add("stocks", ["quarterly earnings beat analyst estimates"])
+    index.add("dog", ["a dog chased the ball"])
+    assert index.search("cats sitting on mats", limit=1)[0][0] == "cat"
+    assert index.search("quartrly earnigs", limit=1)[0][0] == "stocks"
+
+
+def test_removing_every_text_drops_the_document():
+    index = VectorIndex()
+    index.add("a", ["first text", "second text"])
+    index.remove("a", ["first text"])
+    assert index.search("second", limit=1)[0][0] == "a"
+    index.remove("a", ["second text"])
+    assert len(index) == 0 and index.search("second") == []
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([("a", 0.9), ("b", 0.5)], [("b", 7.0), ("c", 3.0)])
+    assert [doc for doc, _ in fused] == ["b", "a", "c"]
+
+
+@pytest.mark.parametrize("hybrid", [False, True])
+def test_store_semantic_search(tmp_path, hybrid):
+    store = GraphStore(tmp_path / "memory.json", semantic=True)
+    store.create_entities(
+        [
+            {"name": "alice", "entityType": "person", "observations": ["plays chess"]},
+            {"name": "bob", "entityType": "person", "observations": ["bakes bread"]},
+        ]
+    )
+    store.ensure_indexes()
+    ranked = store.semantic_search("chess player", limit=5, hybrid=hybrid)
+    assert store.entity(ranked[0][0])["name"] == "alice"
+
+
+def test_semantic_search_needs_the_index_enabled():
+    client = TestClient(main.app)
+    response = client.post(
+        "/semantic_search",
+        json={"query": "anything"},
+        headers={"X-Memory-Namespace": uuid.uuid4().hex},
+    )
+    assert response.status_code == 400
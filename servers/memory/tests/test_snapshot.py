@@ -0,0 +1,128 @@
+import pytest
+
+import snapshot
+import store as store_module
+from store import GraphStore
+
+
+def populate(store):
+    store.create_entities(
+        [
+            {
+                "name": "alice",
+                "entityType": "person",
+                "observations": ["likes tea", "ünï"],
+            },
+            {"name": "acme", "entityType": "company", "observations": []},
+            {"name": "gone", "entityType": "person", "observations": ["deleted"]},
+        ]
+    )
+    store.create_relations(
+        [
+            {"from": "alice", "to": "acme", "relationType": "works_at"},
+            {"from": "alice", "to": "outsider", "relationType": "knows"},
+            {"from": "gone", "to": "acme", "relationType": "works_at"},
+        ]
+    )
+    store.delete_entities(["gone"])
+
+
+def reload(path, **options):
+    loaded = GraphStore(path, **options)
+    loaded.load()
+    return loaded
+
+
+def test_binary_snapshot_loads_back_equal(tmp_path):
+    path = tmp_path / "memory.json"
+    original = GraphStore(path, snapshot_format="binary")
+    populate(original)
+    original.checkpoint()
+    assert snapshot.is_binary(path)
+
+    loaded = reload(path, snapshot_format="binary")
+    assert list(loaded.records()) == list(original.records())
+    assert loaded.entity_count == 2 and loaded.relation_count == 2
+    accessed = {n: original.accessed[original.entity_id(n)] for n in ("alice", "acme")}
+    assert {n: loaded.accessed[loaded.entity_id(n)] for n in accessed} == accessed
+
+
+def test_mutations_after_a_binary_load_survive_the_next_snapshot(tmp_path):
+    path = tmp_path / "memory.json"
+    original = GraphStore(path, snapshot_format="binary")
+    populate(original)
+    original.checkpoint()
+
+    loaded = reload(path, snapshot_format="binary")
+    # Texts from the mapped file and texts added since live side by side.
+    loaded.add_observations([{"entityName": "alice", "contents": ["new"]}])
+    loaded.delete_observations([{"entityName": "alice", "observations": ["likes tea"]}])
+    loaded.create_entities(
+        [{"name": "bob", "entityType": "person", "observations": []}]
+    )
+    loaded.checkpoint()
+
+    again = reload(path, snapshot_format="binary")
+    assert list(again.records()) == list(loaded.records())
+    assert again.entity(again.entity_id("alice"))["observations"] == ["ünï", "new"]
+
+
+@pytest.mark.parametrize("before, after", [("jsonl", "binary"), ("binary", "jsonl")])
+def test_changing_format_rewrites_the_snapshot(tmp_path, before, after):
+    path = tmp_path / "memory.json"
+    original = GraphStore(path, snapshot_format=before)
+    populate(original)
+    original.checkpoint()
+
+    loaded = reload(path, snapshot_format=after)
+    assert snapshot.is_binary(path) == (after == "binary")
+    assert list(reload(path).records()) == list(original.records())
+    assert list(loaded.records()) == list(original.records())
+
+
+def test_indexes_are_built_after_a_binary_load(tmp_path):
+    path = tmp_path / "memory.json"
+    original = GraphStore(path, snapshot_format="binary")
+    populate(original)
+    original.checkpoint()
+
+    loaded = reload(path, snapshot_format="binary")
+    with loaded.indexed_read():
+        found = loaded.search("tea", limit=None)["entities"]
+    assert [e["name"] for e in found] == ["alice"]
+
+
+def test_chunked_rebuild_matches_a_fresh_one(tmp_path, monkeypatch):
+    monkeypatch.setattr(store_module, "INDEX_BUILD_CHUNK", 3)
+    store = GraphStore(tmp_path / "memory.json", semantic=True)
+    store.import_records(
+        [
+            {"name": f"e{i}", "entityType": f"t{i % 3}", "observations": [f"word{i}"]}
+            for i in range(20)
+        ],
+        [],
+    )
+    chunk = store._index_chunk
+    writes = iter(range(100))
+
+    def chunk_then_write(build, limit):
+        covered = chunk(build, limit)
+        # A write landing between chunks, on entities either side of the cursor.
+        i = next(writes)
+        name = f"e{(i * 7) % 20}"
+        if store.entity_id(name) is not None:
+            store.add_observations([{"entityName": name, "contents": [f"late{i}"]}])
+        store.delete_entities([f"e{(i * 11 + 5) % 20}"])
+        return covered
+
+    monkeypatch.setattr(store, "_index_chunk", chunk_then_write)
+    store.ensure_indexes()
+    monkeypatch.undo()
+    built = store.text_index, store.vector_index, store.type_members
+
+    store.indexes_stale = True
+    store.ensure_indexes()
+    assert built[0]._postings == store.text_index._postings
+    assert built[0]._lengths == store.text_index._lengths
+    assert built[1]._vectors.keys() == store.vector_index._vectors.keys()
+    assert built[2] == store.type_members
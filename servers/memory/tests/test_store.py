@@ -0,0 +1,89 @@
+import json
+
+from store import GraphStore, Interner, StringArena
+
+
+def entity(name, entity_type="thing", *observations):
+    return {"name": name, "entityType": entity_type, "observations": list(observations)}
+
+
+def test_interner_gives_each_string_one_id():
+    types = Interner()
+    assert types.intern("person") == types.intern("person") == 0
+    assert types.intern("company") == 1
+    assert types[1] == "company" and types.lookup("missing") is None
+
+
+def test_arena_reads_back_base_and_added_texts():
+    arena = StringArena(memoryview("héllo".encode()))
+    offset, length = arena.add("wörld")
+    assert arena.get(0, len("héllo".encode())) == "héllo"
+    assert arena.get(offset, length) == "wörld"
+    assert b"".join(arena.chunks()) == "héllowörld".encode()
+
+
+def test_records_round_trip_through_mutations(store):
+    store.create_entities([entity("a", "person", "x", "y"), entity("b"), entity("a")])
+    store.create_relations(
+        [
+            {"from": "a", "to": "b", "relationType": "knows"},
+            {"from": "a", "to": "b", "relationType": "knows"},
+            {"from": "b", "to": "ghost", "relationType": "haunts"},
+        ]
+    )
+    store.add_observations([{"entityName": "b", "contents": ["z", "z"]}])
+    store.delete_observations([{"entityName": "a", "observations": ["x"]}])
+    assert list(store.records()) == [
+        {"type": "entity", "name": "a", "entityType": "person", "observations": ["y"]},
+        {"type": "entity", "name": "b", "entityType": "thing", "observations": ["z"]},
+        {"type": "relation", "from": "a", "to": "b", "relationType": "knows"},
+        {"type": "relation", "from": "b", "to": "ghost", "relationType": "haunts"},
+    ]
+    assert store.entity_count == 2 and store.relation_count == 2
+
+
+def test_deleting_an_entity_deletes_its_relations(store):
+    store.create_entities([entity("a"), entity("b"), entity("c")])
+    store.create_relations(
+        [
+            {"from": "a", "to": "b", "relationType": "r"},
+            {"from": "c", "to": "b", "relationType": "r"},
+        ]
+    )
+    store.delete_entities(["b"])
+    assert [r["type"] for r in store.records()] == ["entity", "entity"]
+    assert store.relation_count == 0 and store.entity_id("b") is None
+    assert store.neighbors(["a"], depth=1)[0]["relations"] == []
+
+
+def test_arena_compaction_keeps_every_text(store):
+    big = "x" * (1 << 16)
+    store.create_entities([entity(f"e{i}", "t", big + str(i)) for i in range(40)])
+    store.apply(
+        "delete_observations",
+        {
+            "deletions": [
+                {"entityName": f"e{i}", "observations": [big + str(i)]}
+                for i in range(30)
+            ]
+        },
+    )
+    assert store.arena.dead == 0
+    assert store.entity(store.entity_id("e35"))["observations"] == [big + "35"]
+
+
+def test_jsonl_snapshot_is_json_dumps_of_the_records(store):
+    store.create_entities([entity("quote\"d", "ünïcode", "line\nbreak", "tab\t")])
+    store.create_relations([{"from": "quote\"d", "to": "x", "relationType": "r"}])
+    assert list(store.jsonl_lines()) == [json.dumps(r) for r in store.records()]
+
+
+def test_jsonl_snapshot_loads_back_equal(tmp_path, store):
+    store.create_entities([entity("a", "p", "one"), entity("b", "q")])
+    store.create_relations([{"from": "a", "to": "b", "relationType": "r"}])
+    store.delete_entities(["b"])
+    store.create_entities([entity("b", "q", "again")])
+    store.checkpoint()
+    loaded = GraphStore(store.path)
+    loaded.load()
+    assert list(loaded.records()) == list(store.records())
@@ -0,0 +1,79 @@
+import pytest
+
+
+def chain(store, *names, relation_type="next"):
+    store.create_entities(
+        [{"name": n, "entityType": "node", "observations": []} for n in names]
+    )
+    store.create_relations(
+        [
+            {"from": a, "to": b, "relationType": relation_type}
+            for a, b in zip(names, names[1:])
+        ]
+    )
+
+
+def names(subgraph):
+    return {entity["name"] for entity in subgraph["entities"]}
+
+
+def test_neighbors_expand_one_hop_per_depth(store):
+    chain(store, "a", "b", "c", "d")
+    assert names(store.neighbors(["b"], depth=1)[0]) == {"a", "b", "c"}
+    assert names(store.neighbors(["b"], depth=2)[0]) == {"a", "b", "c", "d"}
+    subgraph, truncated = store.neighbors(["b"], depth=2, direction="out")
+    assert names(subgraph) == {"b", "c", "d"} and not truncated
+    assert len(subgraph["relations"]) == 2
+
+
+def test_neighbors_filter_relation_types(store):
+    chain(store, "a", "b")
+    chain(store, "b", "c", relation_type="other")
+    subgraph, _ = store.neighbors(["b"], depth=1, relation_types={"other"})
+    assert names(subgraph) == {"b", "c"}
+    assert [r["relationType"] for r in subgraph["relations"]] == ["other"]
+
+
+def test_neighbors_report_caps(store):
+    store.create_entities(
+        [{"name": f"n{i}", "entityType": "node", "observations": []} for i in range(10)]
+    )
+    store.create_relations(
+        [{"from": "n0", "to": f"n{i}", "relationType": "r"} for i in range(1, 10)]
+    )
+    subgraph, truncated = store.neighbors(["n0"], depth=1, max_fanout=3)
+    assert truncated and len(names(subgraph)) == 4
+    subgraph, truncated = store.neighbors(["n0"], depth=1, max_nodes=5)
+    assert truncated and len(names(subgraph)) == 5
+
+
+def test_shortest_path_follows_direction(store):
+    chain(store, "a", "b", "c", "d")
+    store.create_relations([{"from": "a", "to": "c", "relationType": "skip"}])
+
+    path = store.shortest_path("a", "d")
+    assert [e["name"] for e in path["entities"]] == ["a", "c", "d"]
+    assert [(r["from"], r["to"]) for r in path["relations"]] == [("a", "c"), ("c", "d")]
+    assert store.shortest_path("d", "a") is None
+    assert len(store.shortest_path("d", "a", direction="in")["relations"]) == 2
+    assert store.shortest_path("a", "d", relation_types={"next"})["relations"][0] == {
+        "from": "a",
+        "to": "b",
+        "relationType": "next",
+    }
+
+
+@pytest.mark.parametrize("max_depth, found", [(2, False), (3, True)])
+def test_shortest_path_respects_max_depth(store, max_depth, found):
+    chain(store, "a", "b", "c", "d")
+    path = store.shortest_path("a", "d", max_depth=max_depth)
+    assert (path is not None) == found
+
+
+def test_shortest_path_to_itself_and_unknown_names(store):
+    chain(store, "a", "b")
+    assert store.shortest_path("a", "a") == {
+        "entities": [{"name": "a", "entityType": "node", "observations": []}],
+        "relations": [],
+    }
+    assert store.shortest_path("a", "missing") is None
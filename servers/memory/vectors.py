@@ -0,0 +1,120 @@
+import heapq
+import math
+import zlib
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from search import TOKEN_PATTERN, stem
+
+Vector = Dict[int, float]
+
+
+class HashingVectorizer:
+    """
+    Embeds text into a fixed-size sparse vector without a vocabulary or model:
+    stemmed words and character trigrams are hashed into `dimensions` buckets.
+    Trigrams let morphological variants and typos land close together.
+    """
+
+    def __init__(self, dimensions: int = 1 << 18, ngram: int = 3):
+        self.dimensions = dimensions
+        self.ngram = ngram
+
+    def _feature(self, token: str) -> Tuple[int, float]:
+        h = zlib.crc32(token.encode("utf-8"))
+        return h % self.dimensions, (1.0 if h & 0x80000000 else -1.0)
+
+    def features(self, text: str) -> Iterable[str]:
+        for word in TOKEN_PATTERN.findall(text.lower()):
+            yield "w:" + stem(word)
+            padded = f"<{word}>"
+            for i in range(len(padded) - self.ngram + 1):
+                yield "c:" + padded[i : i + self.ngram]
+
+    def transform(self, text: str) -> Vector:
+        counts: Dict[int, float] = {}
+        for token in self.features(text):
+            index, sign = self._feature(token)
+            counts[index] = counts.get(index, 0.0) + sign
+        vector = {
+            i: math.copysign(1 + math.log(abs(v)), v) for i, v in counts.items() if v
+        }
+        norm = math.sqrt(sum(v * v for v in vector.values()))
+        return {i: v / norm for i, v in vector.items()} if norm else {}
+
+
+class VectorIndex:
+    """
+    Cosine-similarity index over documents made of several texts.
+
+    A document vector is the sum of its (normalized) text vectors, so texts can
+    be added and removed incrementally. Postings per hashed feature make a query
+    touch only documents that share a feature with it.
+    """
+
+    def __init__(
+        self, vectorizer: Optional[HashingVectorizer] = None, max_df: float = 0.2
+    ):
+        self.vectorizer = vectorizer or HashingVectorizer()
+        # Features present in more than this share of documents carry almost no
+        # signal but dominate query cost; they are skipped for large indexes.
+        self.max_df = max_df
+        self._vectors: Dict[Hashable, Vector] = {}
+        self._norms: Dict[Hashable, float] = {}
+        self._postings: Dict[int, Dict[Hashable, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+    def _update(self, doc: Hashable, texts: Iterable[str], sign: float) -> None:
+        vector = self._vectors.setdefault(doc, {})
+        for text in texts:
+            for i, v in self.vectorizer.transform(text).items():
+                value = vector.get(i, 0.0) + sign * v
+                posting = self._postings.setdefault(i, {})
+                if abs(value) > 1e-9:
+                    vector[i] = value
+                    posting[doc] = value
+                else:
+                    vector.pop(i, None)
+                    posting.pop(doc, None)
+                    if not posting:
+                        del self._postings[i]
+        if vector:
+            self._norms[doc] = math.sqrt(sum(v * v for v in vector.values()))
+        else:
+            del self._vectors[doc]
+            self._norms.pop(doc, None)
+
+    def add(self, doc: Hashable, texts: Iterable[str]) -> None:
+        self._update(doc, texts, 1.0)
+
+    def remove(self, doc: Hashable, texts: Iterable[str]) -> None:
+        if doc in self._vectors:
+            self._update(doc, texts, -1.0)
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[Hashable, float]]:
+        query_vector = self.vectorizer.transform(query)
+        cutoff = self.max_df * len(self._vectors) if len(self._vectors) > 1000 else None
+        scores: Dict[Hashable, float] = {}
+        for i, q in query_vector.items():
+            posting = self._postings.get(i)
+            if not posting or (cutoff is not None and len(posting) > cutoff):
+                continue
+            for doc, v in posting.items():
+                scores[doc] = scores.get(doc, 0.0) + q * v
+        ranked = heapq.nlargest(
+            limit,
+            ((doc, score / self._norms[doc]) for doc, score in scores.items()),
+            key=lambda kv: kv[1],
+        )
+        return [(doc, score) for doc, score in ranked if score > 0]
+
+
+def reciprocal_rank_fusion(
+    *rankings: List[Tuple[Hashable, float]], k: int = 60
+) -> List[Tuple[Hashable, float]]:
+    fused: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, (doc, _) in enumerate(ranking):
+            fused[doc] = fused.get(doc, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda kv: kv[1], reverse=True)
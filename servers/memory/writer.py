@@ -0,0 +1,192 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ReadWriteLock:
+    """
+    Many concurrent readers or one writer. Waiting writers block new readers so
+    a steady stream of reads cannot starve the mutation queue. Not reentrant.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class StoreFailed(Exception):
+    """Mutations were applied in memory but could not be made durable."""
+
+
+class MutationQueue:
+    """
+    Single writer for a GraphStore with group commit.
+
+    Request threads submit (op, payload) mutations and block until they are
+    durable. The writer thread takes everything queued within `interval`
+    seconds, applies it in arrival order under the store's write lock, then
+    appends the whole batch to the journal with a single fsync outside the
+    lock, so readers only ever wait for the in-memory apply. That apply is
+    still one write-lock hold per batch: a bulk import_records blocks reads
+    of the store for as long as it takes to apply.
+
+    A batch is visible to readers before its commit, so a failed commit
+    cannot simply be reported as a failed write. Instead the queue is marked
+    `failed`: the batch and every later submit raise StoreFailed, and close()
+    skips the checkpoint, leaving the last durable state on disk for the
+    next load.
+
+    With a `maintenance_interval`, the writer also asks the store for
+    housekeeping mutations (retention evictions) whenever it has been that
+    long since the last round, and commits them like any other batch.
+    """
+
+    def __init__(
+        self,
+        store,
+        interval: float = 0.005,
+        max_batch: int = 1000,
+        maintenance_interval: Optional[float] = None,
+    ):
+        self.store = store
+        self.interval = interval
+        self.max_batch = max_batch
+        self.maintenance_interval = maintenance_interval
+        self._next_maintenance = (
+            None if maintenance_interval is None else time.monotonic() + maintenance_interval
+        )
+        self.failed: Optional[BaseException] = None
+        self._queue: "queue.Queue[Optional[Tuple[str, dict, Future]]]" = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, name="memory-writer", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, op: str, payload: dict) -> Any:
+        if self.failed is not None:
+            raise self._read_only()
+        future: Future = Future()
+        self._queue.put((op, payload, future))
+        return future.result()
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        if self.failed is None:
+            self.store.checkpoint()
+
+    def _read_only(self) -> StoreFailed:
+        return StoreFailed(f"Store is read-only after a failed commit: {self.failed}")
+
+    # --- writer thread --------------------------------------------------------
+    def _next_batch(self) -> Tuple[List[Tuple[str, dict, Optional[Future]]], bool]:
+        try:
+            if self._next_maintenance is None:
+                first = self._queue.get()
+            else:
+                # Also taken when due under steady traffic, so it is never starved.
+                timeout = self._next_maintenance - time.monotonic()
+                if timeout <= 0:
+                    raise queue.Empty
+                first = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return self._maintenance(), False
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0:
+                    item = self._queue.get(timeout=timeout)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _maintenance(self) -> List[Tuple[str, dict, Optional[Future]]]:
+        self._next_maintenance = time.monotonic() + self.maintenance_interval
+        try:
+            return [(op, p, None) for op, p in self.store.retention_mutations()]
+        except Exception:
+            logger.exception("Failed to plan maintenance")
+            return []
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if not batch:
+                continue
+            if self.failed is not None:
+                # Queued before the failure was seen.
+                error = self._read_only()
+                for _, _, future in batch:
+                    if future is not None:
+                        future.set_exception(error)
+                continue
+            applied, results = [], []
+            with self.store.lock.write():
+                for op, payload, future in batch:
+                    try:
+                        results.append((future, self.store.apply(op, payload), None))
+                        applied.append((op, payload))
+                    except Exception as e:
+                        results.append((future, None, e))
+            try:
+                self.store.commit(applied)
+            except Exception as e:
+                logger.exception("Failed to commit %d mutations", len(applied))
+                self.failed = e
+                failure = StoreFailed(f"Applied but not made durable: {e}")
+                results = [(f, None, err or failure) for f, _, err in results]
+            for future, result, error in results:
+                if future is None:
+                    if error is not None:
+                        logger.error("Maintenance mutation failed: %s", error)
+                elif error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)